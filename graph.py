@@ -4,6 +4,10 @@ import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
 from utils import helper
+from utils.compact import CompactGraph
+from utils import generators
+from utils import graph_io
+from utils import layout as layouts
 
 
 def main():
@@ -28,6 +32,21 @@ def main():
   parser.add_argument("--plot", action="store_true")
   parser.add_argument("--output", type=str)
   parser.add_argument("--seed", type=int)
+  
+  # Generator used by --create_random_graph ('fast' uses geometric skipping and skips the nx.Graph construction), and
+  #   an optional edge list (CSV) file to stream the generated edges into without building any graph in memory
+  parser.add_argument("--generator", choices=['networkx', 'fast'], default='networkx')
+  parser.add_argument("--stream_edges", type=str)
+  
+  # Approximation mode for the average shortest path length of --analyze (any of these enables it)
+  parser.add_argument("--approx_samples", type=int)
+  parser.add_argument("--approx_error", type=float)
+  parser.add_argument("--approx_time", type=float)
+  parser.add_argument("--approx_strategy", choices=['uniform', 'degree'], default='uniform')
+  
+  # Layout of --plot ('auto' picks Kamada-Kawai for small graphs and a scalable layout for large ones), cached next to
+  #   the input (or output) graph file
+  parser.add_argument("--layout", choices=layouts.LAYOUTS, default='auto')
 
   # Parses and gathers the arguments
   args = parser.parse_args()
@@ -55,6 +74,7 @@ def main():
     
   # GRAPH CONSTRUCTION SECTION
   graph = None
+  compact = None
 
   # Generates an Erdos-Renyi Graph using a high level implementation (only create if the arguments for --create_random_graph are present)
   if (args.create_random_graph):
@@ -75,24 +95,37 @@ def main():
         c = {constant}
         p = {edge_probability}""")
 
-    graph = nx.erdos_renyi_graph(n=num_nodes, p=edge_probability, seed=seed)
+    if (args.stream_edges):
+      # Writes the edges chunk by chunk, tracking the connected components with union-find along the way
+      num_edges, union_find = generators.write_erdos_renyi_edges(f"data/{args.stream_edges}", num_nodes, min(edge_probability, 1), seed)
+      print(f"Streamed {num_edges} edges to data/{args.stream_edges} ({union_find.num_components} connected components)")
+    elif (args.generator == 'fast'):
+      compact = generators.fast_erdos_renyi_graph(num_nodes, min(edge_probability, 1), seed)
+      print(f"Generated {compact.number_of_edges()} edges")
+    else:
+      graph = nx.erdos_renyi_graph(n=num_nodes, p=edge_probability, seed=seed)
     
   elif (args.input):
+    # Loads the compact graph (through the binary cache for GML files and edge lists); the nx.Graph is built only when needed
     try:
-      graph = nx.read_gml(f"data/{args.input}")
-    except nx.NetworkXError as e:
-      print(f"Error: Could not read the file as a GML graph: {e}")
-      print("Please ensure the file is a valid GML format.")
+      compact = graph_io.load_graph(f"data/{args.input}")
+    except (nx.NetworkXError, ValueError) as e:
+      print(f"Error: Could not read the file as a graph: {e}")
+      print("Please ensure the file is a valid GML file or a .csv/.tsv edge list.")
       return
     except FileNotFoundError:
-      print(f"File `data/{args.input}` was not found. Please specify an existing .gml file inside the `data/` directory.")
+      print(f"File `data/{args.input}` was not found. Please specify an existing .gml, .csv or .tsv file inside the `data/` directory.")
       return
   else:
     print("No --input or --create_random_graph arguments detected. No graph has been loaded.")
+  
+  # The compact graph (loaded or generated) is only materialized as an nx.Graph for --plot
+  if (graph is None and compact is not None and args.plot):
+    graph = compact.to_networkx()
     
-  if (graph and args.output):
-    # Saves the graph to the designated output file
-    nx.write_gml(graph, f"data/{args.output}")
+  if ((graph or compact) and args.output):
+    # Saves the graph to the designated output file (.npz writes the binary format directly)
+    graph_io.write_graph(compact if compact is not None else graph, f"data/{args.output}")
     print(f"Graph saved to data/{args.output}")
     print()
 
@@ -101,45 +134,50 @@ def main():
   isolated_nodes = []
   
   # GRAPH ANALYSIS SECTION
-  if (graph and args.analyze):
+  if ((graph or compact) and args.analyze):
     print("Graph Analysis:")
+    # Builds the compact (CSR) graph once, shared by every analysis below
+    if (compact is None):
+      compact = CompactGraph.from_networkx(graph)
+
     # Multi BFS Traversal
     sources = args.multi_BFS
-    bfs_results, visited, edge_colors, node_colors = helper.multi_search_bfs(graph, sources)
+    bfs_results, visited, edge_colors, node_colors, owners, distances = helper.multi_search_bfs(compact, sources)
     print(f"Multi-BFS Traversal using source(s) {sources}: {bfs_results}")
     print(f"Path tracking: {visited}")
+    reached = owners >= 0
+    print(f"Nodes reached per source: {np.bincount(owners[reached], minlength=len(sources or ['0'])).tolist()}, "
+          f"farthest distance: {distances[reached].max()}")
     print()
     
     # Identifying connected components
-    connected_components = helper.identify_connected_components(graph)
+    connected_components = helper.identify_connected_components(compact)
     print(f"List of connected components:")
-    for cc,_,_ in connected_components:
-      print(cc, end = "")
+    for c in range(len(connected_components)):
+      print(connected_components.nodes(c), end = "")
     print('\n')
     
     #Identify if cycles exist in graph
-    cycle_bool = helper.cycle_detection(graph)
+    cycle_bool = helper.cycle_detection(compact)
     print("A cycle exists in the graph") if cycle_bool else print("No cycle exists in the graph")
     print()
 
     # Identifying isolated nodes
-    isolated_nodes = helper.identify_isolate_nodes(graph)
+    isolated_nodes = helper.identify_isolate_nodes(compact)
     print(f"List of isolated nodes: {isolated_nodes}")
     print()
 
     
     #Compute density of graph
-    density_graph = helper.graph_density(graph)
+    density_graph = helper.graph_density(compact)
     print(f"The Graph's measured density is: {density_graph}")
     print()
 
 
     #Compute Average Shortest Path Length
-    avg_spl = helper.avg_shortest_path_lenf(graph)
-    if avg_spl:
-      print(f"Average Shortest Path Length: {avg_spl}")    
-    else:
-      print("The graph is not connected, therefore we cannot compute the average shortest path length")
+    avg_spl = helper.avg_shortest_path_lenf(compact, samples=args.approx_samples, strategy=args.approx_strategy,
+                                            target_error=args.approx_error, time_budget=args.approx_time, seed=args.seed)
+    helper.print_shortest_path_stats(avg_spl)
     print()
     
     
@@ -151,7 +189,8 @@ def main():
   # GRAPH PLOTTING SECTION
   if (graph and args.plot):
     # Options for the graph
-    layout = nx.kamada_kawai_layout(graph)
+    layout_file = f"data/{args.input or args.output}" if (args.input or args.output) else None
+    layout = layouts.positions(graph, layouts.cached_layout(graph, layout_file, args.layout, exact="kamada_kawai"))
     options = {
       "with_labels": True, 
       "font_size": 10,
@@ -217,5 +256,7 @@ CLI Tests (generating a graph, reading a graph, input & output present, filename
   python ./graph.py --input graph_file.gml --create_random_graph 200 1.5 --multi_BFS 0 5 20 --analyze --plot --output final_graph.gml
   python ./graph.py --input graph_file.gml --create_random_graph 200 1.5 --multi_BFS 0 5 20 --analyze --plot --output final_graph.txt
   python ./graph.py --create_random_graph 25 0.7 --multi_BFS 0 5 20 --analyze --plot --output data1.gml
+  python ./graph.py --create_random_graph 1000000 1.2 --generator fast --analyze --approx_samples 256
+  python ./graph.py --create_random_graph 1000000 1.2 --stream_edges random_edges.csv
 '''
 
@@ -4,6 +4,12 @@ import networkx as nx
 import matplotlib.pyplot as plt
 from itertools import islice
 from utils import helper
+from utils import graph_io
+from utils import community
+from utils import triangles
+from utils import layout
+from utils import render
+from utils.compact import as_networkx, object_array
 import os
 
 
@@ -21,20 +27,63 @@ def main():
   #   python ./graph.py ..
   parser.add_argument("--input", type=str)
   parser.add_argument("--plot", choices=['C', 'N', 'P', 'T'])
+  # Layout of --plot, computed once for the plot and cached next to the input file ('auto' picks a scalable layout for
+  #   large graphs)
+  parser.add_argument("--layout", choices=layout.LAYOUTS, default='auto')
+  # Rendering of --plot ('auto' uses the fast path on large graphs, 'density' shades the edges as a density image), and
+  #   an image file (.png, .svg, ...) to write the plot to instead of showing it
+  parser.add_argument("--render", choices=render.RENDER_MODES, default='auto')
+  parser.add_argument("--plot_output", type=str)
   parser.add_argument("--output", type=str)
 
   # Adds additional options and arguments to the parser:
   parser.add_argument("--components", type=int)
   parser.add_argument("--split_output_dir", action="store_true")
+  parser.add_argument("--community_method", choices=community.METHODS, default='louvain')
+  parser.add_argument("--seed", type=int)
   parser.add_argument("--verify_homophily", action="store_true")
+  parser.add_argument("--permutations", type=int, default=1000)
+  parser.add_argument("--homophily_report", type=str)
   parser.add_argument("--verify_balanced_graph", action="store_true")
+  parser.add_argument("--frustration_index", action="store_true")
+  parser.add_argument("--triangle_census", action="store_true")
+  parser.add_argument("--triangle_samples", type=int)
+  parser.add_argument("--census_output", type=str)
   parser.add_argument("--temporal_simulation", type=str)
+  parser.add_argument("--degree_analysis", action="store_true")
+  parser.add_argument("--degree_output", type=str)
 
   parser.add_argument("--simulate_failures", type=int)
   parser.add_argument("--robustness_check", type=int)
+  # Sweep mode: --robustness_check N runs N Newman-Ziff sweeps for the whole robustness curve (k = 0..m)
+  parser.add_argument("--robustness_sweep", action="store_true")
+  parser.add_argument("--sweep_output", type=str)
+  
+  # Targeted attacks for --simulate_failures/--robustness_check (random edge failures by default)
+  parser.add_argument("--attack", choices=['random', 'degree', 'betweenness', 'overlap'], default='random')
+  parser.add_argument("--attack_target", choices=['edge', 'node'], default='edge')
+  parser.add_argument("--adaptive", action="store_true")
+  parser.add_argument("--lowest_first", action="store_true")
+  parser.add_argument("--recompute_every", type=int, default=1)
+  
+  # Approximation mode for the average shortest path length of --simulate_failures (any of these enables it)
+  parser.add_argument("--approx_samples", type=int)
+  parser.add_argument("--approx_error", type=float)
+  parser.add_argument("--approx_time", type=float)
+  parser.add_argument("--approx_strategy", choices=['uniform', 'degree'], default='uniform')
+  
+  # Betweenness centrality of --simulate_failures/--robustness_check: k-pivot sampling (either flag enables it) and
+  #   the number of worker processes (0 uses every CPU)
+  parser.add_argument("--betweenness_samples", type=int)
+  parser.add_argument("--betweenness_error", type=float)
+  parser.add_argument("--workers", type=int)
+  parser.add_argument("--robustness_betweenness", action="store_true")
+  parser.add_argument("--dynamic_betweenness", action="store_true")
 
   # Parses and gathers the arguments
   args = parser.parse_args()
+  if args.dynamic_betweenness and args.betweenness_error is not None:
+    parser.error("--dynamic_betweenness updates a fixed set of sources and cannot be combined with --betweenness_error")
     
   # Handles if there are not sufficient parameters
   if not args.plot:
@@ -43,53 +92,58 @@ def main():
     
   # GRAPH CONSTRUCTION SECTION
   graph = None
+  compact = None
     
   if (args.input):
+    # Loads the compact graph (through the binary cache, or memory-mapped for .csr inputs). The analyses run on it
+    #   directly; it is only turned into an nx.Graph when node attributes are assigned or the graph is plotted.
     try:
-      graph = nx.read_gml(f"data/{args.input}")
-    except nx.NetworkXError as e:
-      print(f"Error: Could not read the file as a GML graph: {e}")
-      print("Please ensure the file is a valid GML format.")
+      compact = graph_io.load_graph(f"data/{args.input}")
+      graph = compact
+    except (nx.NetworkXError, ValueError) as e:
+      print(f"Error: Could not read the file as a graph: {e}")
+      print("Please ensure the file is a valid GML file or a .csv/.tsv edge list.")
       return
     except FileNotFoundError:
-      print(f"File `data/{args.input}` was not found. Please specify an existing .gml file inside the `data/` directory.")
+      print(f"File `data/{args.input}` was not found. Please specify an existing .gml, .csv or .tsv file inside the `data/` directory.")
       return
   else:
     print("No --input No graph has been loaded.")
     
   # Compute metrics
-  clustering = helper.compute_clustering_coefficients(graph)
-  overlap = helper.compute_neighborhood_overlap(graph)
+  # The triangles are counted once for both the clustering coefficients and the neighborhood overlap, which is
+  #   only computed if it is plotted
+  triangle_counts = triangles.count_triangles(compact, args.workers)
+  clustering = helper.compute_clustering_coefficients(compact, triangle_counts)
+  overlap = helper.compute_neighborhood_overlap(compact, lazy=True, triangle_counts=triangle_counts)
   print()
     
-  # Partition components with the Girvan Newman method
+  # Partition the graph into communities with the selected engine (Louvain by default), merged or split to the
+  #   requested count. Community attributes are added to the compact graph, so it is not converted to an nx.Graph.
   if args.components:
-    print(f"Partitioning graph into {args.components} components...")
-    communities_generator = nx.community.girvan_newman(graph)
-    
-    # Get the desired number of communities
-    for i, communities in enumerate(communities_generator):
-      if len(communities) >= args.components:
-        break
+    print(f"Partitioning graph into {args.components} components ({args.community_method})...")
+    # The Girvan-Newman dendrogram is saved next to the input, so other --components values reuse it
+    dendrogram_path = f"data/{args.input}{community.DENDROGRAM_SUFFIX}"
+    labels = community.detect_communities(compact, args.components, args.community_method, seed=args.seed,
+                                          dendrogram_path=dendrogram_path)
+    communities = [np.flatnonzero(labels == c) for c in range(labels.max() + 1)]
     
-    print(f"Found {len(communities)} communities:")
+    print(f"Found {len(communities)} communities (modularity {community.modularity(compact, labels):.4f}):")
     
     # Assign community labels to nodes
-    for i, community in enumerate(communities):
-      for node in community:
-        graph.nodes[node]['community'] = i + 1
-        graph.nodes[node]['community_label'] = f"Community {i + 1}"
-      
-      print(f"  Community {i+1}: {len(community)} nodes - {sorted(list(community))[:10]}{'...' if len(community) > 10 else ''}")
+    compact = compact.with_node_attrs(community=labels + 1,
+                                      community_label=object_array([f"Community {c + 1}" for c in labels.tolist()]))
+    graph = compact
+    for i, members in enumerate(communities):
+      print(f"  Community {i+1}: {len(members)} nodes - {sorted(compact.labels_of(members))[:10]}{'...' if len(members) > 10 else ''}")
     
     # Export components separately if requested
     if args.split_output_dir:
       output_dir = "data/components"
       os.makedirs(output_dir, exist_ok=True)
-      for i, community in enumerate(communities):
-        subgraph = graph.subgraph(community).copy()
+      for i, members in enumerate(communities):
         output_file = f"{output_dir}/component_{i+1}.gml"
-        nx.write_gml(subgraph, output_file)
+        graph_io.write_graph(compact.node_subgraph(members), output_file)
         print(f"  Saved component {i+1} to {output_file}")
     print()
 
@@ -97,40 +151,71 @@ def main():
   # Verify homophily
   if args.verify_homophily:
     print("---VERIFY HOMOPHILY TEST---")
-    helper.verify_homophily(graph)
+    helper.verify_homophily(graph, args.permutations, args.seed, args.workers, output=args.homophily_report)
     print()
   
+  # Degree statistics
+  if args.degree_analysis:
+    print("---DEGREE ANALYSIS---")
+    helper.analyze_degree_distribution(graph, args.degree_output)
+    print()
+
   # Verify balanced graph
   if args.verify_balanced_graph:
     print("---VERIFY BALANCED GRAPH TEST---")
-    helper.verify_structural_balance(graph)
+    helper.verify_structural_balance(graph, frustration=args.frustration_index, seed=args.seed)
+    print()
+
+  # Signed triangle census
+  if args.triangle_census:
+    print("---SIGNED TRIANGLE CENSUS---")
+    helper.signed_triangle_census(graph, args.triangle_samples, args.seed, args.workers, args.census_output, args.input)
     print()
     
   # Simulate failures
+  betweenness_options = {'samples': args.betweenness_samples, 'target_error': args.betweenness_error,
+                         'workers': args.workers, 'seed': args.seed}
+  attack = None
+  if args.attack != 'random':
+    attack = {'target': args.attack_target, 'score': args.attack, 'adaptive': args.adaptive,
+              'lowest_first': args.lowest_first, 'recompute_every': args.recompute_every}
   if args.simulate_failures:
-    graph = helper.simulate_failures(graph, args.simulate_failures)
+    graph = helper.simulate_failures(graph, args.simulate_failures, betweenness_options, args.dynamic_betweenness,
+                                     attack, samples=args.approx_samples, strategy=args.approx_strategy,
+                                     target_error=args.approx_error, time_budget=args.approx_time)
     print()
     
-  # Handle robustness check
-  if args.robustness_check and args.simulate_failures:
-    graph = helper.robustness_check(graph, args.simulate_failures, args.robustness_check)
+  # Handle robustness check (targeted attacks are deterministic, so they always give their robustness curve)
+  if args.robustness_check and (args.robustness_sweep or attack):
+    helper.robustness_sweep(graph, args.robustness_check, args.simulate_failures, seed=args.seed, workers=args.workers,
+                            output=f"data/{args.sweep_output}" if args.sweep_output else None, attack=attack)
+  elif args.robustness_check and args.simulate_failures:
+    graph = helper.robustness_check(graph, args.simulate_failures, args.robustness_check,
+                                    betweenness_options if args.robustness_betweenness else None,
+                                    seed=args.seed, workers=args.workers)
     
   # Saves the graph to the designated output file
   if args.output:
-    nx.write_gml(graph, f"data/{args.output}")
+    graph_io.write_graph(graph, f"data/{args.output}")
     print(f"Graph saved to data/{args.output}")
     print()
   
   # GRAPH PLOTTING SECTION
+  # The plots run on the compact graph (the NetworkX drawing functions convert it when they are used)
+  plot_output = f"data/{args.plot_output}" if args.plot_output else None
+  if plot_output:
+    render.use_headless()
+  if args.plot:
+    pos = helper.layout_positions(graph, f"data/{args.input}" if args.input else None, args.layout, seed=42)
   if args.plot == 'C':
-    helper.plot_clustering_coefficient(graph, clustering)
+    helper.plot_clustering_coefficient(graph, clustering, pos, plot_output, args.render)
   elif args.plot == 'N':
-    helper.plot_neighborhood_overlap(graph, overlap)
+    helper.plot_neighborhood_overlap(graph, overlap, pos, plot_output, args.render)
   elif args.plot == 'P':
-    helper.plot_attributes(graph)
+    helper.plot_attributes(graph, pos, plot_output, args.render)
   elif args.plot == 'T' and args.temporal_simulation:
     path = "data/" + args.temporal_simulation
-    helper.temporal_simulation(graph, path)
+    helper.temporal_simulation(as_networkx(graph), path, pos, plot_output)
     
   else:
     print("There was no graph to be displayed...")
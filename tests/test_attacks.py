@@ -0,0 +1,73 @@
+import networkx as nx
+import numpy as np
+from utils import attacks
+from utils.compact import as_compact
+
+
+# Neighborhood overlap of the edge (u, v) in G, from NetworkX's neighbor sets.
+def _overlap(G, u, v):
+  union = len((set(G[u]) | set(G[v])) - {u, v})
+  return len(set(G[u]) & set(G[v])) / union if union else 0.0
+
+
+# Brute-force adaptive attack: rescores every alive element on a NetworkX copy after every removal, removing the
+#   highest score (the lowest id among ties).
+def _brute_force_order(G, cg, target, score):
+  H = G.copy()
+  order = []
+  alive = list(range(cg.number_of_nodes() if target == "node" else cg.number_of_edges()))
+  while alive:
+    if target == "node":
+      values = [H.degree(cg.labels[v]) for v in alive]
+    else:
+      pairs = [(cg.labels[cg.edge_u[e]], cg.labels[cg.edge_v[e]]) for e in alive]
+      values = [H.degree(u) * H.degree(v) if score == "degree" else _overlap(H, u, v) for u, v in pairs]
+    best = alive[int(np.argmax(values))]
+    order.append(best)
+    alive.remove(best)
+    if target == "node":
+      H.remove_node(cg.labels[best])
+    else:
+      H.remove_edge(cg.labels[cg.edge_u[best]], cg.labels[cg.edge_v[best]])
+  return order
+
+
+# The priority-queue adaptive attacks remove the same elements, in the same order, as rescoring everything after every
+#   removal.
+def test_adaptive_local_attacks_match_brute_force():
+  for seed in range(4):
+    G = nx.gnm_random_graph(25, 60, seed=seed)
+    cg = as_compact(G)
+    for target, score in (("node", "degree"), ("edge", "degree"), ("edge", "overlap")):
+      order = attacks.attack_order(cg, target, score, adaptive=True)
+      assert order.tolist() == _brute_force_order(G, cg, target, score)
+
+
+# Static scores match NetworkX's degrees, edge betweenness and neighborhood overlaps, and static orders sort them.
+def test_static_attack_scores():
+  G = nx.gnm_random_graph(30, 70, seed=5)
+  cg = as_compact(G)
+  degree = attacks.scores(cg, "node", "degree")
+  assert degree.tolist() == [G.degree(label) for label in cg.labels]
+  edge_betweenness = nx.edge_betweenness_centrality(G, normalized=False)
+  lookup = {frozenset(edge): value for edge, value in edge_betweenness.items()}
+  raw = attacks.scores(cg, "edge", "betweenness")
+  assert np.allclose(raw / 2, [lookup[frozenset(edge)] for edge in cg.edge_labels()])
+  overlap = attacks.scores(cg, "edge", "overlap")
+  assert np.allclose(overlap, [_overlap(G, u, v) for u, v in cg.edge_labels()])
+  order = attacks.attack_order(cg, "node", "degree", count=10)
+  assert degree[order].tolist() == sorted(degree.tolist(), reverse=True)[:10]
+  weakest = attacks.attack_order(cg, "edge", "overlap", lowest_first=True, count=5)
+  assert overlap[weakest].tolist() == sorted(overlap.tolist())[:5]
+
+
+# Adaptive betweenness attacks remove the element of largest betweenness on the remaining graph every time.
+def test_adaptive_betweenness_attack():
+  G = nx.gnm_random_graph(20, 40, seed=6)
+  cg = as_compact(G)
+  order = attacks.attack_order(cg, "node", "betweenness", adaptive=True, count=5)
+  H = G.copy()
+  for node in order.tolist():
+    values = nx.betweenness_centrality(H)
+    assert np.isclose(values[cg.labels[node]], max(values.values()))
+    H.remove_node(cg.labels[node])
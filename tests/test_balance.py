@@ -0,0 +1,54 @@
+import networkx as nx
+import numpy as np
+from utils import balance
+from utils.compact import as_compact
+
+
+# Random graph with random +1/-1 edge signs.
+def _signed_graph(num_nodes, num_edges, seed, sign_seed):
+  G = nx.gnm_random_graph(num_nodes, num_edges, seed=seed)
+  rng = np.random.default_rng(sign_seed)
+  for u, v in G.edges():
+    G[u][v]["sign"] = int(rng.choice([-1, 1]))
+  return as_compact(G)
+
+
+# The frustration index bound is never above the frustrated edges of the structural balance check.
+def test_frustration_index_not_above_structural_balance():
+  for sign_seed in range(50):
+    cg = _signed_graph(35, 35, 12, sign_seed)
+    _, _, frustrated = balance.structural_balance(cg)
+    for seed in range(4):
+      index, colors, index_frustrated = balance.frustration_index(cg, seed=seed)
+      assert index <= len(frustrated)
+      assert index == len(index_frustrated)
+      assert np.array_equal(index_frustrated, balance.frustrated_edges(cg, balance.negative_edges(cg), colors))
+
+
+# Balanced graphs have a frustration index of 0.
+def test_frustration_index_of_balanced_graph():
+  G = nx.path_graph(6)
+  for u, v in G.edges():
+    G[u][v]["sign"] = -1 if u % 2 else 1
+  cg = as_compact(G)
+  assert balance.structural_balance(cg)[0]
+  assert balance.frustration_index(cg, seed=0)[0] == 0
+
+
+# Fewest frustrated edges over every 2-coloring of the nodes (the exact frustration index), by brute force.
+def _exact_frustration(cg):
+  negative = balance.negative_edges(cg)
+  colors = (np.arange(2 ** cg.number_of_nodes())[:, None] >> np.arange(cg.number_of_nodes())) & 1
+  across = colors[:, cg.edge_u] != colors[:, cg.edge_v]
+  return int((across != negative).sum(axis=1).min())
+
+
+# The balance check agrees with the brute-force frustration index, and the heuristic bound is never below it.
+def test_structural_balance_matches_brute_force():
+  for sign_seed in range(40):
+    cg = _signed_graph(10, 18, sign_seed % 5, sign_seed)
+    exact = _exact_frustration(cg)
+    balanced, colors, frustrated = balance.structural_balance(cg)
+    assert balanced == (exact == 0) and len(frustrated) >= exact
+    assert np.array_equal(frustrated, balance.frustrated_edges(cg, balance.negative_edges(cg), colors))
+    assert balance.frustration_index(cg, seed=0)[0] >= exact
@@ -0,0 +1,66 @@
+import networkx as nx
+import numpy as np
+from utils import betweenness
+from utils.compact import as_compact
+
+
+# Small random graphs with thin levels (paths, grids), wide levels (dense random graphs) and several components.
+def _graphs():
+  yield nx.path_graph(40)
+  yield nx.grid_2d_graph(6, 7)
+  yield nx.disjoint_union(nx.cycle_graph(9), nx.star_graph(6))
+  for seed in range(6):
+    yield nx.gnm_random_graph(30, 25 + 15 * seed, seed=seed)
+
+
+# Node and edge betweenness match NetworkX, for batches small enough to take the frontier-restricted products.
+def test_betweenness_matches_networkx():
+  for G in _graphs():
+    cg = as_compact(G)
+    expected = nx.betweenness_centrality(G)
+    expected_edges = nx.edge_betweenness_centrality(G)
+    for max_bytes in (1, betweenness.DEFAULT_BATCH_BYTES):
+      values = betweenness.betweenness_stats(cg, max_bytes=max_bytes)["betweenness"]
+      assert np.allclose(values, [expected[label] for label in cg.labels])
+      edge_values = betweenness.edge_betweenness_centrality(cg, max_bytes=max_bytes)
+      lookup = {frozenset(edge): value for edge, value in expected_edges.items()}
+      assert np.allclose(edge_values, [lookup[frozenset(edge)] for edge in cg.edge_labels()])
+
+
+# The process pool gives the exact values, and k-pivot sampling is exact with every node as a pivot and unbiased
+#   otherwise (the average over seeds is close to the exact betweenness).
+def test_parallel_and_sampled_betweenness():
+  G = nx.connected_watts_strogatz_graph(80, 4, 0.2, seed=3)
+  cg = as_compact(G)
+  exact = np.array([nx.betweenness_centrality(G)[label] for label in cg.labels])
+  assert np.allclose(betweenness.betweenness_stats(cg, workers=2)["betweenness"], exact)
+  full = betweenness.betweenness_stats(cg, samples=cg.number_of_nodes(), seed=0)
+  assert np.allclose(full["betweenness"], exact) and not full["approximate"]
+  estimates = [betweenness.betweenness_stats(cg, samples=20, seed=seed) for seed in range(40)]
+  assert all(stats["approximate"] and stats["samples"] == 20 for stats in estimates)
+  assert np.isclose(np.mean([stats["average"] for stats in estimates]), exact.mean(), rtol=0.05)
+  stats = betweenness.betweenness_stats(cg, target_error=0.05, seed=1)
+  low, high = stats["average_ci"]
+  assert low <= stats["average"] <= high and (high - low) / 2 <= 0.05 * stats["average"] + 1e-12
+
+
+# The incremental update after edge deletions matches a full recompute on the graph without those edges, and only
+#   re-runs the sources whose shortest paths used a deleted edge.
+def test_deletion_betweenness_matches_full_recompute():
+  for seed in range(5):
+    G = nx.gnm_random_graph(40, 80, seed=seed)
+    cg = as_compact(G)
+    removed = np.random.default_rng(seed).choice(cg.number_of_edges(), 1 + seed, replace=False)
+    before, after = betweenness.deletion_betweenness(cg, removed)
+    H = G.copy()
+    H.remove_edges_from(cg.labels_of(pair) for pair in np.stack((cg.edge_u[removed], cg.edge_v[removed]), axis=1))
+    expected_before = nx.betweenness_centrality(G)
+    expected_after = nx.betweenness_centrality(H)
+    assert np.allclose(before["betweenness"], [expected_before[label] for label in cg.labels])
+    assert np.allclose(after["betweenness"], [expected_after[label] for label in cg.labels])
+    distances = dict(nx.all_pairs_shortest_path_length(G))
+    in_dag = [any(abs(distances[source].get(cg.labels[u], -9) - distances[source].get(cg.labels[v], -9)) == 1
+                  for u, v in zip(cg.edge_u[removed].tolist(), cg.edge_v[removed].tolist())) for source in cg.labels]
+    assert after["updated_sources"] == sum(in_dag)
+    parallel_before, parallel_after = betweenness.deletion_betweenness(cg, removed, workers=2)
+    assert np.allclose(parallel_after["betweenness"], after["betweenness"])
@@ -0,0 +1,88 @@
+import networkx as nx
+import numpy as np
+from utils import community
+from utils.compact import as_compact
+
+
+# Brute-force Girvan-Newman removal order: edge betweenness recomputed from scratch by NetworkX after every removal,
+#   removing the lowest edge id among the edges of largest betweenness.
+def _girvan_newman_order(cg):
+  G = nx.Graph()
+  G.add_nodes_from(range(cg.number_of_nodes()))
+  edge_ids = {}
+  for e, (u, v) in enumerate(zip(cg.edge_u.tolist(), cg.edge_v.tolist())):
+    G.add_edge(u, v)
+    edge_ids[frozenset((u, v))] = e
+  order, num_components = [], []
+  while G.number_of_edges():
+    scores = {edge_ids[frozenset(edge)]: value
+              for edge, value in nx.edge_betweenness_centrality(G, normalized=False).items()}
+    best = max(scores.values())
+    e = min(edge for edge, value in scores.items() if value >= best - 1e-9 * max(abs(best), 1.0))
+    G.remove_edge(int(cg.edge_u[e]), int(cg.edge_v[e]))
+    order.append(e)
+    num_components.append(nx.number_connected_components(G))
+  return order, num_components
+
+
+# The incremental dendrogram removes the same edges as a full recompute after every removal.
+def test_girvan_newman_dendrogram_matches_full_recompute():
+  for seed in range(15):
+    cg = as_compact(nx.gnm_random_graph(18, 30, seed=seed))
+    dendrogram = community.girvan_newman_dendrogram(cg)
+    order, num_components = _girvan_newman_order(cg)
+    assert dendrogram.removal_order.tolist() == order
+    assert dendrogram.num_components.tolist() == num_components
+
+
+# Every dendrogram level has its number of communities, each of them connected.
+def test_girvan_newman_partition_levels():
+  G = nx.gnm_random_graph(20, 35, seed=4)
+  cg = as_compact(G)
+  dendrogram = community.girvan_newman_dendrogram(cg)
+  levels = dendrogram.levels()
+  assert np.all(np.diff(levels) > 0)
+  for k in levels:
+    labels = dendrogram.partition(int(k))
+    assert len(np.unique(labels)) == k
+    for c in np.unique(labels):
+      assert nx.is_connected(G.subgraph(cg.labels_of(np.flatnonzero(labels == c))))
+
+
+# Communities of a label array as a list of label sets.
+def _communities(cg, labels):
+  return [set(cg.labels_of(np.flatnonzero(labels == c))) for c in np.unique(labels)]
+
+
+# Modularity matches NetworkX, and Louvain finds partitions about as good as NetworkX's Louvain, made of connected
+#   communities.
+def test_louvain_matches_networkx_modularity():
+  for seed in range(5):
+    G = nx.planted_partition_graph(4, 15, 0.5, 0.04, seed=seed)
+    cg = as_compact(G)
+    labels = community.louvain_labels(cg, seed=seed)
+    assert np.isclose(community.modularity(cg, labels), nx.community.modularity(G, _communities(cg, labels)))
+    expected = nx.community.modularity(G, nx.community.louvain_communities(G, seed=seed))
+    assert community.modularity(cg, labels) >= expected - 0.02
+    assert all(nx.is_connected(G.subgraph(nodes)) for nodes in _communities(cg, labels))
+
+
+# Label propagation recovers well separated planted communities, and every community it returns is connected.
+def test_label_propagation_communities():
+  G = nx.planted_partition_graph(3, 20, 0.7, 0.01, seed=1)
+  cg = as_compact(G)
+  labels = community.label_propagation_labels(cg, seed=0)
+  assert all(nx.is_connected(G.subgraph(nodes)) for nodes in _communities(cg, labels))
+  planted = G.graph["partition"]
+  assert nx.community.modularity(G, _communities(cg, labels)) >= nx.community.modularity(G, planted) - 0.05
+
+
+# Asking for a number of communities merges or splits the partition to exactly that many.
+def test_detect_communities_count():
+  G = nx.planted_partition_graph(4, 12, 0.6, 0.05, seed=2)
+  cg = as_compact(G)
+  for method in ("louvain", "label_propagation"):
+    for k in (1, 2, 4, 7, 12):
+      labels = community.detect_communities(cg, k, method, seed=0)
+      assert len(np.unique(labels)) == k
+      assert np.array_equal(np.unique(labels), np.arange(k))
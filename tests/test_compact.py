@@ -0,0 +1,56 @@
+import networkx as nx
+import numpy as np
+from utils.compact import CompactGraph, as_compact, as_networkx
+
+
+# Random graph with string labels, self-loops and node/edge attributes.
+def _attributed_graph(seed):
+  rng = np.random.default_rng(seed)
+  G = nx.relabel_nodes(nx.gnm_random_graph(25, 60, seed=seed), lambda node: f"n{node}")
+  G.add_edge("n0", "n0")
+  for u, v in G.edges():
+    G[u][v]["sign"] = int(rng.choice([-1, 1]))
+    if rng.random() < 0.5:
+      G[u][v]["weight"] = float(rng.random())
+  for node in list(G)[::3]:
+    G.nodes[node]["color"] = str(rng.choice(["red", "blue"]))
+  return G
+
+
+# The CSR adjacency holds the same neighbors, edges and degrees as the NetworkX graph, with sorted neighbor lists.
+def test_compact_graph_matches_networkx():
+  for seed in range(6):
+    G = _attributed_graph(seed)
+    cg = as_compact(G)
+    assert cg.number_of_nodes() == G.number_of_nodes() and cg.number_of_edges() == G.number_of_edges()
+    assert list(cg.labels) == list(G.nodes())
+    for i, label in enumerate(cg.labels):
+      neighbors = cg.neighbors(i)
+      assert np.all(np.diff(neighbors) > 0)
+      assert set(cg.labels_of(neighbors)) == set(G.neighbors(label))
+      assert cg.degree[i] == len(set(G.neighbors(label)))
+      for j, e in zip(neighbors.tolist(), cg.incident_edges(i).tolist()):
+        assert {cg.edge_u[e], cg.edge_v[e]} == {i, j}
+    assert np.array_equal((cg.adjacency().toarray() > 0), nx.to_numpy_array(G, nodelist=list(G.nodes())) > 0)
+
+
+# Converting to the compact graph and back keeps the labels, the edges and the node/edge attributes.
+def test_compact_graph_round_trip():
+  G = _attributed_graph(3)
+  H = as_networkx(CompactGraph.from_networkx(G))
+  assert list(H.nodes(data=True)) == list(G.nodes(data=True))
+  assert {frozenset(edge): data for *edge, data in H.edges(data=True)} == \
+    {frozenset(edge): data for *edge, data in G.edges(data=True)}
+
+
+# Edge and node subgraphs keep the matching edges and attributes.
+def test_compact_subgraphs():
+  G = _attributed_graph(4)
+  cg = as_compact(G)
+  mask = cg.edge_attr("sign") > 0
+  positive = as_networkx(cg.edge_subgraph(mask))
+  assert {frozenset(edge) for edge in positive.edges()} == \
+    {frozenset((u, v)) for u, v, sign in G.edges(data="sign") if sign > 0}
+  nodes = np.arange(0, cg.number_of_nodes(), 2)
+  induced = as_networkx(cg.node_subgraph(nodes))
+  assert nx.utils.graphs_equal(induced, G.subgraph(cg.labels_of(nodes)))
@@ -0,0 +1,61 @@
+import networkx as nx
+import numpy as np
+from utils import helper
+from utils.components import Components, UnionFind, component_labels
+from utils.compact import as_compact
+
+
+# Random graphs from sparse (many components) to dense.
+def _graphs():
+  for seed in range(8):
+    yield nx.gnm_random_graph(80, 20 + 12 * seed, seed=seed)
+
+
+# Partition of the node labels as a set of frozensets.
+def _partition(labels, cg):
+  return {frozenset(cg.labels_of(np.flatnonzero(labels == c))) for c in np.unique(labels)}
+
+
+# Union-find components (batched and edge by edge) match NetworkX's connected components.
+def test_component_labels_match_networkx():
+  for G in _graphs():
+    cg = as_compact(G)
+    expected = {frozenset(component) for component in nx.connected_components(G)}
+    num_components, labels = component_labels(cg)
+    assert num_components == len(expected) and _partition(labels, cg) == expected
+    assert np.all(np.diff(np.unique(labels, return_index=True)[1]) > 0)
+
+    union_find = UnionFind(cg.number_of_nodes())
+    for u, v in zip(cg.edge_u.tolist(), cg.edge_v.tolist()):
+      union_find.add_edge(u, v)
+    assert union_find.num_components == len(expected) and _partition(union_find.labels(), cg) == expected
+    roots = union_find.roots()
+    assert np.array_equal(union_find.size[np.unique(roots)], np.bincount(roots)[np.unique(roots)])
+
+
+# Incremental updates: merging edge lists in several batches, with nodes added along the way, gives the components of
+#   the final graph.
+def test_union_find_incremental_batches():
+  G = nx.gnm_random_graph(120, 100, seed=3)
+  cg = as_compact(G)
+  union_find = UnionFind(60)
+  edges = np.stack((cg.edge_u, cg.edge_v), axis=1)
+  low = edges.max(axis=1) < 60
+  union_find.union_edges(edges[low, 0], edges[low, 1])
+  union_find.add_nodes(60)
+  for chunk in np.array_split(edges[~low], 4):
+    union_find.union_edges(chunk[:, 0], chunk[:, 1])
+  assert union_find.num_components == nx.number_connected_components(G)
+  assert _partition(union_find.labels(), cg) == {frozenset(c) for c in nx.connected_components(G)}
+
+
+# The lazy component lists yield the nodes and edges of every component, and the helper checks agree with NetworkX.
+def test_components_lists_and_helpers():
+  for G in _graphs():
+    components = helper.identify_connected_components(G)
+    assert isinstance(components, Components)
+    for nodes, edges, _ in components:
+      assert set(nx.node_connected_component(G, nodes[0])) == set(nodes)
+      assert {frozenset(edge) for edge in edges} == {frozenset(edge) for edge in G.subgraph(nodes).edges()}
+    assert helper.cycle_detection(G) == (len(nx.cycle_basis(G)) > 0)
+    assert set(helper.identify_isolate_nodes(G)) == set(nx.isolates(G))
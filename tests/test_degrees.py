@@ -0,0 +1,46 @@
+import networkx as nx
+import numpy as np
+from utils import degrees
+from utils.compact import as_compact
+
+
+# Random graphs with skewed degrees, plus one with self-loops.
+def _graphs():
+  for seed in range(5):
+    yield nx.barabasi_albert_graph(60, 2 + seed % 3, seed=seed)
+    yield nx.gnm_random_graph(50, 80 + 20 * seed, seed=seed)
+  G = nx.gnm_random_graph(30, 50, seed=9)
+  G.add_edges_from([(0, 0), (5, 5)])
+  yield G
+
+
+# Degrees, assortativity, distribution, core numbers and rich club match NetworkX.
+def test_degree_statistics_match_networkx():
+  for G in _graphs():
+    cg = as_compact(G)
+    stats = degrees.degree_statistics(cg, fit=False)
+    degree = np.array([G.degree(label) for label in cg.labels])
+    assert np.array_equal(degrees.degree_array(cg), degree)
+    assert np.isclose(stats['assortativity'], nx.degree_assortativity_coefficient(G))
+
+    histogram = nx.degree_histogram(G)
+    distribution = stats['distribution']
+    assert distribution['count'].tolist() == [histogram[k] for k in distribution['degree'].tolist()]
+    assert np.isclose(distribution['ccdf'][0], 1.0)
+
+    H = G.copy()
+    H.remove_edges_from(nx.selfloop_edges(H))
+    core = nx.core_number(H)
+    assert stats['core_number'].tolist() == [core[label] for label in cg.labels]
+    if nx.number_of_selfloops(G) == 0:
+      expected = nx.rich_club_coefficient(G, normalized=False)
+      ks, coefficients = stats['rich_club']['degree'], stats['rich_club']['coefficient']
+      assert np.allclose(coefficients, [expected[k] for k in ks.tolist()])
+
+
+# The power-law fit recovers the exponent of a discrete power-law sample.
+def test_fit_power_law_exponent():
+  rng = np.random.default_rng(0)
+  sample = np.floor(3 * (1 - rng.random(20000)) ** (-1 / 1.5) + 0.5).astype(np.int64)
+  fit = degrees.fit_power_law(sample, kmin=10)
+  assert abs(fit['alpha'] - 2.5) < 0.1
@@ -0,0 +1,48 @@
+import networkx as nx
+import numpy as np
+from scipy import stats
+from utils import generators, graph_io
+
+
+# Pair indices map back to every pair (u < v) exactly once, in the enumeration order.
+def test_pair_from_index_enumerates_pairs():
+  n = 50
+  u, v = generators._pair_from_index(np.arange(n * (n - 1) // 2, dtype=np.int64))
+  assert [(a, b) for a, b in zip(u.tolist(), v.tolist())] == [(a, b) for b in range(n) for a in range(b)]
+  index = np.array([10 ** 12 + 7, 2 ** 40 - 1], dtype=np.int64)
+  u, v = generators._pair_from_index(index)
+  assert np.all((u >= 0) & (u < v)) and np.array_equal(v * (v - 1) // 2 + u, index)
+
+
+# G(n, p) graphs are simple, reproducible for a seed, and their edge counts and degrees follow the binomial
+#   distributions of NetworkX's G(n, p).
+def test_fast_erdos_renyi_graph_distribution():
+  n, p = 400, 0.02
+  counts = []
+  for seed in range(30):
+    cg = generators.fast_erdos_renyi_graph(n, p, seed=seed)
+    keys = cg.edge_u.astype(np.int64) * n + cg.edge_v
+    assert np.all(cg.edge_u < cg.edge_v) and len(np.unique(keys)) == len(keys)
+    counts.append(cg.number_of_edges())
+  pairs = n * (n - 1) // 2
+  assert abs(np.mean(counts) - pairs * p) < 4 * np.sqrt(pairs * p * (1 - p) / len(counts))
+  degree = generators.fast_erdos_renyi_graph(n, p, seed=1).degree
+  G = nx.gnp_random_graph(n, p, seed=1)
+  assert stats.ks_2samp(degree, [G.degree(node) for node in G]).pvalue > 0.001
+  again = generators.fast_erdos_renyi_graph(n, p, seed=5)
+  assert np.array_equal(generators.fast_erdos_renyi_graph(n, p, seed=5).edge_u, again.edge_u)
+  assert generators.fast_erdos_renyi_graph(n, 1.0).number_of_edges() == pairs
+  assert generators.fast_erdos_renyi_graph(n, 0.0).number_of_edges() == 0
+
+
+# Streaming the edges to a CSV writes the same graph as the in-memory generator and tracks its components.
+def test_write_erdos_renyi_edges(tmp_path):
+  path = tmp_path / "random.csv"
+  num_edges, union_find = generators.write_erdos_renyi_edges(str(path), 300, 0.006, seed=2, chunk_size=64)
+  cg = generators.fast_erdos_renyi_graph(300, 0.006, seed=2)
+  read = graph_io.read_edge_list(str(path), verbose=False)
+  assert num_edges == read.number_of_edges() == cg.number_of_edges()
+  assert {frozenset(edge) for edge in read.edge_labels()} == {frozenset(edge) for edge in cg.edge_labels()}
+  G = read.to_networkx()
+  G.add_nodes_from(range(300))
+  assert union_find.num_components == nx.number_connected_components(G)
@@ -0,0 +1,107 @@
+import os
+import networkx as nx
+import numpy as np
+from utils import graph_io, helper
+
+
+# Random graph with string labels, mixed node attributes (missing on some nodes) and numeric edge attributes.
+def _attributed_graph(seed):
+  rng = np.random.default_rng(seed)
+  G = nx.relabel_nodes(nx.gnm_random_graph(30, 70, seed=seed), lambda node: f"n{node}")
+  for i, node in enumerate(G):
+    G.nodes[node]["color"] = str(rng.choice(["red", "blue", "green"]))
+    if i % 3:
+      G.nodes[node]["size"] = int(rng.integers(10))
+    if i % 4 == 0:
+      G.nodes[node]["score"] = float(rng.random())
+  for u, v in G.edges():
+    G[u][v]["sign"] = int(rng.choice([-1, 1]))
+    G[u][v]["weight"] = float(rng.random())
+  return G
+
+
+# Undirected edges of a compact graph as a set of frozensets of labels.
+def _labeled_edges(cg):
+  return {frozenset(edge) for edge in cg.edge_labels()}
+
+
+# A non-integer label after the first chunk switches the whole read to string labels, for any chunk size.
+def test_read_edge_list_label_type_across_chunks(tmp_path):
+  path = tmp_path / "edges.csv"
+  path.write_text("source,target,sign\n1,2,1\n2,3,-1\nx,4,1\n4,1,-1\n2,1,1\n3,3,1\n")
+  expected = {frozenset(edge) for edge in [("1", "2"), ("2", "3"), ("x", "4"), ("4", "1")]}
+  for chunk_rows in range(1, 8):
+    cg = graph_io.read_edge_list(str(path), chunk_rows=chunk_rows, verbose=False)
+    assert _labeled_edges(cg) == expected
+    assert cg.number_of_nodes() == 5
+    signs = dict(zip(map(frozenset, cg.edge_labels()), cg.edge_attr("sign").tolist()))
+    assert signs[frozenset(("4", "1"))] == -1 and signs[frozenset(("1", "2"))] == 1
+
+
+# Round trip of a random edge list (with duplicates, reversed duplicates and self-loops) across chunk boundaries.
+def test_read_edge_list_matches_networkx(tmp_path):
+  rng = np.random.default_rng(3)
+  rows = rng.integers(0, 60, size=(400, 2))
+  path = tmp_path / "edges.tsv"
+  path.write_text("".join(f"{u}\t{v}\n" for u, v in rows.tolist()))
+  G = nx.Graph()
+  G.add_edges_from(rows.tolist())
+  G.remove_edges_from(nx.selfloop_edges(G))
+  expected = {frozenset(edge) for edge in G.edges()}
+  for chunk_rows in (1, 2, 7, 64, 1000):
+    cg = graph_io.read_edge_list(str(path), chunk_rows=chunk_rows, verbose=False)
+    assert _labeled_edges(cg) == expected
+    assert set(cg.labels) == set(G.nodes())  # nodes seen only in self-loops are kept
+
+
+# The edge-list cache is reused without hashing the source while its mtime and size are unchanged, and re-parsed
+#   when the content changes.
+def test_read_cached_hashes_only_changed_sources(tmp_path, monkeypatch):
+  path = tmp_path / "edges.csv"
+  path.write_text("1,2\n2,3\n")
+  hashes = []
+  file_hash = graph_io.file_hash
+  monkeypatch.setattr(graph_io, "file_hash", lambda source: hashes.append(source) or file_hash(source))
+
+  assert graph_io.load_graph(str(path)).number_of_edges() == 2
+  assert len(hashes) == 1
+  assert graph_io.load_graph(str(path)).number_of_edges() == 2
+  assert len(hashes) == 1
+
+  stat = path.stat()
+  os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+  assert graph_io.load_graph(str(path)).number_of_edges() == 2
+  assert graph_io.load_graph(str(path)).number_of_edges() == 2
+  assert len(hashes) == 2
+
+  path.write_text("1,2\n2,3\n3,4\n")
+  assert graph_io.load_graph(str(path)).number_of_edges() == 3
+
+
+# The binary graph file and the GML sidecar cache hold the same graph as NetworkX's GML reader.
+def test_binary_cache_round_trip(tmp_path):
+  G = _attributed_graph(2)
+  path = str(tmp_path / "graph.gml")
+  nx.write_gml(G, path)
+  expected = nx.read_gml(path)
+  for _ in range(2):
+    loaded = graph_io.load_graph(path).to_networkx()
+    assert list(loaded) == list(expected) and nx.utils.graphs_equal(loaded, expected)
+  assert os.path.exists(graph_io.cache_path(path))
+  graph_io.write_graph(G, str(tmp_path / "graph.npz"))
+  assert nx.utils.graphs_equal(graph_io.load_graph(str(tmp_path / "graph.npz")).to_networkx(), G)
+
+
+# The memory-mapped layout maps every array read-only and gives back the same graph, on which the helpers agree
+#   with NetworkX.
+def test_mmap_round_trip(tmp_path):
+  G = _attributed_graph(5)
+  path = str(tmp_path / "graph.csr")
+  graph_io.write_graph(G, path)
+  cg = graph_io.load_graph(path + "/")
+  assert isinstance(cg.indices.base, np.memmap) and not cg.indices.flags.writeable
+  loaded = cg.to_networkx()
+  assert list(loaded) == list(G) and nx.utils.graphs_equal(loaded, G)
+  assert cg.id_of("n7") == list(G).index("n7")
+  assert np.isclose(helper.analyze_degree_assortativity(cg), nx.degree_assortativity_coefficient(G))
+  assert helper.avg_shortest_path_lenf(cg)["connected"] == nx.is_connected(G)
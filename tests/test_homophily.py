@@ -0,0 +1,80 @@
+import networkx as nx
+import numpy as np
+from utils import homophily
+from utils.compact import as_compact
+
+
+# Random graph with a random 'color' attribute on every node but the last few.
+def _colored_graph(seed, num_colors=3, unlabeled=3):
+  G = nx.gnm_random_graph(40, 90, seed=seed)
+  rng = np.random.default_rng(seed)
+  for node in list(G)[:-unlabeled]:
+    G.nodes[node]['color'] = f"c{rng.integers(num_colors)}"
+  return G
+
+
+# The observed assortativity of the permutation test matches NetworkX.
+def test_permutation_test_assortativity_matches_networkx():
+  for seed in range(8):
+    G = _colored_graph(seed)
+    result = homophily.permutation_test(as_compact(G), 'color', permutations=0)
+    assert np.isclose(result['assortativity'], nx.attribute_assortativity_coefficient(G, 'color'))
+
+
+# Every permuted assortativity of a batch matches NetworkX on the graph relabeled with that permutation.
+def test_assortativity_batch_matches_networkx():
+  G = _colored_graph(1)
+  cg = as_compact(G)
+  codes, categories, present = homophily.encode_attribute(cg, 'color')
+  rng = np.random.default_rng(0)
+  permuted = np.tile(codes, (5, 1))
+  labeled = np.flatnonzero(present)
+  permuted[:, labeled] = rng.permuted(np.tile(codes[labeled], (5, 1)), axis=1)
+  values = homophily.assortativity_batch(permuted, len(categories), cg.edge_u, cg.edge_v, cg.degree)
+  for row, value in zip(permuted, values):
+    H = G.copy()
+    for node, code in zip(cg.labels, row.tolist()):
+      H.nodes[node]['color'] = categories[code]
+    assert np.isclose(value, nx.attribute_assortativity_coefficient(H, 'color'))
+
+
+# The p-value is the share of permutations at least as assortative as the observed graph: a perfectly assortative
+#   graph (two cliques of different colors) is never matched, and the same seed gives the same test.
+def test_permutation_test_p_value():
+  G = nx.disjoint_union(nx.complete_graph(8), nx.complete_graph(8))
+  for node in G:
+    G.nodes[node]['color'] = 'red' if node < 8 else 'blue'
+  cg = as_compact(G)
+  result = homophily.permutation_test(cg, 'color', permutations=300, seed=2, confidence=None)
+  assert result['assortativity'] == 1.0 and result['p_value'] == 0.0 and result['permutations'] == 300
+  again = homophily.permutation_test(cg, 'color', permutations=300, seed=2, confidence=None)
+  assert again['null_mean'] == result['null_mean']
+
+
+# The mixing report of every attribute matches NetworkX's mixing matrix and assortativity, and brute-force counts of
+#   the same- and cross-category edges and of every group's ties.
+def test_mixing_report_matches_networkx():
+  for seed in range(4):
+    G = _colored_graph(seed)
+    rng = np.random.default_rng(seed + 10)
+    for node in G:
+      G.nodes[node]['team'] = int(rng.integers(4))
+    cg = as_compact(G)
+    report = homophily.mixing_report(cg)
+    assert set(report) == {'color', 'team'}
+    for name, entry in report.items():
+      categories = entry['categories']
+      mapping = {category: i for i, category in enumerate(categories)}
+      expected = nx.attribute_mixing_matrix(G, name, mapping=mapping, normalized=False)
+      assert np.array_equal(entry['mixing_matrix'], expected)
+      assert np.isclose(entry['assortativity'], nx.attribute_assortativity_coefficient(G, name))
+
+      labeled = [(u, v) for u, v in G.edges() if name in G.nodes[u] and name in G.nodes[v]]
+      same = sum(G.nodes[u][name] == G.nodes[v][name] for u, v in labeled)
+      assert entry['same_color_edges'] == same and entry['cross_color_edges'] == len(labeled) - same
+      for category, group in entry['groups'].items():
+        members = [node for node in G if str(G.nodes[node].get(name)) == category and name in G.nodes[node]]
+        ties = [G.nodes[other].get(name) for node in members for other in G[node]]
+        assert group['size'] == len(members) and group['ties'] == len(ties)
+        if ties:
+          assert np.isclose(group['homophily_index'], sum(str(tie) == category for tie in ties) / len(ties))
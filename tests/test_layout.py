@@ -0,0 +1,49 @@
+import networkx as nx
+import numpy as np
+from utils import layout
+from utils.compact import as_compact
+
+
+# The exact layouts are NetworkX's (spring with k = 1/sqrt(n) and the plots' seed, Kamada-Kawai) on the node ids.
+def test_exact_layouts_match_networkx():
+  G = nx.gnm_random_graph(30, 60, seed=1)
+  cg = as_compact(G)
+  spring = nx.spring_layout(G, seed=42, k=1 / np.sqrt(30))
+  assert np.allclose(layout.compute_layout(cg, "spring", seed=42), [spring[label] for label in cg.labels])
+  kamada_kawai = nx.kamada_kawai_layout(G)
+  assert np.allclose(layout.compute_layout(cg, "kamada_kawai"), [kamada_kawai[label] for label in cg.labels])
+
+
+# The scalable layouts give finite positions within [-1, 1], and the force layout pulls neighbors closer together
+#   than random pairs.
+def test_scalable_layouts():
+  G = nx.connected_watts_strogatz_graph(3000, 4, 0.01, seed=2)
+  cg = as_compact(G)
+  assert layout.resolve_method("auto", cg.number_of_nodes()) == "force"
+  for method in ("spectral", "force"):
+    coords = layout.compute_layout(cg, method, seed=0)
+    assert coords.shape == (3000, 2) and np.all(np.isfinite(coords)) and np.abs(coords).max() <= 1 + 1e-9
+    edge_length = np.linalg.norm(coords[cg.edge_u] - coords[cg.edge_v], axis=1).mean()
+    pairs = np.random.default_rng(0).integers(0, 3000, size=(5000, 2))
+    assert edge_length < 0.5 * np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=1).mean()
+
+
+# Layouts are reused from the cache while the graph, method and seed are unchanged, and recomputed otherwise.
+def test_cached_layout_reuse(tmp_path, monkeypatch):
+  G = nx.gnm_random_graph(25, 40, seed=3)
+  path = str(tmp_path / "graph.gml")
+  calls = []
+  compute = layout.compute_layout
+  monkeypatch.setattr(layout, "compute_layout", lambda *args: calls.append(args[1:]) or compute(*args))
+  first = layout.cached_layout(G, path, "spring", seed=1)
+  assert np.array_equal(layout.cached_layout(G, path, "spring", seed=1), first) and len(calls) == 1
+  layout.cached_layout(G, path, "spring", seed=2)
+  layout.cached_layout(G, path, "spectral", seed=1)
+  H = G.copy()
+  H.add_edge(0, 24)
+  H.add_edge(1, 24)
+  layout.cached_layout(H, path, "spring", seed=1)
+  assert len(calls) == 4
+  assert np.array_equal(layout.cached_layout(G, path, "spring", seed=1), first) and len(calls) == 4
+  positions = layout.positions(G, first)
+  assert list(positions) == list(G) and np.array_equal(positions[0], first[0])
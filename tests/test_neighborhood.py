@@ -0,0 +1,34 @@
+import networkx as nx
+import numpy as np
+from utils import helper, neighborhood
+from utils.compact import as_compact
+
+
+# Neighborhood overlap of the edge (u, v) from NetworkX's neighbor sets.
+def _overlap(G, u, v):
+  union = (set(G[u]) - {v}) | (set(G[v]) - {u})
+  return len((set(G[u]) & set(G[v])) - {u, v}) / len(union) if union else 0.0
+
+
+# The sparse overlaps match the neighbor-set definition on every edge, and the common neighbor counts match
+#   NetworkX's common neighbors.
+def test_neighborhood_overlap_matches_networkx():
+  for seed in range(6):
+    G = nx.gnm_random_graph(40, 60 + 30 * seed, seed=seed)
+    cg = as_compact(G)
+    overlap = neighborhood.neighborhood_overlap(cg)
+    assert np.allclose(overlap, [_overlap(G, u, v) for u, v in cg.edge_labels()])
+    common = neighborhood.common_neighbor_counts(cg, workers=2 if seed % 2 else None)
+    assert common.tolist() == [len(list(nx.common_neighbors(G, u, v))) for u, v in cg.edge_labels()]
+
+
+# The lazy mapping answers (u, v) lookups in both orientations, computes the overlaps only on first use, and rejects
+#   pairs that are not edges.
+def test_edge_overlap_mapping():
+  G = nx.karate_club_graph()
+  overlap = helper.compute_neighborhood_overlap(G, lazy=True)
+  assert overlap._array is None
+  for u, v in G.edges():
+    assert np.isclose(overlap[(u, v)], _overlap(G, u, v)) and overlap[(v, u)] == overlap[(u, v)]
+  assert overlap._array is not None and len(overlap) == G.number_of_edges()
+  assert (0, 9) not in overlap and not G.has_edge(0, 9)
@@ -0,0 +1,79 @@
+import networkx as nx
+import numpy as np
+from utils import helper, paths
+from utils.compact import as_compact
+
+
+# Random graphs, connected or not, with more sources than one bitset word.
+def _graphs():
+  yield nx.path_graph(70)
+  yield nx.cycle_graph(130)
+  for seed in range(5):
+    yield nx.gnm_random_graph(90, 110 + 40 * seed, seed=seed)
+
+
+# The batched bitset BFS gives NetworkX's average shortest path length (per component when disconnected) and global
+#   efficiency, also when the sources are split into several batches.
+def test_avg_shortest_path_lenf_matches_networkx():
+  for G in _graphs():
+    cg = as_compact(G)
+    for max_bytes in (1, paths.DEFAULT_BATCH_BYTES):
+      stats = paths.shortest_path_stats(cg, max_bytes)
+      assert np.isclose(stats["efficiency"], nx.global_efficiency(G))
+      assert stats["connected"] == nx.is_connected(G)
+      for component, average in enumerate(stats["component_averages"]):
+        nodes = cg.labels_of(np.flatnonzero(stats["component_labels"] == component))
+        if len(nodes) > 1:
+          assert np.isclose(average, nx.average_shortest_path_length(G.subgraph(nodes)))
+    if nx.is_connected(G):
+      assert np.isclose(helper.avg_shortest_path_lenf(G)["average"], nx.average_shortest_path_length(G))
+
+
+# The sampled estimate is exact once every node is a source, and its confidence interval covers the exact average on
+#   most seeds otherwise (for both sampling strategies).
+def test_sampled_shortest_path_stats():
+  G = nx.connected_watts_strogatz_graph(300, 6, 0.1, seed=1)
+  cg = as_compact(G)
+  exact = nx.average_shortest_path_length(G)
+  full = paths.sampled_shortest_path_stats(cg, samples=cg.number_of_nodes(), seed=0)
+  assert not full["approximate"] and np.isclose(full["average"], exact)
+  assert np.isclose(full["efficiency"], nx.global_efficiency(G))
+  for strategy in ("uniform", "degree"):
+    covered = 0
+    for seed in range(20):
+      stats = paths.sampled_shortest_path_stats(cg, samples=64, strategy=strategy, seed=seed)
+      assert stats["approximate"] and stats["samples"] == 64
+      low, high = stats["average_ci"]
+      covered += low <= exact <= high
+    assert covered >= 15
+
+
+# Multi-source BFS distances are the distances to the nearest source, every node is owned by a nearest source, and
+#   the BFS tree edges go one level down.
+def test_multi_source_bfs_matches_networkx():
+  for seed, G in enumerate(_graphs()):
+    cg = as_compact(G)
+    sources = np.random.default_rng(seed).choice(cg.number_of_nodes(), 4, replace=False)
+    bfs = paths.multi_source_bfs(cg, sources)
+    nearest = nx.multi_source_dijkstra_path_length(G, set(cg.labels_of(sources)))
+    expected = np.array([nearest.get(label, -1) for label in cg.labels])
+    assert np.array_equal(bfs["distance"], expected)
+    reached = np.flatnonzero(expected >= 0)
+    assert sorted(bfs["order"].tolist()) == reached.tolist()
+    assert np.all(np.diff(bfs["distance"][bfs["order"]]) >= 0)
+    for node in reached[expected[reached] > 0].tolist():
+      parent, edge = bfs["parent"][node], bfs["parent_edge"][node]
+      assert bfs["distance"][parent] == bfs["distance"][node] - 1 and bfs["owner"][parent] == bfs["owner"][node]
+      assert {cg.edge_u[edge], cg.edge_v[edge]} == {parent, node}
+      owner = sources[bfs["owner"][node]]
+      assert nx.shortest_path_length(G, cg.labels[owner], cg.labels[node]) == expected[node]
+
+
+# The helper wrapper returns the visiting order and the BFS tree edges by label.
+def test_multi_search_bfs_helper():
+  G = nx.balanced_tree(2, 4)
+  results, visited, edge_colors, _, owner, distance = helper.multi_search_bfs(G, [0])
+  assert results == list(nx.bfs_tree(G, 0).nodes())
+  assert sorted(visited) == sorted(nx.bfs_edges(G, 0))
+  assert edge_colors.count('gray') == 0 and np.all(owner == 0)
+  assert distance.max() == 4
@@ -0,0 +1,62 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+from utils import helper, layout, render
+from utils.compact import as_compact
+
+
+# 'auto' switches to the fast path above the edge threshold, and unknown modes are rejected.
+def test_use_fast():
+  assert not render.use_fast("auto", render.FAST_RENDER_EDGES)
+  assert render.use_fast("auto", render.FAST_RENDER_EDGES + 1)
+  assert render.use_fast("fast", 1) and render.use_fast("density", 1) and not render.use_fast("networkx", 10 ** 6)
+  try:
+    render.use_fast("svg", 1)
+    assert False
+  except ValueError:
+    pass
+
+
+# The edge collection holds one segment per edge between the endpoint positions, as NetworkX draws them.
+def test_draw_edges_segments():
+  G = nx.gnm_random_graph(30, 60, seed=1)
+  cg = as_compact(G)
+  pos = layout.positions(G, layout.compute_layout(cg, "spring"))
+  coords = render.coordinates(cg, pos)
+  fig, ax = plt.subplots()
+  collection = render.draw_edges(ax, coords, cg.edge_u, cg.edge_v, colors=np.arange(cg.number_of_edges(), dtype=float))
+  expected = nx.draw_networkx_edges(G, pos, edgelist=cg.edge_labels(), ax=ax)
+  assert np.allclose(np.array(collection.get_segments()), np.array(expected.get_segments()))
+  assert np.array_equal(collection.get_array(), np.arange(cg.number_of_edges()))
+  plt.close(fig)
+
+
+# The density image (rows are y, columns are x) marks exactly the bins the edges cross, and the mean-weight shading
+#   averages the weights of the edges crossing a bin.
+def test_draw_density_bins():
+  coords = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+  edge_u, edge_v = np.array([0, 0, 1]), np.array([1, 2, 3])
+  fig, ax = plt.subplots()
+  image = render.draw_density(ax, coords, edge_u, edge_v, bins=16).get_array()
+  crossed = np.zeros((16, 16), dtype=bool)
+  crossed[0, :] = crossed[:, 0] = crossed[:, 15] = True
+  assert np.array_equal(~image.mask, crossed)
+  weighted = render.draw_density(ax, coords, edge_u, edge_v, weights=np.array([1.0, 3.0, 5.0]), bins=16).get_array()
+  assert np.isclose(weighted[0, 0], 2.0) and np.isclose(weighted[0, 8], 1.0) and np.isclose(weighted[8, 0], 3.0)
+  assert np.isclose(weighted[8, 15], 5.0) and np.isclose(weighted[0, 15], 3.0)
+  plt.close(fig)
+
+
+# The plot helpers write image files headlessly on both the NetworkX and the fast paths.
+def test_plot_helpers_write_files(tmp_path):
+  G = nx.gnm_random_graph(40, 80, seed=2)
+  cg = as_compact(G)
+  clustering = nx.clustering(G)
+  pos = layout.positions(G, layout.compute_layout(cg, "spring"))
+  for mode in ("networkx", "fast", "density"):
+    output = tmp_path / f"clustering_{mode}.png"
+    helper.plot_clustering_coefficient(G, clustering, pos, output=str(output), render_mode=mode)
+    assert output.stat().st_size > 0
+  assert not plt.get_fignums()
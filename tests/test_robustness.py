@@ -0,0 +1,86 @@
+import networkx as nx
+import numpy as np
+from utils import robustness
+from utils.compact import as_compact
+
+
+# Component metrics of a NetworkX copy of `G` without the given edge ids.
+def _component_metrics(G, cg, failed):
+  H = G.copy()
+  H.remove_edges_from((cg.labels[cg.edge_u[e]], cg.labels[cg.edge_v[e]]) for e in failed.tolist())
+  sizes = [len(component) for component in nx.connected_components(H)]
+  return len(sizes), max(sizes), min(sizes)
+
+
+# Every Monte Carlo round measures the components NetworkX finds after removing that round's edges.
+def test_run_rounds_matches_networkx():
+  G = nx.gnm_random_graph(60, 90, seed=1)
+  cg = as_compact(G)
+  seed_sequences = np.random.SeedSequence(7).spawn(12)
+  results = robustness.run_rounds(cg, 25, seed_sequences, persistence_limit=3)
+  for i, seed_sequence in enumerate(seed_sequences):
+    failed = robustness.round_failures(cg.number_of_edges(), 25, seed_sequence)
+    assert len(np.unique(failed)) == 25
+    count, largest, smallest = _component_metrics(G, cg, failed)
+    assert results["num_components"][i] == count
+    assert results["max_component_size"][i] == largest and results["min_component_size"][i] == smallest
+    assert results["cluster_persistence"][i] == (count <= 3)
+
+
+# The Monte Carlo statistics do not depend on the chunking or the workers, and match the per-round results.
+def test_monte_carlo_reproducible_across_workers():
+  cg = as_compact(nx.gnm_random_graph(50, 80, seed=2))
+  serial, seed_sequences = robustness.monte_carlo(cg, 20, 40, seed=3)
+  parallel, _ = robustness.monte_carlo(cg, 20, 40, seed=3, workers=2, chunk_rounds=7)
+  rounds = robustness.run_rounds(cg, 20, seed_sequences)
+  for name in robustness.ROUND_METRICS:
+    assert np.isclose(serial[name].mean, rounds[name].mean()) and np.isclose(parallel[name].mean, serial[name].mean)
+    assert np.isclose(parallel[name].variance, np.var(rounds[name], ddof=1))
+
+
+# Streaming statistics merged from batches match NumPy on the whole stream.
+def test_running_stats():
+  values = np.random.default_rng(0).normal(size=5000)
+  stats = robustness.RunningStats(capacity=10000)
+  for batch in np.array_split(values, 13):
+    stats.update(batch)
+  assert np.isclose(stats.mean, values.mean()) and np.isclose(stats.variance, values.var(ddof=1))
+  assert stats.min == values.min() and stats.max == values.max()
+  assert np.allclose(stats.quantiles([0.1, 0.5]), np.quantile(values, [0.1, 0.5]))
+
+
+# Every point of a Newman-Ziff sweep is the giant component and component count of the graph without the first k
+#   edges (or nodes) of the removal order.
+def test_sweeps_match_networkx():
+  G = nx.gnm_random_graph(30, 45, seed=4)
+  cg = as_compact(G)
+  rng = np.random.default_rng(1)
+  order = rng.permutation(cg.number_of_edges())
+  giant, count = robustness.sweep_order(cg.number_of_nodes(), cg.edge_u, cg.edge_v, order)
+  for k in range(cg.number_of_edges() + 1):
+    H = G.copy()
+    H.remove_edges_from(cg.labels_of(pair) for pair in np.stack((cg.edge_u[order[:k]], cg.edge_v[order[:k]]), axis=1))
+    assert giant[k] == max(len(c) for c in nx.connected_components(H))
+    assert count[k] == nx.number_connected_components(H)
+
+  node_order = rng.permutation(cg.number_of_nodes())
+  giant, count = robustness.sweep_node_order(cg, node_order)
+  for k in range(cg.number_of_nodes() + 1):
+    H = G.subgraph(cg.labels_of(node_order[k:]))
+    assert giant[k] == max((len(c) for c in nx.connected_components(H)), default=0)
+    assert count[k] == nx.number_connected_components(H)
+
+
+# The percolation curve averages the sweeps of its trials (also over the process pool).
+def test_percolation_sweep_averages_trials():
+  cg = as_compact(nx.gnm_random_graph(40, 70, seed=5))
+  curve = robustness.percolation_sweep(cg, trials=6, seed=2)
+  sweeps = [robustness.sweep_order(cg.number_of_nodes(), cg.edge_u, cg.edge_v,
+                                   np.random.default_rng(seed_sequence).permutation(cg.number_of_edges()))
+            for seed_sequence in np.random.SeedSequence(2).spawn(6)]
+  giants = np.array([giant for giant, _ in sweeps])
+  assert np.allclose(curve["giant_mean"], giants.mean(axis=0))
+  assert np.allclose(curve["giant_std"], giants.std(axis=0, ddof=1))
+  assert np.allclose(curve["components_mean"], np.mean([count for _, count in sweeps], axis=0))
+  parallel = robustness.percolation_sweep(cg, trials=6, seed=2, workers=2)
+  assert np.allclose(parallel["giant_mean"], curve["giant_mean"])
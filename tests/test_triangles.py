@@ -0,0 +1,69 @@
+import networkx as nx
+import numpy as np
+from utils import triangles
+from utils.compact import as_compact
+
+
+# Random graphs with hubs and self-loops.
+def _graphs():
+  for seed in range(4):
+    yield nx.gnm_random_graph(50, 150 + 50 * seed, seed=seed)
+    yield nx.barabasi_albert_graph(60, 4, seed=seed)
+  G = nx.complete_graph(9)
+  G.add_edges_from([(0, 0), (3, 3)])
+  yield G
+
+
+# Triangle counts, clustering coefficients and transitivity match NetworkX, for any chunk size and with workers.
+def test_triangles_match_networkx():
+  for G in _graphs():
+    cg = as_compact(G)
+    expected = nx.triangles(G)
+    clustering = nx.clustering(G)
+    for workers, chunk_entries in ((None, triangles.DEFAULT_CHUNK_ENTRIES), (None, 7), (2, 16)):
+      counts = triangles.count_triangles(cg, workers, chunk_entries)
+      assert counts.node.tolist() == [expected[label] for label in cg.labels]
+      assert np.allclose(counts.clustering, [clustering[label] for label in cg.labels])
+      assert np.isclose(counts.average_clustering, nx.average_clustering(G))
+      assert np.isclose(counts.transitivity, nx.transitivity(G))
+      assert counts.total == sum(expected.values()) // 3
+
+
+# Random graph with random +1/-1 edge signs.
+def _signed_graph(seed):
+  G = nx.gnm_random_graph(35, 160, seed=seed)
+  rng = np.random.default_rng(seed)
+  for u, v in G.edges():
+    G[u][v]["sign"] = int(rng.choice([-1, 1]))
+  return G
+
+
+# Signed census by brute force: every triangle of NetworkX's enumeration, by number of negative edges, in total and
+#   through every node.
+def _brute_force_census(G, cg):
+  census = np.zeros(4, dtype=np.int64)
+  nodes = np.zeros((cg.number_of_nodes(), 4), dtype=np.int64)
+  for triangle in nx.enumerate_all_cliques(G):
+    if len(triangle) != 3:
+      continue
+    a, b, c = triangle
+    kind = sum(G[u][v]["sign"] < 0 for u, v in ((a, b), (a, c), (b, c)))
+    census[kind] += 1
+    for node in triangle:
+      nodes[cg.id_of(node), kind] += 1
+  return census, nodes
+
+
+# The exact census matches the brute force (also over workers), and sampling every oriented edge is exact while
+#   smaller samples are unbiased over seeds.
+def test_signed_triangle_census_matches_brute_force():
+  for seed in range(3):
+    G = _signed_graph(seed)
+    cg = as_compact(G)
+    census, nodes = _brute_force_census(G, cg)
+    for workers in (None, 2):
+      result = triangles.signed_triangle_census(cg, workers=workers)
+      assert result["census"].tolist() == census.tolist() and np.array_equal(result["nodes"], nodes)
+      assert not result["approximate"]
+    estimates = [triangles.signed_triangle_census(cg, samples=80, seed=s)["census"] for s in range(60)]
+    assert np.allclose(np.mean(estimates, axis=0), census, rtol=0.15, atol=3)
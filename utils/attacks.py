@@ -0,0 +1,175 @@
+import heapq
+import numpy as np
+from utils import betweenness, neighborhood
+from utils.compact import CompactGraph
+
+# This module contains the targeted attack engines (node/edge removal orders) used by the failure simulations.
+
+TARGETS = ("edge", "node")
+SCORES = ("degree", "betweenness", "overlap")
+
+
+# Scores of every node or edge of `cg` (restricted to the edges where `edge_mask` is True).
+def scores(cg: CompactGraph, target="edge", score="degree", edge_mask=None, betweenness_options=None):
+  if edge_mask is not None:
+    cg = cg.edge_subgraph(edge_mask)
+  degree = cg.degree.astype(np.float64)
+  if score == "degree":
+    values = degree if target == "node" else degree[cg.edge_u] * degree[cg.edge_v]
+  elif score == "betweenness":
+    options = dict(betweenness_options or {})
+    if target == "node":
+      values = betweenness.betweenness_stats(cg, **options)["betweenness"]
+    else:
+      sources = None
+      if options.get("samples") is not None:
+        sources = np.random.default_rng(options.get("seed")).permutation(cg.number_of_nodes())[:options["samples"]]
+      _, values, _ = betweenness.raw_betweenness(cg, sources)
+  elif score == "overlap":
+    values = neighborhood.neighborhood_overlap(cg)
+    if target == "node":
+      # Mean overlap of the edges incident to every node (a self-loop is incident once)
+      other = np.where(cg.edge_u != cg.edge_v, values, 0.0)
+      sums = np.bincount(cg.edge_u, values, cg.number_of_nodes()) + np.bincount(cg.edge_v, other, cg.number_of_nodes())
+      values = np.where(degree > 0, sums / np.maximum(degree, 1), 0.0)
+  else:
+    raise ValueError(f"Unknown attack score {score!r}, expected one of {SCORES}.")
+
+  if target == "edge" and edge_mask is not None:
+    full = np.full(len(edge_mask), -np.inf)
+    full[np.flatnonzero(edge_mask)] = values
+    values = full
+  return np.asarray(values, dtype=np.float64)
+
+
+# Alive adjacency used by the adaptive engines: the neighbor -> edge id map of every node, the alive degrees and the
+#   common neighbor count of every edge, all kept up to date as nodes and edges are removed.
+class _AliveGraph:
+  def __init__(self, cg: CompactGraph, track_common=False):
+    indptr, indices, slot_edge = cg.indptr.tolist(), cg.indices.tolist(), cg.slot_edge.tolist()
+    self.incident = [dict(zip(indices[indptr[i]:indptr[i + 1]], slot_edge[indptr[i]:indptr[i + 1]]))
+                     for i in range(cg.number_of_nodes())]
+    self.edge_u, self.edge_v = cg.edge_u.tolist(), cg.edge_v.tolist()
+    self.degree = cg.degree.tolist()
+    self.common = neighborhood.common_neighbor_counts(cg).tolist() if track_common else None
+
+  def overlap(self, e) -> float:
+    u, v = self.edge_u[e], self.edge_v[e]
+    union = self.degree[u] - 1 + self.degree[v] - 1 - self.common[e]
+    return self.common[e] / union if union > 0 else 0.0
+
+  # Removes edge e, returning the nodes whose neighborhoods changed.
+  def remove_edge(self, e):
+    u, v = self.edge_u[e], self.edge_v[e]
+    if self.common is not None and u != v:
+      # Every edge (u, x) with x also adjacent to v loses v as a common neighbor (and symmetrically); endpoints are
+      #   never common neighbors, so removing a self-loop changes none of the counts
+      for a, b in ((u, v), (v, u)):
+        for x, f in self.incident[a].items():
+          if x != b and x in self.incident[b]:
+            self.common[f] -= 1
+    del self.incident[u][v]
+    self.degree[u] -= 1
+    if u != v:
+      del self.incident[v][u]
+      self.degree[v] -= 1
+    return (u, v)
+
+  # Removes node v with all of its edges, returning its former neighbors.
+  def remove_node(self, v):
+    neighbors = list(self.incident[v])
+    for e in list(self.incident[v].values()):
+      self.remove_edge(e)
+    return neighbors
+
+
+# Adaptive attack order for the local scores ('degree' and 'overlap'): a lazy priority queue holds the current score of
+#   every alive node or edge; after each removal only the elements whose score can change are re-scored and pushed
+#   again (edges incident to the endpoints of a removed edge; neighbors of a removed node, plus their neighbors for the
+#   node overlap score), and stale queue entries are skipped by version number.
+def _adaptive_local_order(cg: CompactGraph, target, score, count, lowest_first):
+  graph = _AliveGraph(cg, track_common=score == "overlap")
+  sign = 1.0 if lowest_first else -1.0
+
+  if target == "edge":
+    def current(e):
+      return graph.degree[graph.edge_u[e]] * graph.degree[graph.edge_v[e]] if score == "degree" else graph.overlap(e)
+    size = cg.number_of_edges()
+  else:
+    def current(v):
+      if score == "degree":
+        return graph.degree[v]
+      edges = graph.incident[v].values()
+      return sum(graph.overlap(e) for e in edges) / len(edges) if edges else 0.0
+    size = cg.number_of_nodes()
+
+  version = [0] * size
+  removed = [False] * size
+  heap = [(sign * current(i), i, 0) for i in range(size)]
+  heapq.heapify(heap)
+  order = []
+  while heap and len(order) < count:
+    _, i, stamp = heapq.heappop(heap)
+    if removed[i] or stamp != version[i]:
+      continue
+    removed[i] = True
+    order.append(i)
+
+    if target == "edge":
+      u, v = graph.remove_edge(i)
+      stale = {f for node in (u, v) for f in graph.incident[node].values()}
+    else:
+      neighbors = graph.remove_node(i)
+      stale = set(neighbors)
+      if score == "overlap":
+        stale.update(x for w in neighbors for x in graph.incident[w])
+    for j in stale:
+      if not removed[j]:
+        version[j] += 1
+        heapq.heappush(heap, (sign * current(j), j, version[j]))
+  return np.asarray(order, dtype=np.int64)
+
+
+# Edge mask without the edges incident to the given nodes.
+def _node_edge_mask(cg: CompactGraph, removed_nodes):
+  removed = np.zeros(cg.number_of_nodes(), dtype=bool)
+  removed[removed_nodes] = True
+  return ~(removed[cg.edge_u] | removed[cg.edge_v])
+
+
+# Removal order of a targeted attack on the nodes or edges of `cg` (ids, first removed first), `count` long (all of
+#   them by default). Elements are ranked by `score` ('degree' - the degree product for edges, 'betweenness' or
+#   'overlap' - the mean incident overlap for nodes), highest first unless `lowest_first` (e.g. weak ties first).
+#   - Static attacks rank once on the intact graph.
+#   - Adaptive attacks re-rank after every removal. The local scores (degree, overlap) use a priority queue that only
+#     re-scores the neighborhood of each removal; betweenness is global, so it is recomputed on the remaining graph
+#     every `recompute_every` removals (optionally sampled through `betweenness_options`).
+#   Ties go to the lowest id.
+def attack_order(cg: CompactGraph, target="edge", score="degree", adaptive=False, count=None, lowest_first=False,
+                 betweenness_options=None, recompute_every=1):
+  if target not in TARGETS:
+    raise ValueError(f"Unknown attack target {target!r}, expected one of {TARGETS}.")
+  if score not in SCORES:
+    raise ValueError(f"Unknown attack score {score!r}, expected one of {SCORES}.")
+  size = cg.number_of_nodes() if target == "node" else cg.number_of_edges()
+  count = size if count is None else min(int(count), size)
+  sign = 1.0 if lowest_first else -1.0
+
+  if not adaptive:
+    values = scores(cg, target, score, betweenness_options=betweenness_options)
+    return np.lexsort((np.arange(size), sign * values))[:count]
+  if score != "betweenness":
+    return _adaptive_local_order(cg, target, score, count, lowest_first)
+
+  removed = np.zeros(size, dtype=bool)
+  order = []
+  while len(order) < count:
+    if target == "edge":
+      values = scores(cg, target, score, ~removed, betweenness_options)
+    else:
+      values = scores(cg, target, score, _node_edge_mask(cg, np.flatnonzero(removed)), betweenness_options)
+    ranking = np.lexsort((np.arange(size), sign * values))
+    batch = ranking[~removed[ranking]][:min(recompute_every, count - len(order))]
+    removed[batch] = True
+    order.extend(batch.tolist())
+  return np.asarray(order, dtype=np.int64)
@@ -0,0 +1,92 @@
+import numpy as np
+from utils.compact import CompactGraph
+from utils.components import component_labels
+
+# This module contains the structural balance engines (2-coloring of signed graphs and frustration index heuristic).
+
+
+# Boolean array aligned to the edge ids: True for the negative edges (missing signs count as positive).
+def negative_edges(cg: CompactGraph):
+  return cg.edge_attr("sign", default=1.0) < 0
+
+
+# Colors (0/1) every node from a BFS spanning forest of the signed graph: a node takes the color of the node it was
+#   reached from, flipped across negative edges. Every component is started from its first node, or from a random node
+#   (and reached through random parents) when `rng` is given. All the components are searched level by level at once,
+#   which takes linear time.
+def spanning_colors(cg: CompactGraph, negative, rng=None):
+  n = cg.number_of_nodes()
+  colors = np.full(n, -1, dtype=np.int8)
+  _, labels = component_labels(cg)
+  order = np.arange(n) if rng is None else rng.permutation(n)
+  _, first = np.unique(labels[order], return_index=True)
+  frontier = order[first]
+  colors[frontier] = 0
+
+  slot_negative = negative[cg.slot_edge].astype(np.int8)
+  slot_sources = cg.slot_sources()
+  while len(frontier):
+    slots = cg.slots_of(frontier)
+    if rng is not None:
+      slots = rng.permutation(slots)
+    slots = slots[colors[cg.indices[slots]] < 0]
+    # Every new node keeps the first slot that reached it as its tree edge
+    frontier, first = np.unique(cg.indices[slots], return_index=True)
+    slots = slots[first]
+    colors[frontier] = colors[slot_sources[slots]] ^ slot_negative[slots]
+  return colors
+
+
+# Edge ids whose sign disagrees with the node colors (positive edges across the two colors, negative edges inside one).
+#   Removing them leaves a balanced graph.
+def frustrated_edges(cg: CompactGraph, negative, colors):
+  return np.flatnonzero((colors[cg.edge_u] ^ colors[cg.edge_v]).astype(bool) != negative)
+
+
+# Checks structural balance (Harary): a signed graph is balanced iff its nodes can be split into two camps with every
+#   positive edge inside a camp and every negative edge across, i.e. iff the coloring of a spanning forest (see
+#   `spanning_colors`) frustrates no edge. Returns (is balanced, node colors, frustrated edge ids); on imbalanced
+#   graphs, the frustrated edges are a set whose removal balances the graph (each one closes a cycle with an odd
+#   number of negative edges).
+def structural_balance(cg: CompactGraph, negative=None):
+  negative = negative_edges(cg) if negative is None else np.asarray(negative, dtype=bool)
+  colors = spanning_colors(cg, negative)
+  frustrated = frustrated_edges(cg, negative, colors)
+  return len(frustrated) == 0, colors, frustrated
+
+
+# Improves a coloring by local search: in every round, each node that would frustrate fewer edges with the other
+#   color and beats all of its neighbors on that gain (ties broken at random) is flipped. The flipped nodes are never
+#   adjacent, so every round strictly lowers the number of frustrated edges.
+def _local_search(cg: CompactGraph, negative, colors, rng):
+  n = cg.number_of_nodes()
+  edges = cg.edge_u != cg.edge_v
+  edge_u, edge_v, negative = cg.edge_u[edges], cg.edge_v[edges], negative[edges]
+  colors = colors.copy()
+  while True:
+    change = np.where((colors[edge_u] ^ colors[edge_v]).astype(bool) != negative, 1.0, -1.0)
+    gain = np.bincount(edge_u, change, n) + np.bincount(edge_v, change, n)
+    priority = np.where(gain > 0, gain + 0.5 * rng.random(n), -np.inf)
+    if not np.isfinite(priority).any():
+      return colors
+    best_neighbor = np.full(n, -np.inf)
+    np.maximum.at(best_neighbor, edge_u, priority[edge_v])
+    np.maximum.at(best_neighbor, edge_v, priority[edge_u])
+    colors[priority > best_neighbor] ^= 1
+
+
+# Heuristic upper bound on the frustration index (the fewest edges whose removal balances the graph): the coloring of
+#   the deterministic spanning forest of `structural_balance` and those of `restarts` random spanning forests are
+#   improved by local search (see `_local_search`) and the best is kept, so the bound is never above the number of
+#   edges frustrated by `structural_balance`. Returns (number of frustrated edges, node colors, frustrated edge ids).
+def frustration_index(cg: CompactGraph, negative=None, restarts=4, seed=None):
+  negative = negative_edges(cg) if negative is None else np.asarray(negative, dtype=bool)
+  rng = np.random.default_rng(seed)
+  best = None
+  for restart in range(max(int(restarts), 0) + 1):
+    start = spanning_colors(cg, negative, None if restart == 0 else rng)
+    colors = _local_search(cg, negative, start, rng)
+    frustrated = frustrated_edges(cg, negative, colors)
+    if best is None or len(frustrated) < len(best[2]):
+      best = (len(frustrated), colors, frustrated)
+  return best
@@ -0,0 +1,291 @@
+import contextlib
+import numpy as np
+import scipy.sparse as sp
+from scipy.stats import norm
+from utils import parallel
+from utils.compact import CompactGraph
+
+# This module contains the betweenness centrality engines (batched Brandes) that run on the compact graph.
+
+# Default memory budget (in bytes) for the dense per-source matrices of one batch of Brandes sources.
+DEFAULT_BATCH_BYTES = 1 << 28
+
+
+# Splits `sources` into batches whose dense (n x batch) and (m x batch) matrices fit into `max_bytes`.
+def source_batches(cg: CompactGraph, sources, max_bytes=DEFAULT_BATCH_BYTES):
+  sources = np.asarray(sources, dtype=np.int64)
+  bytes_per_source = 8 * (6 * cg.number_of_nodes() + 3 * cg.number_of_edges())
+  batch_size = int(max(1, min(len(sources), max_bytes // max(bytes_per_source, 1))))
+  return [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+
+
+# Float CSR adjacency whose entries are the weights (1 by default) of the edges, aligned to the CSR slots of the
+#   compact graph, so an edge is removed in place by zeroing `data[cg.slot_edge == e]`.
+def weighted_adjacency(cg: CompactGraph, edge_weight=None):
+  n = cg.number_of_nodes()
+  weight = np.ones(cg.number_of_edges()) if edge_weight is None else np.asarray(edge_weight, dtype=np.float64)
+  return sp.csr_array((weight[cg.slot_edge], cg.indices, cg.indptr), shape=(n, n))
+
+
+# Whether the adjacency rows of `rows` hold at least a quarter of its slots, in which case a full product is cheaper
+#   than slicing them out.
+def _is_wide(adjacency, rows):
+  return int((adjacency.indptr[rows + 1] - adjacency.indptr[rows]).sum()) * 4 >= len(adjacency.indices)
+
+
+# Brandes' algorithm (2001) for a batch of sources at once, in its algebraic form: the forward phase counts the
+#   shortest paths (sigma) of all the sources level by level with one sparse-dense product per level, and the backward
+#   phase accumulates the dependencies (delta) the same way from the deepest level up. `adjacency` holds 0/1 edge
+#   weights (see `weighted_adjacency`), so removed edges are simply zeroed.
+#   A level whose frontier (the nodes on that level for some source of the batch) holds less than a quarter of the
+#   slots only works on the frontier rows and their neighbors: the product runs over the adjacency block between them,
+#   so the level costs the slots and (rows x batch) values it touches instead of all m edges and the whole (n x batch)
+#   matrices, which keeps long, thin levels (large diameters) from costing O(m) each. Wider levels use full products,
+#   which are cheaper than slicing most of the CSR rows out.
+#   Returns (node dependency matrix n x b, edge dependencies summed over the batch, distance matrix n x b).
+#   Every source counts the pairs it starts, so undirected sums count every pair twice (as in Brandes' algorithm).
+def brandes_batch(adjacency, sources, edge_u, edge_v, edge_alive=None):
+  n = adjacency.shape[0]
+  sources = np.asarray(sources, dtype=np.int64)
+  columns = np.arange(len(sources))
+  distance = np.full((n, len(sources)), -1, dtype=np.int32)
+  sigma = np.zeros((n, len(sources)))
+  distance[sources, columns] = 0
+  sigma[sources, columns] = 1.0
+
+  # Nodes on every level (for at least one source), from the sources down
+  level_rows = [np.unique(sources)]
+  level = 0
+  while True:
+    rows = level_rows[-1]
+    if _is_wide(adjacency, rows):
+      paths = adjacency @ np.where(distance == level, sigma, 0.0)
+      paths[distance >= 0] = 0.0
+      reached = paths > 0
+      targets = np.flatnonzero(reached.any(axis=1))
+      if not len(targets):
+        break
+      level += 1
+      distance[reached] = level
+      sigma += paths
+    else:
+      row_adjacency = adjacency[rows]
+      targets = np.unique(row_adjacency.indices[row_adjacency.data > 0])
+      paths = row_adjacency[:, targets].T @ np.where(distance[rows] == level, sigma[rows], 0.0)
+      paths[distance[targets] >= 0] = 0.0
+      reached = paths > 0
+      keep = reached.any(axis=1)
+      if not keep.any():
+        break
+      level += 1
+      targets, paths, reached = targets[keep], paths[keep], reached[keep]
+      distance[targets] = np.where(reached, level, distance[targets])
+      sigma[targets] += paths
+    level_rows.append(targets)
+
+  delta = np.zeros_like(sigma)
+  safe_sigma = np.where(sigma > 0, sigma, 1.0)
+  for depth in range(level, 0, -1):
+    rows, parents = level_rows[depth], level_rows[depth - 1]
+    if _is_wide(adjacency, rows):
+      coefficient = np.where(distance == depth, (1.0 + delta) / safe_sigma, 0.0)
+      delta += np.where(distance == depth - 1, sigma * (adjacency @ coefficient), 0.0)
+    else:
+      coefficient = np.where(distance[rows] == depth, (1.0 + delta[rows]) / safe_sigma[rows], 0.0)
+      propagated = adjacency[parents][:, rows] @ coefficient
+      delta[parents] += np.where(distance[parents] == depth - 1, sigma[parents] * propagated, 0.0)
+
+  # Edge dependencies: every DAG edge (a -> b, one level apart) carries sigma[a] / sigma[b] * (1 + delta[b])
+  distance_u, distance_v = distance[edge_u], distance[edge_v]
+  forward = (distance_u >= 0) & (distance_v == distance_u + 1)
+  backward = (distance_v >= 0) & (distance_u == distance_v + 1)
+  edge_dependency = np.where(forward, sigma[edge_u] / safe_sigma[edge_v] * (1.0 + delta[edge_v]), 0.0)
+  edge_dependency += np.where(backward, sigma[edge_v] / safe_sigma[edge_u] * (1.0 + delta[edge_u]), 0.0)
+  if edge_alive is not None:
+    edge_dependency *= np.asarray(edge_alive)[:, None]
+
+  delta[sources, columns] = 0.0
+  return delta, edge_dependency.sum(axis=1), distance
+
+
+# Raw (unnormalized, every pair counted from both ends) betweenness from the given sources, skipping the edges where
+#   `edge_mask` is False. Returns (node sums, edge sums, total dependency of every source).
+def raw_betweenness(cg: CompactGraph, sources=None, edge_mask=None, max_bytes=DEFAULT_BATCH_BYTES):
+  sources = np.arange(cg.number_of_nodes()) if sources is None else np.asarray(sources, dtype=np.int64)
+  adjacency = weighted_adjacency(cg, edge_mask)
+  node_total = np.zeros(cg.number_of_nodes())
+  edge_total = np.zeros(cg.number_of_edges())
+  source_totals = []
+  for batch in source_batches(cg, sources, max_bytes):
+    node_dependency, edge_dependency, _ = brandes_batch(adjacency, batch, cg.edge_u, cg.edge_v, edge_mask)
+    node_total += node_dependency.sum(axis=1)
+    edge_total += edge_dependency
+    source_totals.append(node_dependency.sum(axis=0))
+  return node_total, edge_total, np.concatenate(source_totals) if source_totals else np.zeros(0)
+
+
+# Worker task of the process pool: raw betweenness of a chunk of sources on the shared graph.
+def _raw_betweenness_task(sources, edge_mask, max_bytes):
+  return raw_betweenness(parallel.worker_graph(), sources, edge_mask, max_bytes)
+
+
+# Raw betweenness of `sources`, split into chunks over the process pool `executor` when one is given.
+def _run_sources(cg, sources, edge_mask, max_bytes, executor=None, workers=1):
+  if executor is None or len(sources) < 2:
+    return raw_betweenness(cg, sources, edge_mask, max_bytes)
+  chunks = np.array_split(sources, min(len(sources), 4 * workers))
+  futures = [executor.submit(_raw_betweenness_task, chunk, edge_mask, max_bytes) for chunk in chunks]
+  results = [future.result() for future in futures]
+  return (sum(result[0] for result in results), sum(result[1] for result in results),
+          np.concatenate([result[2] for result in results]))
+
+
+# Betweenness centrality of every node (scaled like `nx.betweenness_centrality`) and its average, as a dictionary.
+#   - Exact by default (every node is a source). With `workers` > 1 the sources are split over a process pool whose
+#     workers read the CSR arrays from shared memory (see `parallel.SharedGraph`) instead of receiving a pickled graph.
+#   - Passing `samples` and/or `target_error` switches to k-pivot sampling (Brandes & Pich, 2007): sources are drawn
+#     uniformly without replacement and the sums are scaled by n / k. With `target_error`, pivots are added in rounds
+#     until the relative half-width of the confidence interval of the average betweenness (with finite population
+#     correction) drops below it, `samples` pivots were used, or every node was used (the result is then exact).
+#   - `edge_mask` excludes the edges where it is False (e.g. failed edges) without building a new graph.
+def betweenness_stats(cg: CompactGraph, normalized=True, samples=None, target_error=None, confidence=0.95, seed=None,
+                      workers=None, edge_mask=None, max_bytes=DEFAULT_BATCH_BYTES):
+  num_nodes = cg.number_of_nodes()
+  scale = node_scale(num_nodes, normalized)
+  approximate = samples is not None or target_error is not None
+  max_samples = num_nodes if samples is None else min(int(samples), num_nodes)
+  order = np.random.default_rng(seed).permutation(num_nodes) if approximate else np.arange(num_nodes)
+  workers = parallel.default_workers(workers) if workers is not None else 1
+  z = norm.ppf(0.5 + confidence / 2)
+
+  with contextlib.ExitStack() as stack:
+    executor = None
+    if workers > 1:
+      executor = stack.enter_context(stack.enter_context(parallel.SharedGraph(cg)).executor(workers))
+
+    node_total = np.zeros(num_nodes)
+    source_totals = np.zeros(0)
+    used = 0
+    half_width = None
+    while used < max_samples:
+      # Exact runs (or fixed sample sizes) take every source at once, error targets grow the sample in rounds
+      step = max_samples - used if target_error is None else max(64 * workers, used)
+      batch = order[used:min(used + step, max_samples)]
+      node_sums, _, batch_totals = _run_sources(cg, batch, edge_mask, max_bytes, executor, workers)
+      node_total += node_sums
+      source_totals = np.concatenate((source_totals, batch_totals))
+      used += len(batch)
+
+      if approximate and used > 1:
+        finite_correction = 1 - used / num_nodes
+        half_width = z * source_totals.std(ddof=1) / np.sqrt(used) * np.sqrt(max(finite_correction, 0.0)) * scale
+        average = source_totals.mean() * scale
+        if target_error is not None and average > 0 and half_width / average <= target_error:
+          break
+
+  values = node_total * (num_nodes / used if used else 0.0) * scale
+  average = float(values.mean()) if num_nodes else 0.0
+  return {
+    "betweenness": values,
+    "average": average,
+    "approximate": approximate and used < num_nodes,
+    "samples": used,
+    "confidence": confidence,
+    "average_ci": (average - half_width, average + half_width) if approximate and half_width is not None else None,
+  }
+
+
+# Splits the raw node dependencies of `sources` by whether the source's shortest-path DAG contains one of the edges
+#   (removed_u[i], removed_v[i]) - i.e. whether the source reaches both endpoints at distances one apart.
+#   Returns (sum over unaffected sources, sum over affected sources, affected source ids).
+def _split_dependencies(cg: CompactGraph, sources, removed_u, removed_v, max_bytes=DEFAULT_BATCH_BYTES):
+  adjacency = weighted_adjacency(cg)
+  unaffected = np.zeros(cg.number_of_nodes())
+  affected = np.zeros(cg.number_of_nodes())
+  affected_sources = []
+  for batch in source_batches(cg, sources, max_bytes):
+    node_dependency, _, distance = brandes_batch(adjacency, batch, cg.edge_u, cg.edge_v)
+    distance_u, distance_v = distance[removed_u].astype(np.int64), distance[removed_v].astype(np.int64)
+    in_dag = ((distance_u >= 0) & (distance_v >= 0) & (np.abs(distance_u - distance_v) == 1)).any(axis=0)
+    unaffected += node_dependency[:, ~in_dag].sum(axis=1)
+    affected += node_dependency[:, in_dag].sum(axis=1)
+    affected_sources.append(batch[in_dag])
+  return unaffected, affected, np.concatenate(affected_sources) if affected_sources else np.zeros(0, dtype=np.int64)
+
+
+def _split_dependencies_task(sources, removed_u, removed_v, max_bytes):
+  return _split_dependencies(parallel.worker_graph(), sources, removed_u, removed_v, max_bytes)
+
+
+# Betweenness centrality before and after deleting `removed_edges` (edge ids), as two `betweenness_stats`-like
+#   dictionaries. The "before" pass keeps, for every source, whether its shortest-path DAG contains a removed edge, and
+#   sums the dependencies of the unaffected and affected sources separately; the "after" pass then only re-runs the
+#   affected sources on the masked graph, since the DAGs (and dependencies) of all the other sources are unchanged.
+#   With `samples`, only that many uniformly drawn pivots are used (scaled by n / k, as in `betweenness_stats`).
+def deletion_betweenness(cg: CompactGraph, removed_edges, normalized=True, samples=None, seed=None, workers=None,
+                         max_bytes=DEFAULT_BATCH_BYTES):
+  num_nodes = cg.number_of_nodes()
+  removed_edges = np.unique(np.asarray(removed_edges, dtype=np.int64))
+  removed_u, removed_v = cg.edge_u[removed_edges].astype(np.int64), cg.edge_v[removed_edges].astype(np.int64)
+  edge_mask = np.ones(cg.number_of_edges(), dtype=bool)
+  edge_mask[removed_edges] = False
+  sources = np.arange(num_nodes)
+  if samples is not None:
+    sources = np.random.default_rng(seed).permutation(num_nodes)[:min(int(samples), num_nodes)]
+  workers = parallel.default_workers(workers) if workers is not None else 1
+
+  with contextlib.ExitStack() as stack:
+    if workers > 1 and len(sources) > 1:
+      executor = stack.enter_context(stack.enter_context(parallel.SharedGraph(cg)).executor(workers))
+      chunks = np.array_split(sources, min(len(sources), 4 * workers))
+      futures = [executor.submit(_split_dependencies_task, chunk, removed_u, removed_v, max_bytes) for chunk in chunks]
+      results = [future.result() for future in futures]
+      unaffected = sum(result[0] for result in results)
+      affected = sum(result[1] for result in results)
+      affected_sources = np.concatenate([result[2] for result in results])
+    else:
+      executor = None
+      unaffected, affected, affected_sources = _split_dependencies(cg, sources, removed_u, removed_v, max_bytes)
+    updated, _, _ = _run_sources(cg, affected_sources, edge_mask, max_bytes, executor, workers)
+
+  scale = node_scale(num_nodes, normalized) * (num_nodes / len(sources) if len(sources) else 0.0)
+  before = _fixed_stats((unaffected + affected) * scale, len(sources), num_nodes)
+  after = _fixed_stats((unaffected + updated) * scale, len(sources), num_nodes)
+  after["updated_sources"] = len(affected_sources)
+  return before, after
+
+
+# Result dictionary of a betweenness computation over a fixed set of `used` sources (no confidence interval).
+def _fixed_stats(values, used, num_nodes):
+  return {
+    "betweenness": values,
+    "average": float(values.mean()) if num_nodes else 0.0,
+    "approximate": used < num_nodes,
+    "samples": used,
+    "confidence": None,
+    "average_ci": None,
+  }
+
+
+# Node betweenness centrality as an array aligned to the node ids, scaled like `nx.betweenness_centrality`.
+def betweenness_centrality(cg: CompactGraph, normalized=True, workers=None, max_bytes=DEFAULT_BATCH_BYTES):
+  return betweenness_stats(cg, normalized, workers=workers, max_bytes=max_bytes)["betweenness"]
+
+
+# Edge betweenness centrality as an array aligned to the edge ids, scaled like `nx.edge_betweenness_centrality`.
+def edge_betweenness_centrality(cg: CompactGraph, normalized=True, max_bytes=DEFAULT_BATCH_BYTES):
+  _, edge_total, _ = raw_betweenness(cg, max_bytes=max_bytes)
+  return edge_total * edge_scale(cg.number_of_nodes(), normalized)
+
+
+# Scale factors that turn the raw sums into NetworkX's (undirected) betweenness values.
+def node_scale(n: int, normalized=True) -> float:
+  if normalized:
+    return 1 / ((n - 1) * (n - 2)) if n > 2 else 1.0
+  return 0.5
+
+
+def edge_scale(n: int, normalized=True) -> float:
+  if normalized:
+    return 1 / (n * (n - 1)) if n > 1 else 1.0
+  return 0.5
@@ -0,0 +1,371 @@
+from collections import deque
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import eigsh
+from utils import betweenness, graph_io
+from utils.compact import CompactGraph
+from utils.components import component_labels_from_edges
+
+# This module contains the community detection engines used by `graph_analysis.py --components`.
+
+# Community detection methods selectable through `detect_communities`.
+METHODS = ("louvain", "label_propagation", "girvan_newman")
+
+# Suffix of the saved Girvan-Newman dendrogram, written next to the graph file.
+DENDROGRAM_SUFFIX = ".gn.npz"
+
+
+# Weighted symmetric adjacency of the compact graph as a float CSR matrix (unit weights).
+def _weighted_adjacency(cg: CompactGraph):
+  adjacency = cg.adjacency()
+  return sp.csr_array((np.ones(len(adjacency.indices)), adjacency.indices, adjacency.indptr), shape=adjacency.shape)
+
+
+# Renumbers community labels to 0..k-1 in the order of the first node of each community.
+def _relabel(labels):
+  _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+  rank = np.empty(len(first), dtype=np.int64)
+  rank[np.argsort(first)] = np.arange(len(first))
+  return rank[inverse.ravel()]
+
+
+# Sums the adjacency weights between every pair of communities (the quotient graph), including the diagonal.
+def _aggregate(adjacency, labels, num_communities):
+  membership = sp.csr_array((np.ones(len(labels)), (np.arange(len(labels)), labels)),
+                            shape=(len(labels), num_communities))
+  return (membership.T @ adjacency @ membership).tocsr()
+
+
+# Modularity of a partition given as a label array (Newman-Girvan, with an optional resolution parameter).
+def modularity(cg: CompactGraph, labels, resolution=1.0) -> float:
+  adjacency = _weighted_adjacency(cg)
+  total = adjacency.sum()
+  if total == 0:
+    return 0.0
+  labels = _relabel(labels)
+  quotient = _aggregate(adjacency, labels, labels.max() + 1)
+  strength = np.asarray(quotient.sum(axis=1)).ravel()
+  return float(quotient.diagonal().sum() / total - resolution * np.sum((strength / total) ** 2))
+
+
+# One Louvain local moving phase: every node moves to the neighboring community with the largest modularity gain.
+#   Nodes are visited from a queue (seeded in random order) and only the neighbors of a node that moved are queued
+#   again, as in Leiden's fast local moving, so converged regions are not rescanned. Returns the community of every node.
+def _local_moving(adjacency, resolution, rng):
+  num_nodes = adjacency.shape[0]
+  indptr, indices, weights = adjacency.indptr.tolist(), adjacency.indices.tolist(), adjacency.data.tolist()
+  strength = np.asarray(adjacency.sum(axis=1)).ravel().tolist()
+  total = float(sum(strength))
+  community = list(range(num_nodes))
+  community_strength = list(strength)
+
+  queue = deque(rng.permutation(num_nodes).tolist())
+  queued = [True] * num_nodes
+  while queue:
+    i = queue.popleft()
+    queued[i] = False
+    current, k_i = community[i], strength[i]
+    community_strength[current] -= k_i
+    links = {current: 0.0}
+    for slot in range(indptr[i], indptr[i + 1]):
+      j = indices[slot]
+      if j != i:
+        links[community[j]] = links.get(community[j], 0.0) + weights[slot]
+
+    best, best_gain = current, links[current] - resolution * community_strength[current] * k_i / total
+    for c, weight in links.items():
+      gain = weight - resolution * community_strength[c] * k_i / total
+      if gain > best_gain + 1e-12:
+        best, best_gain = c, gain
+    community_strength[best] += k_i
+    if best != current:
+      community[i] = best
+      for slot in range(indptr[i], indptr[i + 1]):
+        j = indices[slot]
+        if not queued[j] and community[j] != best:
+          queued[j] = True
+          queue.append(j)
+  return _relabel(np.asarray(community, dtype=np.int64))
+
+
+# Splits every community that is not connected into its connected components (the guarantee that Leiden's refinement
+#   adds on top of Louvain).
+def _split_disconnected(cg: CompactGraph, labels):
+  internal = labels[cg.edge_u] == labels[cg.edge_v]
+  _, pieces = component_labels_from_edges(cg.number_of_nodes(), cg.edge_u[internal], cg.edge_v[internal])
+  return _relabel(pieces)
+
+
+# Louvain community detection on the compact adjacency (Blondel et al., 2008): local moving followed by aggregation
+#   of the communities into a quotient graph, repeated until no level improves the modularity. Communities that end up
+#   disconnected are split into their connected components. Returns a label array numbered 0..k-1.
+def louvain_labels(cg: CompactGraph, resolution=1.0, seed=None):
+  rng = np.random.default_rng(seed)
+  num_nodes = cg.number_of_nodes()
+  adjacency = _weighted_adjacency(cg)
+  labels = np.arange(num_nodes, dtype=np.int64)
+  if adjacency.sum() == 0:
+    return labels
+
+  while True:
+    level = _local_moving(adjacency, resolution, rng)
+    num_communities = level.max() + 1
+    labels = level[labels]
+    if num_communities == adjacency.shape[0]:
+      break
+    adjacency = _aggregate(adjacency, level, num_communities)
+  return _split_disconnected(cg, labels)
+
+
+# Label propagation community detection (Raghavan et al., 2007), vectorized over the CSR slots: in every round a
+#   random half of the nodes adopts the most frequent label among its neighbors, which avoids the oscillations of fully
+#   synchronous updates. A node keeps its label while it is among the most frequent ones, other ties are broken at
+#   random. Stops once no label changes or after `max_iterations` rounds.
+def label_propagation_labels(cg: CompactGraph, seed=None, max_iterations=100):
+  rng = np.random.default_rng(seed)
+  num_nodes = cg.number_of_nodes()
+  labels = np.arange(num_nodes, dtype=np.int64)
+  sources = cg.slot_sources().astype(np.int64)
+  if not len(sources):
+    return labels
+
+  for _ in range(max_iterations):
+    # Counts every (node, neighbor label) pair, then keeps the most frequent label of every node
+    keys = sources * num_nodes + labels[cg.indices]
+    unique, counts = np.unique(keys, return_counts=True)
+    nodes, candidates = unique // num_nodes, unique % num_nodes
+    order = np.lexsort((rng.random(len(unique)), candidates != labels[nodes], -counts, nodes))
+    first = order[np.r_[True, nodes[order][1:] != nodes[order][:-1]]]
+
+    proposed = labels.copy()
+    proposed[nodes[first]] = candidates[first]
+    update = rng.random(num_nodes) < 0.5
+    changed = update & (proposed != labels)
+    labels[changed] = proposed[changed]
+    if not (proposed != labels).any():
+      break
+  return _split_disconnected(cg, labels)
+
+
+# Full Girvan-Newman dendrogram: the order in which the edges are removed (always the edge of largest betweenness,
+#   the lowest edge id among ties) and the number of components after every removal. Partitions for any number of
+#   communities are replayed from it with union-find, so it is computed once and saved next to the graph.
+class Dendrogram:
+  def __init__(self, num_nodes, edge_u, edge_v, removal_order, num_components, initial_components):
+    self.num_nodes = num_nodes
+    self.edge_u = np.asarray(edge_u)
+    self.edge_v = np.asarray(edge_v)
+    self.removal_order = np.asarray(removal_order, dtype=np.int64)
+    self.num_components = np.asarray(num_components, dtype=np.int64)
+    self.initial_components = int(initial_components)
+
+  # Numbers of communities of the successive dendrogram levels (the partitions `nx.community.girvan_newman` yields,
+  #   up to ties between edges of equal betweenness, which are broken here by the lowest edge id).
+  def levels(self):
+    return np.unique(self.num_components[self.num_components > self.initial_components])
+
+  # Labels of the first level with at least `num_communities` communities (the last level if none has that many).
+  def partition(self, num_communities: int):
+    target = max(num_communities, self.initial_components + 1)
+    reached = np.flatnonzero(self.num_components >= target)
+    removed = len(self.removal_order) if not len(reached) else reached[0] + 1
+    alive = np.ones(len(self.edge_u), dtype=bool)
+    alive[self.removal_order[:removed]] = False
+    _, labels = component_labels_from_edges(self.num_nodes, self.edge_u[alive], self.edge_v[alive])
+    return labels
+
+  def save(self, path: str, graph_key: str):
+    np.savez(path, removal_order=self.removal_order, num_components=self.num_components,
+             initial_components=self.initial_components, graph_key=graph_key)
+
+  # Loads a saved dendrogram of `cg`, or returns None when the file is missing or was built for another graph.
+  @classmethod
+  def load(cls, path: str, cg: CompactGraph, graph_key: str):
+    try:
+      with np.load(path, allow_pickle=False) as data:
+        if str(data["graph_key"]) != graph_key:
+          return None
+        return cls(cg.number_of_nodes(), cg.edge_u, cg.edge_v, data["removal_order"], data["num_components"],
+                   data["initial_components"])
+    except (OSError, ValueError, KeyError):
+      return None
+
+
+# BFS distances (-1 where unreached) from `source` over the alive edges, expanded frontier by frontier through the
+#   CSR slots, so it costs O(n + m) at most and only touches the component of `source`.
+def _bfs_distance(cg: CompactGraph, alive, source):
+  distance = np.full(cg.number_of_nodes(), -1, dtype=np.int64)
+  distance[source] = 0
+  frontier = np.array([source], dtype=np.int64)
+  level = 0
+  while len(frontier):
+    level += 1
+    slots = cg.slots_of(frontier)
+    targets = cg.indices[slots[alive[cg.slot_edge[slots]]]]
+    frontier = np.unique(targets[distance[targets] < 0]).astype(np.int64)
+    distance[frontier] = level
+  return distance
+
+
+# Computes the whole Girvan-Newman dendrogram incrementally. Removing an edge (u, v) only changes the shortest-path DAGs
+#   of the sources that reach u and v at distances one apart, which all lie in the component of the edge. Those
+#   sources are found from two BFS runs (from u and from v, whose distances are the distances of every source to u and
+#   v), so no per-source distances are kept between removals and memory stays O(n + m) on top of the Brandes batches.
+#   Only the affected sources are re-run with the batched Brandes engine, once before the removal to subtract their old
+#   edge dependencies and once after it to add the new ones.
+def girvan_newman_dendrogram(cg: CompactGraph, max_bytes=betweenness.DEFAULT_BATCH_BYTES) -> Dendrogram:
+  num_nodes = cg.number_of_nodes()
+  edge_u, edge_v = cg.edge_u.astype(np.int64), cg.edge_v.astype(np.int64)
+  alive = edge_u != edge_v
+  adjacency = betweenness.weighted_adjacency(cg, alive)
+  initial_components, _ = component_labels_from_edges(num_nodes, edge_u[alive], edge_v[alive])
+  edge_total = np.zeros(len(edge_u))
+
+  # Adds (sign=+1) or subtracts (sign=-1) the edge dependencies of `sources`
+  def accumulate(sources, sign):
+    nonlocal edge_total
+    for batch in betweenness.source_batches(cg, sources, max_bytes):
+      _, edge_dependency, _ = betweenness.brandes_batch(adjacency, batch, edge_u, edge_v, alive)
+      edge_total += sign * edge_dependency
+
+  accumulate(np.arange(num_nodes), 1)
+  removal_order, num_components = [], []
+  count = initial_components
+  while alive.any():
+    scores = np.where(alive, edge_total, -np.inf)
+    best = scores.max()
+    e = int(np.flatnonzero(scores >= best - 1e-9 * max(abs(best), 1.0))[0])
+    u, v = edge_u[e], edge_v[e]
+
+    du, dv = _bfs_distance(cg, alive, u), _bfs_distance(cg, alive, v)
+    affected = np.flatnonzero((du >= 0) & (dv >= 0) & (np.abs(du - dv) == 1))
+    accumulate(affected, -1)
+    alive[e] = False
+    adjacency.data[cg.slot_edge == e] = 0.0
+    accumulate(affected, 1)
+    edge_total[e] = 0.0
+
+    count += int(_bfs_distance(cg, alive, u)[v] < 0)
+    removal_order.append(e)
+    num_components.append(count)
+  return Dendrogram(num_nodes, edge_u, edge_v, removal_order, num_components, initial_components)
+
+
+# Girvan-Newman partition with at least `num_communities` communities (the first level of the dendrogram that reaches
+#   it). The dendrogram is computed once (see `girvan_newman_dendrogram`) and reused from `dendrogram_path` when given.
+def girvan_newman_labels(cg: CompactGraph, num_communities: int, dendrogram_path=None):
+  return _relabel(girvan_newman_tree(cg, dendrogram_path).partition(num_communities))
+
+
+# Loads the Girvan-Newman dendrogram of `cg` from `path`, or computes it and saves it there.
+def girvan_newman_tree(cg: CompactGraph, path=None) -> Dendrogram:
+  graph_key = graph_io.graph_hash(cg)
+  dendrogram = Dendrogram.load(path, cg, graph_key) if path else None
+  if dendrogram is None:
+    dendrogram = girvan_newman_dendrogram(cg)
+    if path:
+      try:
+        dendrogram.save(path, graph_key)
+      except OSError as e:
+        print(f"Warning: could not write the dendrogram {path}: {e}")
+  return dendrogram
+
+
+# Greedily merges the pair of communities with the largest modularity gain (the CNM step) until only
+#   `num_communities` are left. Communities with no edges between them are merged smallest-first.
+def merge_communities(cg: CompactGraph, labels, num_communities: int, resolution=1.0):
+  labels = _relabel(labels)
+  count = labels.max() + 1 if len(labels) else 0
+  if count <= num_communities:
+    return labels
+
+  adjacency = _weighted_adjacency(cg)
+  total = max(adjacency.sum(), 1.0)
+  quotient = _aggregate(adjacency, labels, count).tocoo()
+  strength = dict(enumerate(np.asarray(quotient.sum(axis=1)).ravel().tolist()))
+  links = {c: {} for c in range(count)}
+  for a, b, weight in zip(quotient.row.tolist(), quotient.col.tolist(), quotient.data.tolist()):
+    if a != b:
+      links[a][b] = weight
+  merged_into = np.arange(count)
+
+  while len(links) > num_communities:
+    best, best_gain = None, -np.inf
+    for a, neighbors in links.items():
+      for b, weight in neighbors.items():
+        gain = weight - resolution * strength[a] * strength[b] / total
+        if a < b and gain > best_gain:
+          best, best_gain = (a, b), gain
+    if best is None:
+      # No community is adjacent to another: merge the two with the smallest strength (smallest modularity loss)
+      a, b = sorted(links, key=lambda c: (strength[c], c))[:2]
+    else:
+      a, b = best
+
+    # Folds community b into community a
+    for c, weight in links.pop(b).items():
+      if c == a:
+        continue
+      links[a][c] = links[a].get(c, 0.0) + weight
+      links[c][a] = links[a][c]
+      del links[c][b]
+    links[a].pop(b, None)
+    strength[a] += strength.pop(b)
+    merged_into[merged_into == b] = a
+  return _relabel(merged_into[labels])
+
+
+# Splits the community of `nodes` in two along the Fiedler vector of its Laplacian (median cut).
+def _bisect(cg: CompactGraph, nodes):
+  sub = _weighted_adjacency(cg)[nodes][:, nodes]
+  laplacian = sp.diags(np.asarray(sub.sum(axis=1)).ravel()) - sub
+  if len(nodes) <= 3:
+    vector = np.arange(len(nodes), dtype=np.float64)
+  else:
+    _, vectors = np.linalg.eigh(laplacian.toarray()) if len(nodes) < 500 else \
+      eigsh(laplacian.astype(np.float64), k=2, sigma=-1e-3, which="LM")
+    vector = vectors[:, 1]
+  half = np.argsort(vector, kind="stable")[len(nodes) // 2:]
+  split = np.zeros(len(nodes), dtype=bool)
+  split[half] = True
+  return split
+
+
+# Splits the largest communities until there are `num_communities` of them. A community is first re-partitioned with
+#   Louvain on its own subgraph; when that cannot split it (e.g. a clique), it is bisected spectrally.
+def split_communities(cg: CompactGraph, labels, num_communities: int, resolution=1.0, seed=None):
+  labels = _relabel(labels).copy()
+  num_communities = min(num_communities, cg.number_of_nodes())
+  while labels.max() + 1 < num_communities:
+    count = labels.max() + 1
+    largest = int(np.argmax(np.bincount(labels)))
+    nodes = np.flatnonzero(labels == largest)
+    sub = cg.node_subgraph(nodes)
+    parts = louvain_labels(sub, resolution, seed)
+    if parts.max() == 0:
+      parts = _bisect(cg, nodes).astype(np.int64)
+    labels[nodes] = np.where(parts == 0, largest, count + parts - 1)
+    if labels.max() + 1 > num_communities:
+      labels = merge_communities(cg, labels, num_communities, resolution)
+  return _relabel(labels)
+
+
+# Detects communities with the selected `method` ('louvain', 'label_propagation' or 'girvan_newman'). When
+#   `num_communities` is given, the partition is merged or split to exactly that many communities (Girvan-Newman
+#   keeps its own first dendrogram level with at least that many, read from or saved to `dendrogram_path`).
+#   Returns a label array numbered 0..k-1 in the order of the first node of each community.
+def detect_communities(cg: CompactGraph, num_communities=None, method="louvain", resolution=1.0, seed=None,
+                       dendrogram_path=None):
+  if method == "girvan_newman":
+    return girvan_newman_labels(cg, num_communities or 2, dendrogram_path)
+  if method == "louvain":
+    labels = louvain_labels(cg, resolution, seed)
+  elif method == "label_propagation":
+    labels = label_propagation_labels(cg, seed)
+  else:
+    raise ValueError(f"Unknown community detection method {method!r}, expected one of {METHODS}.")
+
+  if num_communities:
+    labels = merge_communities(cg, labels, num_communities, resolution)
+    labels = split_communities(cg, labels, num_communities, resolution, seed)
+  return labels
@@ -0,0 +1,311 @@
+from collections.abc import Mapping
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+# This module contains the compact graph representation shared by every analysis in `helper.py`.
+
+
+# Picks the smallest integer dtype able to hold node ids for a graph with `n` nodes.
+def index_dtype(n: int):
+  return np.int32 if n < np.iinfo(np.int32).max else np.int64
+
+
+# Marks an array as read-only so the compact graph stays immutable once built.
+def _freeze(array):
+  array = np.asarray(array)
+  if array.flags.writeable:
+    array.setflags(write=False)
+  return array
+
+
+# Compact, immutable CSR (compressed sparse row) adjacency for undirected graphs.
+#   - `indptr`/`indices` hold the adjacency; the neighbors of node i are indices[indptr[i]:indptr[i+1]], sorted.
+#   - `slot_edge` maps every CSR slot back to its edge id, so each undirected edge is stored once in `edge_u`/`edge_v`.
+#   - `labels` maps int ids back to the original node labels (e.g. the GML labels), `label_to_id` goes the other way.
+#     Labels may also be a range (ids are the labels) or a NumPy array (e.g. memory-mapped); `label_to_id` is only
+#     built the first time a label is looked up.
+#   - `edge_attrs` holds numeric edge attributes (such as 'sign') aligned to the edge ids.
+#   - `node_attrs` holds node attributes aligned to the node ids (None where the attribute is missing).
+class CompactGraph:
+  __slots__ = ("indptr", "indices", "slot_edge", "edge_u", "edge_v", "labels", "_label_to_id",
+               "edge_attrs", "node_attrs", "_adjacency")
+
+  def __init__(self, indptr, indices, slot_edge, edge_u, edge_v, labels=None, edge_attrs=None, node_attrs=None):
+    self.indptr = _freeze(indptr)
+    self.indices = _freeze(indices)
+    self.slot_edge = _freeze(slot_edge)
+    self.edge_u = _freeze(edge_u)
+    self.edge_v = _freeze(edge_v)
+    num_nodes = len(self.indptr) - 1
+    if labels is None:
+      self.labels = range(num_nodes)
+    elif isinstance(labels, (range, LabelArray)):
+      self.labels = labels
+    elif isinstance(labels, np.ndarray):
+      self.labels = LabelArray(labels)
+    else:
+      self.labels = list(labels)
+    self._label_to_id = None
+    self.edge_attrs = _freeze_columns(edge_attrs)
+    self.node_attrs = _freeze_columns(node_attrs)
+    self._adjacency = None
+
+  # Builds the CSR arrays from an undirected edge list given as two id arrays (one entry per edge).
+  #   The edge list is expected to be simple (no duplicates); self-loops are stored once in the adjacency.
+  @classmethod
+  def from_edges(cls, num_nodes, edge_u, edge_v, labels=None, edge_attrs=None, node_attrs=None):
+    dtype = index_dtype(num_nodes)
+    edge_u = np.asarray(edge_u, dtype=dtype)
+    edge_v = np.asarray(edge_v, dtype=dtype)
+    num_edges = len(edge_u)
+    edge_ids = np.arange(num_edges, dtype=index_dtype(num_edges))
+
+    # Every non-loop edge appears in the adjacency of both endpoints
+    loops = edge_u == edge_v
+    src = np.concatenate((edge_u, edge_v[~loops]))
+    dst = np.concatenate((edge_v, edge_u[~loops]))
+    slot_edge = np.concatenate((edge_ids, edge_ids[~loops]))
+
+    # Sorting by (source, target) gives sorted neighbor lists, which the merge-based routines rely on
+    order = np.argsort(src.astype(np.int64) * num_nodes + dst, kind="stable")
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+
+    return cls(indptr, dst[order], slot_edge[order], edge_u, edge_v, labels, edge_attrs, node_attrs)
+
+  # Builds the compact graph from a NetworkX graph, preserving node order, edge order and edge orientation.
+  @classmethod
+  def from_networkx(cls, graph: nx.Graph):
+    labels = list(graph.nodes())
+    label_to_id = {label: i for i, label in enumerate(labels)}
+    num_edges = graph.number_of_edges()
+    edge_u = np.fromiter((label_to_id[u] for u, _ in graph.edges()), dtype=np.int64, count=num_edges)
+    edge_v = np.fromiter((label_to_id[v] for _, v in graph.edges()), dtype=np.int64, count=num_edges)
+
+    # Numeric edge attributes become arrays aligned to the edge ids (NaN where missing), others are kept as they are
+    edge_attrs = {}
+    edge_data = [data for _, _, data in graph.edges(data=True)]
+    for name in {key for data in edge_data for key in data}:
+      values = [data.get(name) for data in edge_data]
+      if not all(value is None or _is_number(value) for value in values):
+        edge_attrs[name] = object_array(values)
+      elif all(isinstance(value, (int, np.integer)) for value in values):
+        edge_attrs[name] = np.asarray(values, dtype=np.int64)
+      else:
+        edge_attrs[name] = np.asarray([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    # Node attributes are kept as they are (None where missing)
+    node_attrs = {}
+    node_data = [data for _, data in graph.nodes(data=True)]
+    for name in {key for data in node_data for key in data}:
+      node_attrs[name] = object_array([data.get(name) for data in node_data])
+
+    return cls.from_edges(len(labels), edge_u, edge_v, labels, edge_attrs, node_attrs)
+
+  # Converts the compact graph back into a NetworkX graph with the original labels and attributes.
+  def to_networkx(self) -> nx.Graph:
+    graph = nx.Graph()
+    node_columns = [(name, values.tolist() if values.dtype != object else values) for name, values in self.node_attrs.items()]
+    for i, label in enumerate(self.labels):
+      graph.add_node(label, **{name: values[i] for name, values in node_columns if _is_present(values[i])})
+    edge_columns = [(name, values.tolist() if values.dtype != object else values) for name, values in self.edge_attrs.items()]
+    for e, (u, v) in enumerate(zip(self.edge_u.tolist(), self.edge_v.tolist())):
+      graph.add_edge(self.labels[u], self.labels[v], **{name: values[e] for name, values in edge_columns if _is_present(values[e])})
+    return graph
+
+  # Label -> id mapping, built on first use.
+  @property
+  def label_to_id(self):
+    if self._label_to_id is None:
+      self._label_to_id = {label: i for i, label in enumerate(self.labels)}
+    return self._label_to_id
+
+  def __len__(self):
+    return self.number_of_nodes()
+
+  def __repr__(self):
+    return f"CompactGraph(n={self.number_of_nodes()}, m={self.number_of_edges()})"
+
+  def number_of_nodes(self) -> int:
+    return len(self.indptr) - 1
+
+  def number_of_edges(self) -> int:
+    return len(self.edge_u)
+
+  # Degree of every node as an array (a self-loop counts once).
+  @property
+  def degree(self):
+    return np.diff(self.indptr)
+
+  # Neighbors of node id `i` as a read-only view into `indices`.
+  def neighbors(self, i: int):
+    return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+  # Edge ids incident to node id `i`, aligned with `neighbors(i)`.
+  def incident_edges(self, i: int):
+    return self.slot_edge[self.indptr[i]:self.indptr[i + 1]]
+
+  # CSR slot positions of all the neighbors of the given node ids, concatenated in order.
+  def slots_of(self, nodes):
+    nodes = np.asarray(nodes, dtype=np.int64)
+    starts = self.indptr[nodes]
+    counts = self.indptr[nodes + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(len(offsets))
+
+  # Source node id of every CSR slot (the row that `indices` belongs to).
+  def slot_sources(self):
+    return np.repeat(np.arange(self.number_of_nodes(), dtype=self.indices.dtype), self.degree)
+
+  # Returns the id of a node label. Falls back to the str/int form of the label, since the CLI passes ints
+  #   while GML labels are read in as strings.
+  def id_of(self, label) -> int:
+    if isinstance(self.labels, range) and isinstance(label, (int, np.integer, str)):
+      try:
+        if 0 <= int(label) < len(self.labels):
+          return int(label)
+      except ValueError:
+        pass
+      raise KeyError(f"Node {label!r} is not in the graph.")
+    if label in self.label_to_id:
+      return self.label_to_id[label]
+    if str(label) in self.label_to_id:
+      return self.label_to_id[str(label)]
+    try:
+      return self.label_to_id[int(label)]
+    except (ValueError, TypeError, KeyError):
+      raise KeyError(f"Node {label!r} is not in the graph.") from None
+
+  def ids_of(self, labels):
+    return np.fromiter((self.id_of(label) for label in labels), dtype=self.indices.dtype)
+
+  def labels_of(self, ids):
+    return [self.labels[i] for i in np.asarray(ids).tolist()]
+
+  # Edge labels as (u, v) pairs, in edge id order.
+  def edge_labels(self):
+    return [(self.labels[u], self.labels[v]) for u, v in zip(self.edge_u.tolist(), self.edge_v.tolist())]
+
+  # Returns a numeric edge attribute as an array, replacing missing entries with `default`.
+  def edge_attr(self, name: str, default=np.nan):
+    if name not in self.edge_attrs:
+      return np.full(self.number_of_edges(), default, dtype=np.float64)
+    values = self.edge_attrs[name]
+    if values.dtype == object:
+      values = np.asarray([np.nan if value is None else value for value in values], dtype=np.float64)
+    if values.dtype.kind == "f" and not (isinstance(default, float) and np.isnan(default)):
+      values = np.where(np.isnan(values), default, values)
+    return values
+
+  # SciPy CSR matrix view of the adjacency (built once, shares `indptr`/`indices`).
+  def adjacency(self):
+    if self._adjacency is None:
+      n = self.number_of_nodes()
+      data = np.ones(len(self.indices), dtype=np.int32)
+      self._adjacency = sp.csr_array((data, self.indices, self.indptr), shape=(n, n))
+    return self._adjacency
+
+  # Returns a new compact graph that keeps only the edges where `edge_mask` is True.
+  def edge_subgraph(self, edge_mask):
+    edge_mask = np.asarray(edge_mask, dtype=bool)
+    edge_attrs = {name: values[edge_mask] for name, values in self.edge_attrs.items()}
+    return CompactGraph.from_edges(self.number_of_nodes(), self.edge_u[edge_mask], self.edge_v[edge_mask],
+                                   self.labels, edge_attrs, self.node_attrs)
+
+  # Returns the subgraph induced by the given node ids (renumbered in the given order), with its attributes.
+  def node_subgraph(self, nodes):
+    nodes = np.asarray(nodes, dtype=np.int64)
+    new_id = np.full(self.number_of_nodes(), -1, dtype=np.int64)
+    new_id[nodes] = np.arange(len(nodes))
+    edge_mask = (new_id[self.edge_u] >= 0) & (new_id[self.edge_v] >= 0)
+    labels = self.labels[nodes[0]:nodes[-1] + 1] if isinstance(self.labels, range) and np.all(np.diff(nodes) == 1) \
+      else self.labels_of(nodes)
+    edge_attrs = {name: values[edge_mask] for name, values in self.edge_attrs.items()}
+    node_attrs = {name: values[nodes] for name, values in self.node_attrs.items()}
+    return CompactGraph.from_edges(len(nodes), new_id[self.edge_u[edge_mask]], new_id[self.edge_v[edge_mask]],
+                                   labels, edge_attrs, node_attrs)
+
+  # Returns a new compact graph with the given node attribute columns added (or replaced); the arrays are shared.
+  def with_node_attrs(self, **columns):
+    node_attrs = {name: self.node_attrs[name] for name in self.node_attrs}
+    node_attrs.update(columns)
+    graph = CompactGraph(self.indptr, self.indices, self.slot_edge, self.edge_u, self.edge_v, self.labels,
+                         self.edge_attrs, node_attrs)
+    graph._label_to_id = self._label_to_id
+    return graph
+
+
+# Builds a 1-D object array from a list, even when the items are lists themselves.
+def object_array(items):
+  array = np.empty(len(items), dtype=object)
+  for i, item in enumerate(items):
+    array[i] = item
+  return array
+
+
+# Read-only view over a label array (e.g. memory-mapped) that hands out plain Python labels.
+class LabelArray:
+  __slots__ = ("array",)
+
+  def __init__(self, array):
+    self.array = array
+
+  def __len__(self):
+    return len(self.array)
+
+  def __getitem__(self, i):
+    return self.array[i].tolist()
+
+  def __iter__(self):
+    for start in range(0, len(self.array), 1 << 16):
+      yield from self.array[start:start + (1 << 16)].tolist()
+
+
+# Attribute columns that are only decoded when first accessed (e.g. categorical columns of a memory-mapped graph).
+#   `loaders` maps every attribute name to a function returning its array.
+class LazyColumns(Mapping):
+  def __init__(self, loaders):
+    self._loaders = dict(loaders)
+    self._columns = {}
+
+  def __getitem__(self, name):
+    if name not in self._columns:
+      self._columns[name] = _freeze(self._loaders[name]())
+    return self._columns[name]
+
+  def __iter__(self):
+    return iter(self._loaders)
+
+  def __len__(self):
+    return len(self._loaders)
+
+
+def _freeze_columns(columns):
+  if isinstance(columns, LazyColumns):
+    return columns
+  return {name: _freeze(values) for name, values in (columns or {}).items()}
+
+
+# Missing attribute values are None (object columns) or NaN (float columns).
+def _is_present(value) -> bool:
+  return value is not None and not (isinstance(value, float) and np.isnan(value))
+
+
+def _is_number(value) -> bool:
+  return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool)
+
+
+# Returns `graph` as a CompactGraph, converting NetworkX graphs once.
+def as_compact(graph) -> CompactGraph:
+  if isinstance(graph, CompactGraph):
+    return graph
+  return CompactGraph.from_networkx(graph)
+
+
+# Returns `graph` as a NetworkX graph, for the analyses that still rely on NetworkX algorithms.
+def as_networkx(graph) -> nx.Graph:
+  if isinstance(graph, CompactGraph):
+    return graph.to_networkx()
+  return graph
+
@@ -0,0 +1,163 @@
+import numpy as np
+from utils.compact import CompactGraph
+
+# This module contains the connected component engine (union-find) that runs off the edge list.
+
+
+# Disjoint-set forest with union by rank and path compression over node ids 0..n-1.
+#   `add_edge` updates the components incrementally (one edge at a time), while `union_edges` merges a whole
+#   edge list at once with vectorized root hooking followed by pointer jumping.
+class UnionFind:
+  __slots__ = ("parent", "rank", "size", "num_components")
+
+  def __init__(self, num_nodes: int):
+    self.parent = np.arange(num_nodes, dtype=np.int64)
+    self.rank = np.zeros(num_nodes, dtype=np.int64)
+    self.size = np.ones(num_nodes, dtype=np.int64)
+    self.num_components = num_nodes
+
+  def __len__(self):
+    return len(self.parent)
+
+  # Adds `count` new singleton nodes (e.g. nodes that first appear in a temporal edge list).
+  def add_nodes(self, count: int):
+    start = len(self.parent)
+    self.parent = np.concatenate((self.parent, np.arange(start, start + count, dtype=np.int64)))
+    self.rank = np.concatenate((self.rank, np.zeros(count, dtype=np.int64)))
+    self.size = np.concatenate((self.size, np.ones(count, dtype=np.int64)))
+    self.num_components += count
+
+  # Returns the root of `x`, compressing the path behind it.
+  def find(self, x: int) -> int:
+    parent = self.parent
+    root = x
+    while parent[root] != root:
+      root = parent[root]
+    while parent[x] != root:
+      parent[x], x = root, parent[x]
+    return int(root)
+
+  # Merges the components of `u` and `v`. Returns True if they were different components.
+  def add_edge(self, u: int, v: int) -> bool:
+    root_u, root_v = self.find(u), self.find(v)
+    if root_u == root_v:
+      return False
+    if self.rank[root_u] < self.rank[root_v]:
+      root_u, root_v = root_v, root_u
+    self.parent[root_v] = root_u
+    self.size[root_u] += self.size[root_v]
+    if self.rank[root_u] == self.rank[root_v]:
+      self.rank[root_u] += 1
+    self.num_components -= 1
+    return True
+
+  def connected(self, u: int, v: int) -> bool:
+    return self.find(u) == self.find(v)
+
+  # Root of every node, fully compressing the forest by pointer jumping.
+  def roots(self):
+    parent = self.parent
+    while True:
+      grandparent = parent[parent]
+      if np.array_equal(grandparent, parent):
+        return parent
+      parent[:] = grandparent
+
+  # Merges the components of every (edge_u[i], edge_v[i]) pair at once.
+  #   Each round hooks the lower-ranked root of every unmerged edge under the higher-ranked one (ties broken by id,
+  #   which keeps the hooks acyclic), then compresses every path; rounds repeat until all endpoints share a root.
+  def union_edges(self, edge_u, edge_v):
+    edge_u = np.asarray(edge_u, dtype=np.int64)
+    edge_v = np.asarray(edge_v, dtype=np.int64)
+    roots = self.roots()
+    while len(edge_u):
+      root_u, root_v = roots[edge_u], roots[edge_v]
+      pending = root_u != root_v
+      if not pending.any():
+        break
+      edge_u, edge_v, root_u, root_v = edge_u[pending], edge_v[pending], root_u[pending], root_v[pending]
+
+      # Orders every pair so that `child` has the lower (rank, id) key
+      swap = (self.rank[root_u] > self.rank[root_v]) | ((self.rank[root_u] == self.rank[root_v]) & (root_u > root_v))
+      child = np.where(swap, root_v, root_u)
+      new_parent = np.where(swap, root_u, root_v)
+
+      # A root hooked by several edges keeps only one of them; the others are retried next round
+      self.parent[child] = new_parent
+      hooked = np.unique(child[self.parent[child] == new_parent])
+      new_roots = self.parent[hooked]
+      equal_rank = self.rank[hooked] == self.rank[new_roots]
+      np.maximum.at(self.rank, new_roots[equal_rank], self.rank[hooked[equal_rank]] + 1)
+      self.num_components -= len(hooked)
+      roots = self.roots()
+
+    # Hooks can chain within a round, so the sizes of the roots are recounted once at the end
+    counts = np.bincount(roots, minlength=len(roots))
+    is_root = roots == np.arange(len(roots))
+    self.size[is_root] = counts[is_root]
+    return self
+
+  # Component label of every node, numbered 0..k-1 by the first node of each component.
+  def labels(self):
+    _, first, inverse = np.unique(self.roots(), return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(len(first))
+    return rank[inverse]
+
+
+# Labels the connected components of an edge list over `num_nodes` nodes. Returns (number of components, labels).
+def component_labels_from_edges(num_nodes, edge_u, edge_v):
+  union_find = UnionFind(num_nodes).union_edges(edge_u, edge_v)
+  return union_find.num_components, union_find.labels()
+
+
+# Labels the connected components of the compact graph. Returns (number of components, label per node id).
+def component_labels(cg: CompactGraph):
+  return component_labels_from_edges(cg.number_of_nodes(), cg.edge_u, cg.edge_v)
+
+
+# Connected components as a label array, with the node and edge lists of each component only materialized
+#   when they are asked for (e.g. when plotting). Iterating yields (sorted node labels, edge set, color) per
+#   component, in the order of the first node of each component.
+class Components:
+  available_colors = ['red', 'blue', 'green', 'purple', 'orange', 'cyan', 'yellow', 'brown', 'pink', 'black']
+
+  def __init__(self, cg: CompactGraph, labels=None):
+    self.cg = cg
+    if labels is None:
+      _, labels = component_labels(cg)
+    self.labels = labels
+    self.sizes = np.bincount(labels, minlength=labels.max() + 1 if len(labels) else 0)
+    self._node_order = self._node_offsets = None
+    self._edge_order = self._edge_offsets = None
+
+  def __len__(self):
+    return len(self.sizes)
+
+  def __getitem__(self, c):
+    return self.nodes(c), self.edges(c), self.color(c)
+
+  def __iter__(self):
+    for c in range(len(self)):
+      yield self[c]
+
+  def color(self, c: int) -> str:
+    return self.available_colors[c % len(self.available_colors)]
+
+  # Sorted labels of the nodes in component `c`.
+  def nodes(self, c: int):
+    if self._node_order is None:
+      self._node_order = np.argsort(self.labels, kind="stable")
+      self._node_offsets = np.concatenate(([0], np.cumsum(self.sizes)))
+    ids = self._node_order[self._node_offsets[c]:self._node_offsets[c + 1]]
+    return sorted(self.cg.labels_of(ids))
+
+  # Set of (u, v) label pairs of the edges in component `c`.
+  def edges(self, c: int):
+    if self._edge_order is None:
+      edge_labels = self.labels[self.cg.edge_u]
+      self._edge_order = np.argsort(edge_labels, kind="stable")
+      self._edge_offsets = np.concatenate(([0], np.cumsum(np.bincount(edge_labels, minlength=len(self)))))
+    edge_ids = self._edge_order[self._edge_offsets[c]:self._edge_offsets[c + 1]]
+    labels = self.cg.labels
+    return {(labels[u], labels[v]) for u, v in zip(self.cg.edge_u[edge_ids].tolist(), self.cg.edge_v[edge_ids].tolist())}
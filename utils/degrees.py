@@ -0,0 +1,171 @@
+import numpy as np
+from scipy import optimize, special
+from utils.compact import CompactGraph
+
+# This module contains the degree statistics engines (assortativity, distribution and fits, k-cores, rich club).
+
+# Largest number of candidate lower cut-offs tried by `fit_power_law`.
+MAX_KMIN_CANDIDATES = 200
+
+
+# Degree of every node as NetworkX counts it (a self-loop adds 2).
+def degree_array(cg: CompactGraph):
+  loops = np.bincount(cg.edge_u[cg.edge_u == cg.edge_v], minlength=cg.number_of_nodes())
+  return cg.degree.astype(np.int64) + loops
+
+
+# Degree assortativity (as `nx.degree_assortativity_coefficient`): the Pearson correlation of the degrees at both ends
+#   of every edge, counting every non-loop edge in both orientations and every self-loop once. Computed from weighted
+#   sums over the edge list, without materializing the pairs. NaN when every end has the same degree.
+def degree_assortativity(cg: CompactGraph, degree=None) -> float:
+  degree = degree_array(cg) if degree is None else degree
+  du, dv = degree[cg.edge_u].astype(np.float64), degree[cg.edge_v].astype(np.float64)
+  loops = cg.edge_u == cg.edge_v
+  # Ordered (x, y) pairs: both orientations of every non-loop edge, one of every self-loop
+  ends = np.concatenate((du, dv[~loops]))
+  total = len(ends)
+  if total == 0:
+    return float("nan")
+  mean = ends.mean()
+  variance = (ends ** 2).mean() - mean ** 2
+  covariance = (2 * (du * dv)[~loops].sum() + (du * dv)[loops].sum()) / total - mean ** 2
+  return float(covariance / variance) if variance > 1e-12 * max(mean ** 2, 1) else float("nan")
+
+
+# Degree distribution: the distinct degrees, how many nodes have each, their fraction and the complementary
+#   cumulative distribution P(K >= k), as a dictionary of arrays.
+def degree_distribution(degree):
+  values, counts = np.unique(degree, return_counts=True)
+  total = counts.sum()
+  ccdf = np.cumsum(counts[::-1])[::-1] / total if total else counts.astype(np.float64)
+  return {'degree': values, 'count': counts, 'pmf': counts / max(total, 1), 'ccdf': ccdf}
+
+
+# Power-law exponent (discrete MLE approximation of Clauset, Shalizi & Newman, 2009) of the degrees >= kmin, given as
+#   distinct values with their counts.
+def _power_law_alpha(values, counts, kmin):
+  tail = values >= kmin
+  n = counts[tail].sum()
+  return 1 + n / (counts[tail] * np.log(values[tail] / (kmin - 0.5))).sum()
+
+
+# Per-degree log-likelihoods of the power law above kmin, in the same continuous approximation as the exponent
+#   (degrees as continuous values above kmin - 0.5).
+def _power_law_loglik(values, alpha, kmin):
+  return np.log(alpha - 1) - np.log(kmin - 0.5) - alpha * np.log(values / (kmin - 0.5))
+
+
+# Per-degree log-likelihoods of the log-normal distribution truncated below kmin (kmin - 0.5 as above).
+def _lognormal_loglik(values, mu, sigma, kmin):
+  tail = 0.5 * special.erfc((np.log(kmin - 0.5) - mu) / (sigma * np.sqrt(2)))
+  z = (np.log(values) - mu) / sigma
+  return -np.log(values * sigma * np.sqrt(2 * np.pi)) - z * z / 2 - np.log(np.maximum(tail, 1e-300))
+
+
+# Maximum likelihood log-normal (mu, sigma) of the degrees >= kmin, truncated below kmin.
+def _fit_lognormal(values, counts, kmin):
+  logs = np.log(values)
+  mean = np.average(logs, weights=counts)
+  std = max(np.sqrt(np.average((logs - mean) ** 2, weights=counts)), 1e-3)
+
+  def loss(params):
+    return -(counts * _lognormal_loglik(values, params[0], np.exp(params[1]), kmin)).sum()
+
+  result = optimize.minimize(loss, (mean, np.log(std)), method="Nelder-Mead")
+  return float(result.x[0]), float(np.exp(result.x[1]))
+
+
+# Fits a power law to the tail of a degree sequence, as a dictionary.
+#   - The lower cut-off `kmin` (unless given) is the distinct degree whose power-law fit has the smallest
+#     Kolmogorov-Smirnov distance to the empirical tail (at most `MAX_KMIN_CANDIDATES` candidates are tried).
+#   - A log-normal truncated at the same kmin is fitted too, and the two are compared with the Vuong log-likelihood
+#     ratio test: a positive `loglik_ratio` favors the power law, and `p_value` tells whether its sign is significant.
+def fit_power_law(degree, kmin=None):
+  values, counts = np.unique(np.asarray(degree)[np.asarray(degree) > 0], return_counts=True)
+  if len(values) < 2:
+    return None
+
+  def ks_distance(k):
+    tail = values >= k
+    alpha = _power_law_alpha(values, counts, k)
+    empirical = np.cumsum(counts[tail]) / counts[tail].sum()
+    # CDF of the (continuous approximation of the) power law at the upper end of every distinct degree
+    model = 1 - ((values[tail] + 0.5) / (k - 0.5)) ** (1 - alpha)
+    return np.abs(empirical - model).max()
+
+  if kmin is None:
+    # A tail needs a few distinct degrees to be fitted
+    candidates = values[:-2] if len(values) > 2 else values[:1]
+    if len(candidates) > MAX_KMIN_CANDIDATES:
+      candidates = np.unique(candidates[np.linspace(0, len(candidates) - 1, MAX_KMIN_CANDIDATES).astype(int)])
+    kmin = int(min(candidates, key=ks_distance))
+  tail = values >= kmin
+  values, counts = values[tail], counts[tail]
+  alpha = float(_power_law_alpha(values, counts, kmin))
+  mu, sigma = _fit_lognormal(values, counts, kmin)
+
+  differences = _power_law_loglik(values, alpha, kmin) - _lognormal_loglik(values, mu, sigma, kmin)
+  n = counts.sum()
+  ratio = float((counts * differences).sum())
+  spread = np.sqrt(np.average((differences - ratio / n) ** 2, weights=counts))
+  p_value = float(special.erfc(abs(ratio) / (np.sqrt(2 * n) * spread))) if spread > 0 else 1.0
+  return {'kmin': kmin, 'alpha': alpha, 'tail_nodes': int(n), 'ks_distance': float(ks_distance(kmin)),
+          'lognormal_mu': mu, 'lognormal_sigma': sigma, 'loglik_ratio': ratio, 'p_value': p_value}
+
+
+# Core number of every node (the largest k such that the node belongs to the k-core), by peeling: every round removes
+#   at once all the nodes whose remaining degree is at most the current k, and lowers the degrees of their neighbors
+#   with one bincount over their CSR slots. Self-loops are ignored.
+def core_numbers(cg: CompactGraph):
+  n = cg.number_of_nodes()
+  not_loop = (cg.indices != cg.slot_sources())
+  remaining = np.bincount(cg.slot_sources()[not_loop], minlength=n).astype(np.int64)
+  core = np.full(n, -1, dtype=np.int64)
+  alive = np.ones(n, dtype=bool)
+  k = 0
+  while alive.any():
+    k = max(k, int(remaining[alive].min()))
+    peel = np.flatnonzero(alive & (remaining <= k))
+    while len(peel):
+      core[peel] = k
+      alive[peel] = False
+      slots = cg.slots_of(peel)
+      slots = slots[not_loop[slots]]
+      remaining -= np.bincount(cg.indices[slots], minlength=n)
+      peel = np.flatnonzero(alive & (remaining <= k))
+  return core
+
+
+# Rich-club coefficient (unnormalized, as `nx.rich_club_coefficient`) for every degree k while more than one node
+#   has a degree above k: the density of the edges among the nodes of degree > k. Returns (degrees, coefficients).
+def rich_club(cg: CompactGraph, degree=None):
+  degree = degree_array(cg) if degree is None else degree
+  if len(degree) == 0:
+    return np.zeros(0, dtype=np.int64), np.zeros(0)
+  ks = np.arange(degree.max())
+  nodes_above = len(degree) - np.searchsorted(np.sort(degree), ks, side="right")
+  lower_end = np.sort(np.minimum(degree[cg.edge_u], degree[cg.edge_v]))
+  edges_above = len(lower_end) - np.searchsorted(lower_end, ks, side="right")
+  keep = nodes_above > 1
+  ks, nodes_above, edges_above = ks[keep], nodes_above[keep], edges_above[keep]
+  return ks, 2 * edges_above / (nodes_above * (nodes_above - 1))
+
+
+# Every degree statistic of `cg` from one degree array and the edge endpoint arrays, as a dictionary.
+def degree_statistics(cg: CompactGraph, fit=True):
+  degree = degree_array(cg)
+  core = core_numbers(cg)
+  ks, coefficients = rich_club(cg, degree)
+  return {
+    'nodes': cg.number_of_nodes(),
+    'edges': cg.number_of_edges(),
+    'mean_degree': float(degree.mean()) if len(degree) else 0.0,
+    'max_degree': int(degree.max()) if len(degree) else 0,
+    'assortativity': degree_assortativity(cg, degree),
+    'distribution': degree_distribution(degree),
+    'power_law': fit_power_law(degree) if fit else None,
+    'core_number': core,
+    'degeneracy': int(core.max()) if len(core) else 0,
+    'core_sizes': np.bincount(core) if len(core) else np.zeros(0, dtype=np.int64),
+    'rich_club': {'degree': ks, 'coefficient': coefficients},
+  }
@@ -0,0 +1,70 @@
+import numpy as np
+from utils.compact import CompactGraph, index_dtype
+from utils.components import UnionFind
+
+# This module contains the fast random graph generators, which produce edge arrays without building an nx.Graph.
+
+# Default number of candidate-pair skips drawn per chunk.
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+# Maps linear indices of the node pairs {(u, v) : u < v}, enumerated as (0,1), (0,2), (1,2), (0,3), ..., back to (u, v).
+def _pair_from_index(index):
+  v = ((1 + np.sqrt(1 + 8 * index.astype(np.float64))) // 2).astype(np.int64)
+  # Corrects the float rounding of the square root for very large indices
+  v -= (v * (v - 1) // 2) > index
+  v += ((v + 1) * v // 2) <= index
+  u = index - v * (v - 1) // 2
+  return u, v
+
+
+# Yields the edges of a G(n, p) Erdos-Renyi graph in chunks of (u, v) arrays, with geometric skipping
+#   (Batagelj & Brandes, 2005): the gaps between consecutive chosen pairs are geometric with parameter p, so only
+#   O(n + m) random numbers are drawn instead of one per candidate pair. Reproducible for a given `seed`.
+def erdos_renyi_edge_chunks(num_nodes: int, p: float, seed=None, chunk_size=DEFAULT_CHUNK_SIZE):
+  if not 0 <= p <= 1:
+    raise ValueError(f"The edge probability p must be in [0, 1], got {p}.")
+  rng = np.random.default_rng(seed)
+  num_pairs = num_nodes * (num_nodes - 1) // 2
+  if p == 0 or num_pairs == 0:
+    return
+  if p == 1:
+    for start in range(0, num_pairs, chunk_size):
+      yield _pair_from_index(np.arange(start, min(start + chunk_size, num_pairs), dtype=np.int64))
+    return
+
+  position = -1
+  while True:
+    indices = position + np.cumsum(rng.geometric(p, size=chunk_size), dtype=np.int64)
+    position = indices[-1]
+    done = position >= num_pairs
+    if done:
+      indices = indices[indices < num_pairs]
+    if len(indices):
+      yield _pair_from_index(indices)
+    if done:
+      return
+
+
+# Generates a G(n, p) Erdos-Renyi graph directly as a CompactGraph (node labels 0..n-1).
+def fast_erdos_renyi_graph(num_nodes: int, p: float, seed=None) -> CompactGraph:
+  chunks = list(erdos_renyi_edge_chunks(num_nodes, p, seed))
+  dtype = index_dtype(num_nodes)
+  edge_u = np.concatenate([u for u, _ in chunks]).astype(dtype) if chunks else np.zeros(0, dtype=dtype)
+  edge_v = np.concatenate([v for _, v in chunks]).astype(dtype) if chunks else np.zeros(0, dtype=dtype)
+  return CompactGraph.from_edges(num_nodes, edge_u, edge_v)
+
+
+# Streams the edges of a G(n, p) Erdos-Renyi graph straight to a `source,target` CSV file, chunk by chunk, without
+#   keeping the edges in memory. The connected components are tracked with union-find as the chunks are written.
+#   Returns (number of edges written, UnionFind of the generated graph).
+def write_erdos_renyi_edges(path: str, num_nodes: int, p: float, seed=None, chunk_size=DEFAULT_CHUNK_SIZE):
+  union_find = UnionFind(num_nodes)
+  num_edges = 0
+  with open(path, "w") as f:
+    f.write("source,target\n")
+    for edge_u, edge_v in erdos_renyi_edge_chunks(num_nodes, p, seed, chunk_size):
+      f.write("".join(f"{u},{v}\n" for u, v in zip(edge_u.tolist(), edge_v.tolist())))
+      union_find.union_edges(edge_u, edge_v)
+      num_edges += len(edge_u)
+  return num_edges, union_find
@@ -0,0 +1,411 @@
+import hashlib
+import itertools
+import json
+import os
+import time
+import networkx as nx
+import numpy as np
+from utils.compact import CompactGraph, LabelArray, LazyColumns, as_compact, as_networkx, object_array
+
+# This module contains the graph loaders and writers, including the binary (.npz) graph cache and the
+#   memory-mapped (.csr directory) layout.
+
+# Version of the binary layout, stored in every file so stale layouts are never misread.
+FORMAT_VERSION = 2
+
+# Suffix of the sidecar cache written next to a parsed GML file (e.g. data/graph.gml -> data/graph.gml.npz).
+CACHE_SUFFIX = ".npz"
+
+# Suffix of the memory-mapped layout: a directory with one .npy file per array plus a meta.json.
+MMAP_SUFFIX = ".csr"
+
+# Delimiters of the supported edge-list formats, by extension.
+EDGE_LIST_DELIMITERS = {".csv": ",", ".tsv": "\t"}
+
+# Default number of rows parsed per chunk when streaming an edge list.
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+
+# Hashes a file in chunks, without reading it into memory at once.
+def file_hash(path: str) -> str:
+  digest = hashlib.blake2b(digest_size=20)
+  with open(path, "rb") as f:
+    for chunk in iter(lambda: f.read(1 << 20), b""):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+# Content hash of a compact graph's structure (node count and edge list), used to key results derived from it.
+def graph_hash(cg: CompactGraph) -> str:
+  digest = hashlib.blake2b(digest_size=20)
+  digest.update(np.int64(cg.number_of_nodes()).tobytes())
+  digest.update(np.ascontiguousarray(cg.edge_u, dtype=np.int64).tobytes())
+  digest.update(np.ascontiguousarray(cg.edge_v, dtype=np.int64).tobytes())
+  return digest.hexdigest()
+
+
+# Fingerprint of a source file: its mtime, size and content hash (the hash is skipped with `with_hash=False`).
+def _fingerprint(path: str, with_hash=True) -> dict:
+  stat = os.stat(path)
+  fingerprint = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+  if with_hash:
+    fingerprint["hash"] = file_hash(path)
+  return fingerprint
+
+
+# Encodes an attribute column into plain NumPy arrays that can be saved without pickling.
+#   Numeric arrays are stored as they are; object arrays (None where missing) are stored as int, float or
+#   categorical string values with a presence mask, falling back to JSON strings for anything else.
+def _encode_column(values):
+  values = np.asarray(values)
+  if values.dtype != object:
+    return "numeric", {"values": values}
+
+  present = np.array([value is not None for value in values], dtype=bool)
+  items = [value for value in values if value is not None]
+  if all(isinstance(item, (int, np.integer)) and not isinstance(item, bool) for item in items):
+    kind, encoded = "int", np.zeros(len(values), dtype=np.int64)
+  elif all(isinstance(item, (int, float, np.integer, np.floating)) and not isinstance(item, bool) for item in items):
+    kind, encoded = "float", np.zeros(len(values), dtype=np.float64)
+  elif all(isinstance(item, str) for item in items):
+    categories, codes = np.unique(np.asarray(items, dtype=str), return_inverse=True) if items else (np.zeros(0, dtype=str), [])
+    encoded = np.full(len(values), -1, dtype=np.int64)
+    encoded[present] = codes
+    return "str", {"values": encoded, "categories": categories}
+  else:
+    kind, encoded = "json", np.full(len(values), "", dtype=object)
+    encoded[present] = [json.dumps(item) for item in items]
+    encoded = encoded.astype(str)
+  if kind != "json":
+    encoded[present] = items
+  return kind, {"values": encoded, "present": present}
+
+
+# Decodes an attribute column written by `_encode_column` (object arrays with None where missing).
+def _decode_column(kind, arrays):
+  if kind == "numeric":
+    return arrays["values"]
+  values = np.empty(len(arrays["values"]), dtype=object)
+  if kind == "str":
+    codes = np.asarray(arrays["values"])
+    present = codes >= 0
+    values[present] = np.asarray(arrays["categories"])[codes[present]].tolist()
+    return values
+  present = np.asarray(arrays["present"])
+  raw = np.asarray(arrays["values"])[present]
+  if kind == "json":
+    values[present] = object_array([json.loads(item) for item in raw.tolist()])
+  else:
+    values[present] = raw.tolist()
+  return values
+
+
+# Splits a compact graph into the named arrays and the JSON metadata shared by the binary layouts.
+def _pack(cg: CompactGraph, source=None):
+  arrays = {
+    "indptr": cg.indptr,
+    "indices": cg.indices,
+    "slot_edge": cg.slot_edge,
+    "edge_u": cg.edge_u,
+    "edge_v": cg.edge_v,
+  }
+  range_labels = isinstance(cg.labels, range)
+  int_labels = range_labels or all(isinstance(label, (int, np.integer)) and not isinstance(label, bool) for label in cg.labels)
+  if isinstance(cg.labels, LabelArray):
+    arrays["labels"] = cg.labels.array
+  elif not range_labels:
+    arrays["labels"] = np.asarray(cg.labels, dtype=np.int64 if int_labels else str)
+
+  meta = {"version": FORMAT_VERSION, "range_labels": range_labels, "source": source, "node_attrs": {}, "edge_attrs": {}}
+  for group, attrs in (("node_attrs", cg.node_attrs), ("edge_attrs", cg.edge_attrs)):
+    for i, (name, values) in enumerate(attrs.items()):
+      kind, encoded = _encode_column(values)
+      meta[group][name] = {"kind": kind, "key": f"{group}_{i}", "parts": list(encoded)}
+      for part, array in encoded.items():
+        arrays[f"{group}_{i}_{part}"] = array
+  return arrays, meta
+
+
+# Rebuilds a compact graph from the arrays and metadata of `_pack`. `load(key)` returns the array stored under `key`.
+#   Numeric attribute columns are used as they are; the other columns are decoded lazily, on first access.
+def _unpack(meta, load, path) -> CompactGraph:
+  if meta.get("version") != FORMAT_VERSION:
+    raise ValueError(f"{path} uses binary graph format version {meta.get('version')}, expected {FORMAT_VERSION}.")
+  labels = None if meta["range_labels"] else load("labels")
+
+  attrs = {}
+  for group in ("node_attrs", "edge_attrs"):
+    loaders = {}
+    for name, spec in meta[group].items():
+      parts = {part: load(f"{spec['key']}_{part}") for part in spec["parts"]}
+      loaders[name] = lambda kind=spec["kind"], parts=parts: _decode_column(kind, parts)
+    attrs[group] = LazyColumns(loaders)
+
+  return CompactGraph(load("indptr"), load("indices"), load("slot_edge"), load("edge_u"), load("edge_v"),
+                      labels, attrs["edge_attrs"], attrs["node_attrs"])
+
+
+# Saves a compact graph in the binary (.npz) layout: CSR arrays, labels, node/edge attribute columns and metadata.
+#   `source` optionally records the fingerprint of the file the graph was parsed from (used by the GML cache).
+def save_compact(cg: CompactGraph, path: str, source=None):
+  arrays, meta = _pack(cg, source)
+  arrays["meta"] = np.asarray(json.dumps(meta))
+
+  # Writes to a temporary file first so a crash never leaves a truncated file behind
+  temp_path = f"{path}.tmp"
+  with open(temp_path, "wb") as f:
+    np.savez(f, **arrays)
+  os.replace(temp_path, path)
+
+
+# Reads the metadata of a binary graph file.
+def _read_meta(data) -> dict:
+  return json.loads(str(data["meta"]))
+
+
+# Loads a compact graph saved by `save_compact` (the arrays are read into memory).
+def load_compact(path: str) -> CompactGraph:
+  with np.load(path, allow_pickle=False) as data:
+    arrays = {key: data[key] for key in data.files}
+  return _unpack(json.loads(str(arrays["meta"])), arrays.__getitem__, path)
+
+
+# Saves a compact graph in the memory-mappable layout: a directory with one .npy file per array and a meta.json.
+def save_mmap(cg: CompactGraph, path: str):
+  arrays, meta = _pack(cg)
+  os.makedirs(path, exist_ok=True)
+  for key, array in arrays.items():
+    np.save(os.path.join(path, f"{key}.npy"), np.asarray(array))
+  with open(os.path.join(path, "meta.json"), "w") as f:
+    json.dump(meta, f)
+
+
+# Loads a graph saved by `save_mmap` with every array memory-mapped read-only (zero-copy): pages are only read
+#   when touched and are shared by every process mapping the same files.
+def load_mmap(path: str) -> CompactGraph:
+  with open(os.path.join(path, "meta.json")) as f:
+    meta = json.load(f)
+  return _unpack(meta, lambda key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r"), path)
+
+
+# Path of the sidecar cache of a source file.
+def cache_path(path: str) -> str:
+  return path + CACHE_SUFFIX
+
+
+# Parses `path` with `parse` into a compact graph, reusing the sidecar binary cache while the source file is
+#   unchanged. The source is only hashed when its mtime or size differ from the cached ones: an equal hash then
+#   reuses the cached graph (and records the new mtime), a different one re-parses the source. The cache is
+#   (re)written whenever its fingerprint is out of date.
+def _read_cached(path: str, parse, use_cache=True) -> CompactGraph:
+  sidecar = cache_path(path)
+  stat = _fingerprint(path, with_hash=False)
+  fingerprint = None
+  if use_cache and os.path.exists(sidecar):
+    try:
+      with np.load(sidecar, allow_pickle=False) as data:
+        cached = _read_meta(data).get("source") or {}
+      if all(cached.get(key) == value for key, value in stat.items()):
+        return load_compact(sidecar)
+      fingerprint = _fingerprint(path)
+      if cached.get("hash") == fingerprint["hash"]:
+        cg = load_compact(sidecar)
+        _write_cache(cg, sidecar, fingerprint)
+        return cg
+    except (OSError, ValueError, KeyError):
+      pass
+
+  cg = parse(path)
+  if use_cache:
+    _write_cache(cg, sidecar, fingerprint or _fingerprint(path))
+  return cg
+
+
+# Writes the sidecar cache of a parsed source file, warning instead of failing when it cannot be written.
+def _write_cache(cg: CompactGraph, sidecar: str, fingerprint: dict):
+  try:
+    save_compact(cg, sidecar, source=fingerprint)
+  except OSError as e:
+    print(f"Warning: could not write the graph cache {sidecar}: {e}")
+
+
+# Reads a GML file into a compact graph (through the sidecar binary cache).
+def read_gml(path: str, use_cache=True) -> CompactGraph:
+  return _read_cached(path, lambda source: CompactGraph.from_networkx(nx.read_gml(source)), use_cache)
+
+
+# Maps node labels to consecutive ids across the chunks of an edge list, through a hash map from label to id: every
+#   chunk costs one np.unique and one lookup per distinct label in it, independently of the labels seen before. New
+#   labels get the next ids in sorted order.
+class _LabelIndex:
+  def __init__(self):
+    self.ids = {}
+    self.labels = []
+    self.num_labels = 0
+
+  def map(self, values):
+    unique, inverse = np.unique(values, return_inverse=True)
+    ids = np.fromiter((self.ids.setdefault(label, len(self.ids)) for label in unique.tolist()),
+                      dtype=np.int64, count=len(unique))
+    new = ids >= self.num_labels
+    self.labels.append(unique[new])
+    self.num_labels = len(self.ids)
+    return ids[inverse]
+
+  def label_array(self):
+    return np.concatenate(self.labels) if self.labels else np.zeros(0, dtype=np.int64)
+
+
+# Keeps only the first occurrence of every edge key, preserving arrival order.
+def _first_occurrences(keys, columns):
+  _, first = np.unique(keys, return_index=True)
+  first.sort()
+  return keys[first], {name: values[first] for name, values in columns.items()}
+
+
+# Raised by `_stream_edge_list` when a node label does not parse as an integer.
+class _NonIntegerLabel(ValueError):
+  pass
+
+
+# Streams a CSV/TSV edge list into a compact graph in chunks of `chunk_rows` rows, so memory is bounded by the
+#   distinct edges and nodes rather than by the raw rows. Duplicate edges (in either direction) keep their first
+#   occurrence and self-loops are dropped. The endpoints come from the 'source'/'target' columns (or the first two
+#   columns when there is no header); a 'sign' column and any numeric `attr_columns` become edge attributes.
+#   Node labels are integers when every label of the file parses as one, otherwise strings: the file is streamed with
+#   integer labels first, and streamed again with string labels as soon as a chunk holds a non-integer label, so the
+#   label type never depends on `chunk_rows`.
+def read_edge_list(path: str, attr_columns=(), delimiter=None, chunk_rows=DEFAULT_CHUNK_ROWS, verbose=True) -> CompactGraph:
+  start_time = time.perf_counter()
+  if delimiter is None:
+    delimiter = EDGE_LIST_DELIMITERS.get(os.path.splitext(path)[1].lower(), ",")
+  try:
+    keys, columns, label_index, num_rows, num_loops = _stream_edge_list(path, attr_columns, delimiter, chunk_rows, np.int64)
+  except _NonIntegerLabel:
+    keys, columns, label_index, num_rows, num_loops = _stream_edge_list(path, attr_columns, delimiter, chunk_rows, str)
+
+  # Attributes that only hold integers (such as signs) are stored as integers
+  edge_attrs = {}
+  for name, values in columns.items():
+    edge_attrs[name] = values.astype(np.int64) if np.all(np.isfinite(values)) and np.all(values == np.round(values)) else values
+
+  cg = CompactGraph.from_edges(label_index.num_labels, keys >> 32, keys & 0xFFFFFFFF, label_index.label_array(), edge_attrs)
+  if verbose:
+    elapsed = time.perf_counter() - start_time
+    print(f"Read {num_rows} rows from {path} in {elapsed:.2f}s ({num_rows / max(elapsed, 1e-9):,.0f} edges/s): "
+          f"{cg.number_of_nodes()} nodes, {cg.number_of_edges()} unique edges, "
+          f"{num_rows - num_loops - cg.number_of_edges()} duplicates and {num_loops} self-loops dropped")
+  return cg
+
+
+# One streaming pass of `read_edge_list` with node labels parsed as `label_dtype` (raises `_NonIntegerLabel` when
+#   an integer parse fails). Returns (distinct edge keys, attribute columns, label index, rows, self-loops).
+def _stream_edge_list(path, attr_columns, delimiter, chunk_rows, label_dtype):
+  with open(path) as f:
+    first_line = f.readline()
+    header = [name.strip() for name in first_line.rstrip("\n").split(delimiter)]
+    has_header = not all(_is_numeric_text(name) for name in header[:2])
+    if has_header:
+      source_col = header.index("source") if "source" in header else 0
+      target_col = header.index("target") if "target" in header else 1
+      missing = [name for name in attr_columns if name not in header]
+      if missing:
+        raise ValueError(f"Edge list {path} has no column(s) {missing}.")
+      attr_names = (["sign"] if "sign" in header and "sign" not in attr_columns else []) + list(attr_columns)
+      attr_cols = [header.index(name) for name in attr_names]
+    else:
+      source_col, target_col, attr_names, attr_cols = 0, 1, [], []
+    lines = f if has_header else itertools.chain([first_line], f)
+
+    label_index = _LabelIndex()
+    buffered_keys, buffered_columns = [], {name: [] for name in attr_names}
+    kept_keys, kept_columns = np.zeros(0, dtype=np.int64), {name: np.zeros(0) for name in attr_names}
+    num_rows = num_loops = 0
+
+    while True:
+      chunk = list(itertools.islice(lines, chunk_rows))
+      if not chunk:
+        break
+      num_rows += len(chunk)
+
+      try:
+        endpoints = _read_columns(chunk, delimiter, (source_col, target_col), label_dtype)
+      except ValueError as e:
+        if label_dtype is str:
+          raise
+        raise _NonIntegerLabel(str(e)) from e
+      ids = label_index.map(endpoints.ravel()).reshape(-1, 2)
+
+      # Undirected edge keys (low id, high id), without self-loops
+      low, high = ids.min(axis=1), ids.max(axis=1)
+      keep = low != high
+      num_loops += int((~keep).sum())
+      buffered_keys.append((low[keep] << 32) | high[keep])
+      if attr_cols:
+        values = _read_columns(chunk, delimiter, attr_cols, np.float64)
+        for i, name in enumerate(attr_names):
+          buffered_columns[name].append(values[keep, i])
+
+      # Compacts the buffer once it outgrows the distinct edges kept so far
+      if sum(len(keys) for keys in buffered_keys) > max(len(kept_keys), chunk_rows):
+        kept_keys, kept_columns = _first_occurrences(
+          np.concatenate([kept_keys] + buffered_keys),
+          {name: np.concatenate([kept_columns[name]] + buffered_columns[name]) for name in attr_names})
+        buffered_keys, buffered_columns = [], {name: [] for name in attr_names}
+
+  keys, columns = _first_occurrences(
+    np.concatenate([kept_keys] + buffered_keys),
+    {name: np.concatenate([kept_columns[name]] + buffered_columns[name]) for name in attr_names})
+  return keys, columns, label_index, num_rows, num_loops
+
+
+# Parses the given columns of a chunk of delimited lines into a 2-D array.
+def _read_columns(lines, delimiter, columns, dtype):
+  values = np.loadtxt(lines, delimiter=delimiter, usecols=columns, dtype=dtype, ndmin=2)
+  return np.char.strip(values) if dtype is str else values
+
+
+def _is_numeric_text(text: str) -> bool:
+  try:
+    float(text)
+    return True
+  except ValueError:
+    return False
+
+
+# Loads a graph file as a compact graph, picking the format by extension: .npz binary, .csr memory-mapped,
+#   .csv/.tsv edge lists (streamed, then cached like GML files), otherwise GML.
+def load_graph(path: str, use_cache=True) -> CompactGraph:
+  path = path.rstrip("/")
+  if path.endswith(".npz"):
+    return load_compact(path)
+  if path.endswith(MMAP_SUFFIX):
+    return load_mmap(path)
+  if os.path.splitext(path)[1].lower() in EDGE_LIST_DELIMITERS:
+    return _read_cached(path, read_edge_list, use_cache)
+  return read_gml(path, use_cache)
+
+
+# Writes a graph (compact or NetworkX), picking the format by extension (.npz binary, .csr memory-mapped, otherwise GML).
+def write_graph(graph, path: str):
+  path = path.rstrip("/")
+  if path.endswith(".npz"):
+    save_compact(as_compact(graph), path)
+  elif path.endswith(MMAP_SUFFIX):
+    save_mmap(as_compact(graph), path)
+  else:
+    nx.write_gml(as_networkx(graph), path)
+
+
+# Writes an analysis report (a dictionary, e.g. `homophily.mixing_report`) as JSON, converting NumPy values to plain
+#   numbers and lists.
+def write_report(report, path):
+  def convert(value):
+    if isinstance(value, np.generic):
+      return value.item()
+    if isinstance(value, np.ndarray):
+      return value.tolist()
+    return str(value)
+
+  with open(path, "w") as f:
+    json.dump(report, f, indent=2, default=convert)
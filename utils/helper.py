@@ -1,11 +1,14 @@
 import networkx as nx
-from queue import Queue
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import numpy as np
 import os
 import csv
 import random
+from utils.compact import CompactGraph, as_compact, as_networkx
+from utils.components import Components, UnionFind, component_labels
+from utils import (attacks, balance, betweenness, degrees, graph_io, homophily, layout, neighborhood, paths, render,
+                   robustness, triangles)
 
 # This program contains functions that will help do miscallenous things such as file checking and etc.
 
@@ -17,329 +20,250 @@ def is_gml(filename: str) -> bool:
     return False
   return True
 
-# Performs a multi-search BFS and returns four lists: the results, paths tracked, shortest path edge color array, and 
-#   source node color array.
-def multi_search_bfs(graph: nx.Graph, sources: list):
+# Performs a linear-time multi-source BFS (see `paths.multi_source_bfs`) and returns six values: the results, paths 
+#   tracked, shortest path edge color array, source node color array, and the ownership and distance arrays 
+#   (aligned to the node order; owner is the index of the source that reached each node, -1 if unreached).
+def multi_search_bfs(graph, sources: list):
+  cg = as_compact(graph)
+
   # Checks if sources exists. If not, initialize it as a list ["0"].
   if not sources:
     sources = ["0"]
+  source_ids = cg.ids_of(sources)
   
   # To cycle through colors and map to a source
   available_colors = ['red', 'blue', 'green', 'purple', 'orange', 'cyan']
-  source_to_color = {
-    source: available_colors[i % len(available_colors)] 
-    for i, source in enumerate(sources)
-  }
-  
-  # Normalizes the source colors into an array
-  source_node_color_array = []
-  for node in graph.nodes():
-    if node in source_to_color:
-      source_node_color_array.append(source_to_color[node])
-    else:
-      source_node_color_array.append('skyblue')
-  
-  # Maps 
-  edge_colors = {}
-  bfs_map = {}
-  
-  for source in sources:
-    bfs_map[source] = []
   
   # Multi-Search BFS
-  bfs_results = []
-  queue = Queue()
-  visited = []
-  for item in sources:
-    queue.put(item)
-    bfs_results.append(item)
-  while (not queue.empty()):
-    current_node = queue.get()
-    # Gets the list of neighbors for a specified node
-    try:
-      neighbors_iterator = graph.neighbors(current_node)
-    except nx.NetworkXError:
-      neighbors_iterator = graph.neighbors(str(current_node))
-    for item in neighbors_iterator:
-      if (item not in bfs_results):
-        queue.put(item)
-        edge = (int(current_node), int(item))
-        if (edge not in visited):
-          visited.append(edge)
-          edge_colors[tuple(sorted(edge))] = source_to_color[current_node]
-          source_to_color[item] = source_to_color[current_node]
-        bfs_results.append(item)
-        
-  # Normalizes the edge colors into an array
-  edge_colors_array = []
-  for u, v in graph.edges():
-    edge = tuple(sorted((u, v)))
-    if edge in edge_colors:
-      edge_colors_array.append(edge_colors[edge])
-    else:
-      edge_colors_array.append('gray')
+  bfs = paths.multi_source_bfs(cg, source_ids)
+  owner, distance = bfs['owner'], bfs['distance']
+  bfs_results = cg.labels_of(bfs['order'])
+  tree_nodes = bfs['order'][distance[bfs['order']] > 0]
+  visited = list(zip(cg.labels_of(bfs['parent'][tree_nodes]), cg.labels_of(tree_nodes)))
+  
+  # Normalizes the source colors and the edge colors into arrays
+  is_source = np.zeros(cg.number_of_nodes(), dtype=bool)
+  is_source[source_ids] = True
+  source_node_color_array = [available_colors[o % len(available_colors)] if source else 'skyblue'
+                             for o, source in zip(owner.tolist(), is_source.tolist())]
+  edge_owner = np.full(cg.number_of_edges(), -1, dtype=np.int64)
+  edge_owner[bfs['parent_edge'][tree_nodes]] = owner[tree_nodes]
+  edge_colors_array = [available_colors[o % len(available_colors)] if o >= 0 else 'gray' for o in edge_owner.tolist()]
       
-  return bfs_results, visited, edge_colors_array, source_node_color_array
-
-# Identifies connected components using a recursive DFS Search
-#   Iterates through each node in the graph, performs DFS search until all connected nodes & edges are visited from that node, then
-#   returns the connected component that sourced from that node, edges in the connected component, and an index for edge_color.
-#  Repeat through every node in the graph that has not yet been visited.
-def identify_connected_components(graph: nx.Graph):
-  visited = set()
-  connected_components_w_edges = []
-  color_index = 0
-
-  available_colors = ['red', 'blue', 'green', 'purple', 'orange', 'cyan', 'yellow', 'brown', 'pink', 'black']
-  
-  # Recursive DFS function
-  def dfs(node, current_component, traversed_edges,color_indx):
-    visited.add(node)
-    current_component.append(node)
-    for neighbor in graph.neighbors(node):
-      if neighbor not in visited:
-        dfs(neighbor, current_component,traversed_edges,color_index)
-      if (node,neighbor) not in traversed_edges or (neighbor,node) not in traversed_edges:
-        traversed_edges.add((node,neighbor))
-    
+  return bfs_results, visited, edge_colors_array, source_node_color_array, owner, distance
 
+# Identifies connected components with the union-find engine (see `components.Components`).
+#   Returns the component label array wrapped in a `Components` object; iterating over it yields the connected 
+#   component (sorted node labels), the edges in the connected component, and a color for each component, in the 
+#   order of the first node of each component. Node and edge lists are only built when they are iterated over.
+def identify_connected_components(graph):
+  cg = as_compact(graph)
+  return Components(cg)
 
-  for node in graph:
-    if node not in visited:
-      current_component = []
-      trav_edges =set() 
-      dfs(node, current_component,trav_edges,color_index)
-      connected_components_w_edges.append((sorted(current_component), trav_edges, available_colors[(color_index%len(available_colors))]))
-      color_index +=1
-  return connected_components_w_edges
-
-def identify_isolate_nodes(graph: nx.Graph):
-  isolated_nodes = list(nx.isolates(graph))
+def identify_isolate_nodes(graph):
+  cg = as_compact(graph)
+  isolated_nodes = cg.labels_of(np.flatnonzero(cg.degree == 0))
   
   return isolated_nodes
 
-def cycle_detection(graph: nx.Graph):
-  visited = set()
-  def dfs(node, prev):
-    visited.add(node)
-    for neighbor in graph.neighbors(node):
-      if neighbor not in visited:
-        if dfs(neighbor,node):
-          return True
-      else:
-        if neighbor != prev:
-          return True
-    return False
-  node_list = list(graph.nodes)
-  if node_list:
-    return dfs(node_list[0],None)
-  else:
+# An undirected graph has a cycle exactly when it has more edges than a spanning forest (n - #components).
+def cycle_detection(graph):
+  cg = as_compact(graph)
+  if cg.number_of_nodes() == 0:
     return False
+  num_components, _ = component_labels(cg)
+  return cg.number_of_edges() > cg.number_of_nodes() - num_components
   
 
-def graph_density(graph: nx.Graph):
-  num_edges =  graph.number_of_edges()
+def graph_density(graph):
+  cg = as_compact(graph)
+  num_edges = cg.number_of_edges()
 
   #compute total possible number of edges in the graph
-  num_nodes = graph.number_of_nodes()
+  num_nodes = cg.number_of_nodes()
   max_possible_edges = (num_nodes*(num_nodes-1))/2
 
   density = num_edges/max_possible_edges
   return round(density,2)
 
-def avg_shortest_path_lenf(graph:nx.Graph):
-  #first check if graph is fully connected by using connected components function
-  if len(identify_connected_components(graph)) == 1:
-
-      #create dict to store nodes and shortest path lenf between nodes
-      node_dict = {}
-
-      #perform bfs from each node and store resulting shortest paths
-      for bfs_start_node in list(graph.nodes):
-        node_dict[bfs_start_node] = {}
-
-        #preform bfs on graph and store shortest path between nodes in dict:
-        queue = Queue()
-        queue.put((bfs_start_node,0))
-        
-        visited_nodes = set()
-        visited_nodes.add(bfs_start_node)
-
-        while (not queue.empty()):
-          current_node, level = queue.get()
-
-          # Gets the list of neighbors for a specified node
-          neighbors_iterator = graph.neighbors(current_node)
-          for nbr_node in neighbors_iterator:
-            if (nbr_node not in visited_nodes):
-              queue.put((nbr_node, level +1))
-
-              #if neighbor has not been added to dict of node we started bfs from then add it and the path lenf
-              if nbr_node not in node_dict[bfs_start_node]:
-                node_dict[bfs_start_node][nbr_node] = (level+1)
-
-              #essentially do same as above but for the neighboring node
-              if (nbr_node in node_dict) and (bfs_start_node not in node_dict[nbr_node]):
-                node_dict[nbr_node][bfs_start_node] = (level+1)
-
-          visited_nodes.add(current_node)
-
-      #taking average of shortest paths between each pairs of ndoes
-      num_paths = 0
-      sum_shortestpaths = 0
-
-      for node in node_dict:
-        num_paths +=len(node_dict[node])
-        for neighbor in node_dict[node]:
-          sum_shortestpaths+=node_dict[node][neighbor]
-      return round(sum_shortestpaths/num_paths,2)
-
+# Computes the average shortest path length with the batched bitset BFS engine (see `paths.shortest_path_stats`).
+#   Returns a dictionary with the overall average over connected pairs ('average'), whether the graph is connected,
+#   the per-component averages and the harmonic-mean efficiency.
+#   Passing `samples`, `target_error` (relative half-width of the confidence interval) or `time_budget` (seconds)
+#   switches to the approximation mode, which only runs BFS from a uniform or degree-stratified ('degree')
+#   sample of sources and also reports confidence intervals (see `paths.sampled_shortest_path_stats`).
+def avg_shortest_path_lenf(graph, samples=None, strategy='uniform', target_error=None, time_budget=None,
+                           confidence=0.95, seed=None):
+  cg = as_compact(graph)
+  if samples is None and target_error is None and time_budget is None:
+    return paths.shortest_path_stats(cg)
+  return paths.sampled_shortest_path_stats(cg, samples, strategy, target_error, time_budget, confidence, seed)
+
+# Prints the shortest path statistics returned by `avg_shortest_path_lenf`.
+def print_shortest_path_stats(stats, max_components=10):
+  if stats['average'] is None:
+    print("The graph has no connected pairs of nodes, therefore there is no average shortest path length")
+  elif stats['approximate']:
+    low, high = stats['average_ci']
+    print(f"Average Shortest Path Length (estimated from {stats['samples']} sources): {stats['average']:.2f} "
+          f"({stats['confidence']:.0%} CI [{low:.2f}, {high:.2f}])")
+    if not stats['connected']:
+      print(f"  The graph is not connected ({len(stats['component_sizes'])} components), the estimate covers connected pairs only")
+  elif stats['connected']:
+    print(f"Average Shortest Path Length: {stats['average']:.2f}")
   else:
-    #graph is not connected
-    return False
+    print(f"The graph is not connected, average shortest path length over connected pairs: {stats['average']:.2f}")
+    
+    # Lists the largest components that have at least one pair of nodes
+    sizes = stats['component_sizes']
+    order = [c for c in np.argsort(-sizes, kind='stable') if sizes[c] > 1]
+    for c in order[:max_components]:
+      print(f"  Component of {sizes[c]} nodes: {stats['component_averages'][c]:.2f}")
+    if len(order) > max_components:
+      print(f"  ... and {len(order) - max_components} more components")
+  print(f"Global efficiency: {stats['efficiency']:.4f} (harmonic mean shortest path length: {stats['harmonic_mean']:.2f})")
 
 
 
 ### ASSIGNMENT PART 2
 
-# Check if signed graph is balanced using BFS-based methods.
-def verify_structural_balance(G):
-  if not nx.get_edge_attributes(G, 'sign'):
+# Check if signed graph is balanced by 2-coloring it along a BFS spanning forest (see `balance.structural_balance`).
+#   On imbalanced graphs the frustrated edges are reported, and `frustration` also estimates the frustration index.
+def verify_structural_balance(G, frustration=False, seed=None, max_edges=10):
+  cg = as_compact(G)
+  if "sign" not in cg.edge_attrs or np.isnan(cg.edge_attr("sign")).all():
     print("No edge signs found in the graph. Cannot verify structural balance.")
     return False
-  
-  # Check for negative cycles which indicate imbalance
-  # Convert to signed graph representation
-  positive_edges = [(u, v) for u, v, d in G.edges(data=True) if d.get('sign', 1) > 0]
-  negative_edges = [(u, v) for u, v, d in G.edges(data=True) if d.get('sign', 1) < 0]
-  
-  # Create graph with only positive edges
-  G_pos = G.edge_subgraph(positive_edges).copy() if positive_edges else nx.Graph()
-  
-  # Check if we can 2-color the components
-  is_balanced = True
-  
-  # For each connected component of the original graph
-  for component in nx.connected_components(G):
-    if len(component) < 3:
-      continue
-        
-    subgraph = G.subgraph(component)
-    
-    # Check triangles for balance
-    triangles = [cycle for cycle in nx.cycles.cycle_basis(subgraph) if len(cycle) == 3]
-    
-    for triangle in triangles:
-      # Count negative edges in triangle
-      neg_count = 0
-      for i in range(3):
-        u, v = triangle[i], triangle[(i+1)%3]
-        if subgraph.has_edge(u, v):
-          if subgraph[u][v].get('sign', 1) < 0:
-            neg_count += 1
-        
-        # Triangle is balanced if it has 0 or 2 negative edges
-        if neg_count == 1 or neg_count == 3:
-          is_balanced = False
-          break
-    
-    if not is_balanced:
-      break
-  
+
+  negative = balance.negative_edges(cg)
+  is_balanced, _, frustrated = balance.structural_balance(cg, negative)
   print(f"Graph is {'balanced' if is_balanced else 'NOT balanced'}")
+  if not is_balanced:
+    labels = cg.edge_labels()
+    print(f"{len(frustrated)} frustrated edges found (removing them balances the graph), e.g.:")
+    for e in frustrated[:max_edges].tolist():
+      print(f"  {labels[e][0]} - {labels[e][1]} (sign {'-' if negative[e] else '+'})")
+    if frustration:
+      index, _, _ = balance.frustration_index(cg, negative, seed=seed)
+      print(f"Frustration index: at most {index} edges ({index / cg.number_of_edges():.2%} of the edges)")
   return is_balanced
 
+
+# Signed triangle census (+++, ++-, +--, ---) of a signed graph, exact or estimated from `samples` oriented edges
+#   (see `triangles.signed_triangle_census`). With `output`, the census is appended as a row of a CSV file (tagged
+#   with `name`), so the balance of successive snapshots can be tracked over time.
+def signed_triangle_census(G, samples=None, seed=None, workers=None, output=None, name=None):
+  cg = as_compact(G)
+  if "sign" not in cg.edge_attrs or np.isnan(cg.edge_attr("sign")).all():
+    print("No edge signs found in the graph. Cannot take the signed triangle census.")
+    return None
+
+  result = triangles.signed_triangle_census(cg, samples=samples, seed=seed, workers=workers)
+  census, total = result['census'], result['census'].sum()
+  balanced = (census[0] + census[2]) / total if total else 1.0
+  if result['approximate']:
+    print(f"Estimated from {result['samples']} sampled edges ({result['confidence']:.0%} confidence intervals):")
+  for i, kind in enumerate(result['types']):
+    interval = ""
+    if result['census_ci'] is not None:
+      interval = f" [{max(result['census_ci'][0][i], 0):.0f}, {result['census_ci'][1][i]:.0f}]"
+    print(f"  {kind}: {census[i]:.0f}{interval}")
+  print(f"Balanced triangles: {balanced:.2%} of {total:.0f}")
+
+  if output:
+    is_new = not os.path.exists(output) or os.path.getsize(output) == 0
+    with open(output, "a", newline="") as file:
+      writer = csv.writer(file)
+      if is_new:
+        writer.writerow(["graph", *result['types'], "balanced_fraction", "approximate"])
+      writer.writerow([name, *(f"{count:.0f}" for count in census), f"{balanced:.6f}", result['approximate']])
+    print(f"Census appended to {output}")
+  return result
+
 # Computing
-def compute_clustering_coefficients(G):
-  """Compute clustering coefficient for each node."""
-  clustering = nx.clustering(G)
-  avg_clustering = nx.average_clustering(G)
-  print(f"Average clustering coefficient: {avg_clustering:.4f}")
-  return clustering
-
-
-def compute_neighborhood_overlap(G):
-  """Compute neighborhood overlap for each edge."""
-  overlap = {}
-  for u, v in G.edges():
-    neighbors_u = set(G.neighbors(u))
-    neighbors_v = set(G.neighbors(v))
-    
-    # Remove the endpoints from each other's neighbor sets
-    neighbors_u.discard(v)
-    neighbors_v.discard(u)
-    
-    # Calculate overlap
-    if len(neighbors_u) + len(neighbors_v) > 0:
-      overlap[(u, v)] = len(neighbors_u & neighbors_v) / len(neighbors_u | neighbors_v)
-    else:
-      overlap[(u, v)] = 0
-  
-  if overlap:
-    avg_overlap = sum(overlap.values()) / len(overlap)
-    print(f"Average neighborhood overlap: {avg_overlap:.4f}")
-  
+def compute_clustering_coefficients(G, triangle_counts=None, workers=None):
+  """Compute clustering coefficient for each node.
+
+  The triangles are counted once (see `triangles.count_triangles`, split over `workers` processes), unless already
+  counted `triangle_counts` are passed in.
+  """
+  cg = as_compact(G)
+  if triangle_counts is None:
+    triangle_counts = triangles.count_triangles(cg, workers)
+  print(f"Average clustering coefficient: {triangle_counts.average_clustering:.4f}")
+  print(f"Transitivity: {triangle_counts.transitivity:.4f} ({triangle_counts.total} triangles)")
+  return dict(zip(cg.labels, triangle_counts.clustering.tolist()))
+
+
+def compute_neighborhood_overlap(G, lazy=False, triangle_counts=None):
+  """Compute neighborhood overlap for each edge.
+
+  Returns a mapping from (u, v) label pairs to the overlap of that edge, whose `array` attribute holds the overlaps
+  aligned to the edge ids. With `lazy`, nothing is computed (or printed) until the overlaps are first used.
+  """
+  overlap = neighborhood.EdgeOverlap(as_compact(G), verbose=True, triangle_counts=triangle_counts)
+  if not lazy:
+    overlap.array
   return overlap
 
 
 # Statistical test for homophily using node attributes.
-def verify_homophily(G):
-  # Try different common attribute names (excluding gender)
-  attr_names = ['color', 'group', 'type', 'community', 'cluster']
-  attr_found = None
-  
-  for attr in attr_names:
-    if nx.get_node_attributes(G, attr):
-      attr_found = attr
-      break
-  
-  if not attr_found:
+def verify_homophily(G, permutations=1000, seed=None, workers=None, alpha=0.05, confidence=0.99, output=None):
+  cg = as_compact(G)
+  # Mixing report of every categorical attribute (and of the common homophily attributes) in one pass over the edges
+  #   (see `homophily.mixing_report`), on the compact graph so the caller's graph is never modified
+  attributes = homophily.categorical_attributes(cg)
+  attributes += [attr for attr in homophily.HOMOPHILY_ATTRIBUTES if attr in cg.node_attrs and attr not in attributes
+                 and any(value is not None for value in cg.node_attrs[attr])]
+  report = homophily.mixing_report(cg, attributes)
+
+  # Try different common attribute names (excluding gender) for the permutation test
+  tested = [attr for attr in homophily.HOMOPHILY_ATTRIBUTES if attr in report]
+  if not tested:
     print("No suitable node attributes found for homophily test.")
     print("Consider adding node attributes like 'group' or 'community' for homophily analysis.")
-    return
-  
-  # Calculate assortativity coefficient
-  assortativity = nx.attribute_assortativity_coefficient(G, attr_found)
-  print(f"Assortativity coefficient for '{attr_found}': {assortativity:.4f}")
-  
 
+  for attr in tested:
+    result = homophily.permutation_test(cg, attr, permutations, seed, alpha, confidence, workers)
+    report[attr]['permutation_test'] = {key: result[key] for key in ('p_value', 'p_value_ci', 'permutations',
+                                                                     'stopped_early', 'null_mean', 'null_std')}
+    print(f"Assortativity coefficient for '{attr}': {result['assortativity']:.4f}")
+    if np.isnan(result['assortativity']):
+      print("Every node falls in a single category, so homophily cannot be tested.")
+      continue
+    stopped = " (stopped early)" if result['stopped_early'] else ""
+    print(f"Homophily test (p-value): {result['p_value']:.4f} over {result['permutations']} permutations{stopped}")
+    if result['p_value'] < alpha:
+      print(f"Significant homophily detected (p < {alpha})")
+    else:
+      print("No significant homophily detected")
+
+  for attr, entry in report.items():
+    print(f"Mixing of '{attr}':")
+    if entry['assortativity'] is not None:
+      print(f"  Assortativity: {entry['assortativity']:.4f}")
+    if entry['homophily_ratio'] is not None:
+      print(f"  Same-color edges: {entry['same_color_edges']}, cross-color edges: {entry['cross_color_edges']} "
+            f"(homophily ratio {entry['homophily_ratio']:.4f})")
+    for group, stats in entry['groups'].items():
+      if stats['homophily_index'] is not None:
+        print(f"  {group!r}: {stats['size']} nodes, homophily index {stats['homophily_index']:.4f}"
+              + (f" (inbreeding {stats['inbreeding_homophily']:.4f})" if stats['inbreeding_homophily'] is not None else ""))
+
+  if output:
+    graph_io.write_report(report, output)
+    print(f"Homophily report saved to {output}")
+  return report
 
 
-  # Perform statistical test (permutation test)
-  n_permutations = 1000
-  random_assortativities = []
-  
-  node_attrs = nx.get_node_attributes(G, attr_found)
-  nodes = list(G.nodes())
-  values = list(node_attrs.values())
-  
-  for _ in range(n_permutations):
-    random.shuffle(values)
-    random_attrs = dict(zip(nodes, values))
-    nx.set_node_attributes(G, random_attrs, attr_found)
-    random_assortativities.append(nx.attribute_assortativity_coefficient(G, attr_found))
-  
-  # Restore original attributes
-  nx.set_node_attributes(G, node_attrs, attr_found)
-  
-  # Calculate p-value
-  p_value = sum(1 for r in random_assortativities if abs(r) >= abs(assortativity)) / n_permutations
-  
-  print(f"Homophily test (p-value): {p_value:.4f}")
-  if p_value < 0.05:
-    print("Significant homophily detected (p < 0.05)")
-  else:
-    print("No significant homophily detected")
-    
-
 def cross_color_homophily(G, attr_name='color'):
     """
     Measures cross-colored homophily (or heterophily) in a network.
     
     Parameters:
     -----------
-    gml_path : str
-        Path to the GML file
+    G : nx.Graph or CompactGraph
+        The graph to measure
     attr_name : str
         Node attribute name representing group/color (default='color')
         
@@ -352,52 +276,81 @@ def cross_color_homophily(G, attr_name='color'):
       - homophily_ratio: fraction of edges that are same-color
     """
 
+    cg = as_compact(G)
+
     # Extract node attribute values
-    if not nx.get_node_attributes(G, attr_name):
+    if attr_name not in cg.node_attrs or all(value is None for value in cg.node_attrs[attr_name]):
         print(f"Error: No node attribute '{attr_name}' found in the graph.")
         return None
 
-    # Initialize counters
-    same_color_edges = 0
-    cross_color_edges = 0
-
-    # Iterate through edges and compare node attributes
-    for u, v in G.edges():
-        color_u = G.nodes[u].get(attr_name)
-        color_v = G.nodes[v].get(attr_name)
-        if color_u is None or color_v is None:
-            continue
-        if color_u == color_v:
-            same_color_edges += 1
-        else:
-            cross_color_edges += 1
-
-    total_edges = same_color_edges + cross_color_edges
-    if total_edges == 0:
+    # Same/cross-color counts over the edges whose endpoints both have a color (see `homophily.mixing_report`)
+    entry = homophily.mixing_report(cg, [attr_name])[attr_name]
+    if entry['homophily_ratio'] is None:
         print("No edges found.")
         return None
 
-    cross_color_ratio = cross_color_edges / total_edges
-    homophily_ratio = same_color_edges / total_edges
+    print(f"Same-color edges: {entry['same_color_edges']}")
+    print(f"Cross-color edges: {entry['cross_color_edges']}")
+    print(f"Cross-color ratio: {entry['cross_color_ratio']:.4f}")
+    print(f"Homophily ratio: {entry['homophily_ratio']:.4f}")
 
-    print(f"Same-color edges: {same_color_edges}")
-    print(f"Cross-color edges: {cross_color_edges}")
-    print(f"Cross-color ratio: {cross_color_ratio:.4f}")
-    print(f"Homophily ratio: {homophily_ratio:.4f}")
-
-    return {
-        "same_color_edges": same_color_edges,
-        "cross_color_edges": cross_color_edges,
-        "cross_color_ratio": cross_color_ratio,
-        "homophily_ratio": homophily_ratio,
-    }
+    return {key: entry[key] for key in ("same_color_edges", "cross_color_edges", "cross_color_ratio", "homophily_ratio")}
 
     
 # PLOTTING FUNCTIONS
-def plot_clustering_coefficient(G, clustering):
+#   Every plot takes the node positions as `pos` (a {node: (x, y)} dictionary, see `layout_positions`), so one layout
+#   can be computed (or loaded from its cache) once and shared by all of them; without it, the default layout is
+#   computed for that plot only.
+#   `render_mode` (see `render.RENDER_MODES`) picks between the NetworkX drawing functions and the fast path of
+#   `utils/render.py` (single LineCollection/scatter artists, no labels on large graphs, 'density' shades the edges as
+#   a density image); 'auto' takes the fast path on large graphs. With `output`, the plot is written to that image file
+#   (.png, .svg, ...) instead of being shown.
+
+
+# Node positions of `G` from the layout engine (see `layout.cached_layout`), as a {node: (x, y)} dictionary. With
+#   `path` (the graph file), the layout is cached next to it and reused by later runs.
+def layout_positions(G, path=None, method="auto", seed=42):
+  return layout.positions(G, layout.cached_layout(G, path, method, seed))
+
+
+# Draws the edges of `cg` on the fast path: as one LineCollection with `style`, or as a density image when
+#   `render_mode` is 'density' (with the mean of `weights` per bin when given).
+def _fast_edges(ax, cg: CompactGraph, coords, render_mode, weights=None, **style):
+  if render_mode == 'density':
+    return render.draw_density(ax, coords, cg.edge_u, cg.edge_v, weights,
+                               cmap=style.get('cmap') or 'inferno', alpha=style.get('alpha', 1.0))
+  return render.draw_edges(ax, coords, cg.edge_u, cg.edge_v, **style)
+
+
+# Overlap of every edge of `cg` (in edge id order) from an `EdgeOverlap` of the same edges, or any (u, v) mapping.
+def _edge_overlap(cg: CompactGraph, overlap):
+  if (isinstance(overlap, neighborhood.EdgeOverlap) and np.array_equal(overlap.cg.edge_u, cg.edge_u)
+      and np.array_equal(overlap.cg.edge_v, cg.edge_v)):
+    return overlap.array
+  return np.fromiter((overlap.get((u, v), overlap.get((v, u), 0)) for u, v in cg.edge_labels()),
+                     dtype=np.float64, count=cg.number_of_edges())
+
+
+def plot_clustering_coefficient(G, clustering, pos=None, output=None, render_mode='auto'):
   """Plot graph with node size based on clustering coefficient."""
-  pos = nx.spring_layout(G, seed=42, k=1/np.sqrt(len(G.nodes())))
+  pos = layout_positions(G) if pos is None else pos
+  title = "Graph Visualization: Node Size = Clustering Coefficient, Color = Degree"
+  
+  cg = as_compact(G)
+  if render.use_fast(render_mode, cg.number_of_edges()):
+    coords = render.coordinates(cg, pos)
+    sizes = 500 * render.node_scale(len(coords)) * (
+      np.fromiter((clustering.get(label, 0) for label in cg.labels), dtype=np.float64, count=len(coords)) + 0.1)
+    fig, ax = plt.subplots(figsize=(12, 8))
+    _fast_edges(ax, cg, coords, render_mode, colors='k', alpha=0.3)
+    render.draw_nodes(ax, coords, sizes, degrees.degree_array(cg), cmap='viridis', alpha=0.7)
+    render.draw_labels(ax, coords, cg.labels)
+    ax.set_title(title)
+    ax.axis('off')
+    render.finish(fig, output)
+    return
   
+  G = as_networkx(G)
   # Node sizes based on clustering coefficient
   node_sizes = [500 * (clustering[node] + 0.1) for node in G.nodes()]
   
@@ -411,19 +364,43 @@ def plot_clustering_coefficient(G, clustering):
   nx.draw_networkx_edges(G, pos, alpha=0.3)
   nx.draw_networkx_labels(G, pos, font_size=8)
   
-  plt.title("Graph Visualization: Node Size = Clustering Coefficient, Color = Degree")
+  plt.title(title)
   sm = plt.cm.ScalarMappable(cmap='viridis', 
                               norm=plt.Normalize(vmin=min(node_colors), vmax=max(node_colors)))
   sm.set_array([])
   plt.axis('off')
-  plt.tight_layout()
-  plt.show()
+  render.finish(plt.gcf(), output)
 
 
-def plot_neighborhood_overlap(G, overlap):
+def plot_neighborhood_overlap(G, overlap, pos=None, output=None, render_mode='auto'):
     """Plot graph with edge thickness based on neighborhood overlap."""
-    pos = nx.spring_layout(G, seed=42, k=1/np.sqrt(len(G.nodes())))
+    pos = layout_positions(G) if pos is None else pos
     
+    cg = as_compact(G)
+    if render.use_fast(render_mode, cg.number_of_edges()):
+        coords = render.coordinates(cg, pos)
+        values = _edge_overlap(cg, overlap)
+        degree = degrees.degree_array(cg)
+        fig, ax = plt.subplots(figsize=(12, 8))
+        if render_mode == 'density':
+            # Every bin shows the mean overlap of the edges crossing it
+            edges = _fast_edges(ax, cg, coords, render_mode, values, cmap='RdYlBu')
+            title, colorbar_label = "Graph Visualization: Color = Mean Neighborhood Overlap", 'Neighborhood Overlap'
+        else:
+            edges = _fast_edges(ax, cg, coords, render_mode, colors=(degree[cg.edge_u] + degree[cg.edge_v]).astype(np.float64),
+                                widths=5 * values + 0.5, cmap=plt.cm.RdYlBu)
+            title = "Graph Visualization: Edge Thickness = Neighborhood Overlap, Color = Sum of Degrees"
+            colorbar_label = 'Sum of Endpoint Degrees'
+        render.draw_nodes(ax, coords, 300 * render.node_scale(len(coords)), 'lightblue', alpha=0.7)
+        render.draw_labels(ax, coords, cg.labels)
+        ax.set_title(title)
+        if cg.number_of_edges():
+            fig.colorbar(edges, ax=ax, label=colorbar_label, orientation='horizontal', pad=0.1)
+        ax.axis('off')
+        render.finish(fig, output)
+        return
+    
+    G = as_networkx(G)
     # Edge widths based on neighborhood overlap
     edge_widths = [5 * overlap.get((u, v), overlap.get((v, u), 0)) + 0.5 
                   for u, v in G.edges()]
@@ -443,14 +420,47 @@ def plot_neighborhood_overlap(G, overlap):
     if edges:
         plt.colorbar(edges, label='Sum of Endpoint Degrees', orientation='horizontal', pad=0.1)
     plt.axis('off')
-    plt.tight_layout()
-    plt.show()
+    render.finish(plt.gcf(), output)
 
 
-def plot_attributes(G):
+def plot_attributes(G, pos=None, output=None, render_mode='auto'):
   """Plot graph with node colors and edge signs visualization."""
-  pos = nx.spring_layout(G, seed=42, k=1/np.sqrt(len(G.nodes())))
+  pos = layout_positions(G) if pos is None else pos
+  
+  cg = as_compact(G)
+  if render.use_fast(render_mode, cg.number_of_edges()):
+    coords = render.coordinates(cg, pos)
+    attr_name = next((attr for attr in homophily.HOMOPHILY_ATTRIBUTES if attr in cg.node_attrs), None)
+    if attr_name:
+      node_colors, _, _ = homophily.encode_attribute(cg, attr_name)
+    else:
+      node_colors, attr_name = degrees.degree_array(cg), 'degree'
+    fig, ax = plt.subplots(figsize=(12, 8))
+    
+    # Positive and negative edges are drawn as two collections (or two density layers)
+    if 'sign' in cg.edge_attrs:
+      negative = cg.edge_attr('sign', 1.0) <= 0
+      for mask, color, cmap, style, label in ((~negative, 'green', 'Greens', 'solid', 'Positive'),
+                                              (negative, 'red', 'Reds', 'dashed', 'Negative')):
+        if render_mode == 'density':
+          render.draw_density(ax, coords, cg.edge_u[mask], cg.edge_v[mask], cmap=cmap, alpha=0.6)
+        else:
+          render.draw_edges(ax, coords, cg.edge_u[mask], cg.edge_v[mask], colors=color, widths=2, alpha=0.6,
+                            linestyle=style, label=label)
+      if render_mode != 'density':
+        ax.legend()
+    else:
+      _fast_edges(ax, cg, coords, render_mode, colors='k', alpha=0.4)
+    
+    render.draw_nodes(ax, coords, 300 * render.node_scale(len(coords)), node_colors,
+                      cmap='tab10' if attr_name != 'degree' else 'viridis')
+    render.draw_labels(ax, coords, cg.labels)
+    ax.set_title(f"Graph Attributes: Node Color = {attr_name}, Edge Style = Sign")
+    ax.axis('off')
+    render.finish(fig, output)
+    return
   
+  G = as_networkx(G)
   # Get node attributes for coloring
   node_attrs = None
   attr_name = 'default'
@@ -494,12 +504,12 @@ def plot_attributes(G):
   
   plt.title(f"Graph Attributes: Node Color = {attr_name}, Edge Style = Sign")
   plt.axis('off')
-  plt.tight_layout()
-  plt.show()
+  render.finish(plt.gcf(), output)
 
 
 # Animate graph evolution based on (temporal) edge changes.
-def temporal_simulation(G, temporal_file):
+#   With `output`, the animation is written to that file (e.g. .gif through Pillow) instead of being shown.
+def temporal_simulation(G, temporal_file, pos=None, output=None):
   if not os.path.exists(temporal_file):
     print(f"Temporal simulation file {temporal_file} not found.")
     return
@@ -521,11 +531,31 @@ def temporal_simulation(G, temporal_file):
   
   # Create animation
   fig, ax = plt.subplots(figsize=(10, 8))
-  pos = nx.spring_layout(G, seed=42, k=1/np.sqrt(len(G.nodes())))
+  pos = layout_positions(G) if pos is None else pos
   
   G_temp = G.copy()
   G_temp.add_nodes_from(G.nodes())
   
+  # Keeps the component count up to date incrementally with union-find; only edge removals force a rebuild
+  node_ids = {node: i for i, node in enumerate(G_temp.nodes())}
+  tracker = {'union_find': None}
+  
+  def node_id(node):
+    if node not in node_ids:
+      node_ids[node] = len(node_ids)
+      tracker['union_find'].add_nodes(1)
+    return node_ids[node]
+  
+  def rebuild():
+    for node in G_temp.nodes():
+      node_ids.setdefault(node, len(node_ids))
+    union_find = UnionFind(len(node_ids))
+    edges = list(G_temp.edges())
+    union_find.union_edges([node_ids[u] for u, _ in edges], [node_ids[v] for _, v in edges])
+    tracker['union_find'] = union_find
+  
+  rebuild()
+  
   def update(frame):
     ax.clear()
     
@@ -533,110 +563,242 @@ def temporal_simulation(G, temporal_file):
       change = edge_changes[frame]
       if change['action'] == 'add':
         G_temp.add_edge(change['source'], change['target'])
+        if tracker['union_find'] is not None:
+          tracker['union_find'].add_edge(node_id(change['source']), node_id(change['target']))
       elif change['action'] == 'remove' and G_temp.has_edge(change['source'], change['target']):
         G_temp.remove_edge(change['source'], change['target'])
+        tracker['union_find'] = None
+    if tracker['union_find'] is None:
+      rebuild()
     
     nx.draw(G_temp, pos, ax=ax, with_labels=True, node_size=300, 
             node_color='lightblue', edge_color='gray')
-    ax.set_title(f"Temporal Evolution - Step {frame}/{len(edge_changes)}")
+    ax.set_title(f"Temporal Evolution - Step {frame}/{len(edge_changes)} "
+                 f"({tracker['union_find'].num_components} connected components)")
   
   ani = animation.FuncAnimation(fig, update, frames=len(edge_changes)+1, 
                                 interval=500, repeat=False)
-  plt.show()
+  if output:
+    ani.save(output)
+    plt.close(fig)
+    print(f"Animation saved to {output}")
+  else:
+    plt.show()
   
   return ani
 
 
 # Simulate random edge failures and analyze robustness.
-def robustness_check(G, k, n_simulations=100):
+#   The rounds run through the Monte Carlo engine (see `robustness.monte_carlo`): every round draws its failures from
+#   its own seed stream of `seed`, masks them out of the shared edge list, and the rounds are spread over `workers`
+#   processes. The per-round results are summarized with streaming statistics (mean, standard deviation, confidence
+#   interval and quantiles); with `return_stats`, their summaries are also returned as (graph, stats dictionary).
+#   Passing `betweenness_options` (see `betweenness.betweenness_stats`, e.g. {'samples': 100}) also tracks the average
+#   betweenness centrality of every round, computed on the masked edge list.
+def robustness_check(G, k, n_simulations=100, betweenness_options=None, seed=None, workers=None, return_stats=False):
   print(f"\nSimulating {n_simulations} rounds of {k} random edge failures...")
+  cg = as_compact(G)
+  num_edges = cg.number_of_edges()
   
-  results = {
-    'num_components': [],
-    'max_component_size': [],
-    'min_component_size': []
-  }
+  original_num_components, _ = component_labels(cg)
   
-  original_components = list(nx.connected_components(G))
-  original_num_components = len(original_components)
+  if k > num_edges:
+    print(f"Warning: k ({k}) is larger than number of edges ({num_edges})")
+    k = min(k, num_edges)
   
-  for sim in range(n_simulations):
-    G_temp = G.copy()
-    edges = list(G_temp.edges())
-    
-    if k > len(edges):
-      print(f"Warning: k ({k}) is larger than number of edges ({len(edges)})")
-      k = min(k, len(edges))
-    
-    # Remove k random edges
-    edges_to_remove = random.sample(edges, k)
-    G_temp.remove_edges_from(edges_to_remove)
-    
-    # Analyze components
-    components = list(nx.connected_components(G_temp))
-    component_sizes = [len(c) for c in components]
-    
-    results['num_components'].append(len(components))
-    results['max_component_size'].append(max(component_sizes) if component_sizes else 0)
-    results['min_component_size'].append(min(component_sizes) if component_sizes else 0)
+  stats, seed_sequences = robustness.monte_carlo(cg, k, n_simulations, seed, workers, original_num_components * 1.5,
+                                                 betweenness_options)
   
   # Report statistics
   print(f"Original number of components: {original_num_components}")
   print(f"After {k} edge failures:")
-  print(f"  Average number of components: {np.mean(results['num_components']):.2f}")
-  print(f"  Max component size (avg): {np.mean(results['max_component_size']):.2f}")
-  print(f"  Min component size (avg): {np.mean(results['min_component_size']):.2f}")
+  print(f"  Average number of components: {_format_running(stats['num_components'], '.2f')}")
+  print(f"  Max component size (avg): {_format_running(stats['max_component_size'], '.2f')}")
+  print(f"  Min component size (avg): {_format_running(stats['min_component_size'], '.2f')}")
+  if 'avg_betweenness' in stats:
+    print(f"  Average betweenness centrality (avg): {_format_running(stats['avg_betweenness'], '.6f')}")
   
   # Check if original clusters persist (simplified check)
-  cluster_persistence = sum(1 for n in results['num_components'] 
-                          if n <= original_num_components * 1.5) / n_simulations
-  print(f"  Cluster persistence rate: {cluster_persistence:.2%}")
-  return G_temp
+  print(f"  Cluster persistence rate: {stats['cluster_persistence'].mean:.2%}")
+  
+  # Returns the graph of the last round (only materialized once)
+  G_last = _remove_edges(G, cg, robustness.round_failures(num_edges, k, seed_sequences[-1])) if n_simulations else G
+  if return_stats:
+    return G_last, {name: running.summary() for name, running in stats.items()}
+  return G_last
+
+
+# Sweep mode of the robustness check: the full robustness curve (giant component size and number of components for
+#   every number of random edge failures k = 0..m) from `trials` Newman-Ziff union-find sweeps (see
+#   `robustness.percolation_sweep`). Prints the curve at a few failure fractions (and at `k` when given), and writes it
+#   as CSV to `output` when given. Returns the curve dictionary.
+#   With `attack` (the options of `attacks.attack_order`, e.g. {'target': 'node', 'score': 'degree', 'adaptive': True}),
+#   the curve follows that targeted removal order instead (a single deterministic sweep).
+def robustness_sweep(G, trials=10, k=None, seed=None, workers=None, output=None, attack=None):
+  cg = as_compact(G)
+  num_nodes = cg.number_of_nodes()
+  if attack:
+    target = attack.get('target', 'edge')
+    print(f"\nSweeping the robustness curve of the {_describe_attack(attack)}...")
+    curve = robustness.order_curve(cg, attacks.attack_order(cg, **attack), target)
+  else:
+    target = 'edge'
+    print(f"\nSweeping the robustness curve over {trials} random edge removal orders...")
+    curve = robustness.percolation_sweep(cg, trials, seed, workers)
+  num_edges = len(curve['removed']) - 1
+  
+  print(f"  {'Removed ' + target + 's':>14} {'Giant component':>24} {'Components':>20}")
+  points = sorted({int(round(f * num_edges)) for f in (0, 0.1, 0.25, 0.5, 0.75, 0.9, 1)} | ({min(k, num_edges)} if k else set()))
+  for removed in points:
+    print(f"  {removed:>14} {curve['giant_mean'][removed]:>14.2f} ± {curve['giant_std'][removed]:<7.2f} "
+          f"{curve['components_mean'][removed]:>10.2f} ± {curve['components_std'][removed]:.2f}")
+  
+  # First k at which the mean giant component holds less than half of the nodes
+  below_half = np.flatnonzero(curve['giant_mean'] < num_nodes / 2)
+  if len(below_half):
+    print(f"  The giant component falls below half of the nodes after {below_half[0]} failures "
+          f"({below_half[0] / max(num_edges, 1):.1%} of the {target}s)")
+  
+  if output:
+    with open(output, "w", newline="") as f:
+      writer = csv.writer(f)
+      writer.writerow(["removed", "giant_mean", "giant_std", "components_mean", "components_std"])
+      writer.writerows(zip(curve['removed'].tolist(), curve['giant_mean'].tolist(), curve['giant_std'].tolist(),
+                           curve['components_mean'].tolist(), curve['components_std'].tolist()))
+    print(f"  Robustness curve saved to {output}")
+  return curve
+
+
+# Formats a `RunningStats` mean with its 95% confidence interval, standard deviation and 5/50/95% quantiles.
+def _format_running(stats, spec):
+  low, high = stats.confidence_interval()
+  q05, q50, q95 = stats.quantiles([0.05, 0.5, 0.95])
+  return (f"{stats.mean:{spec}} (95% CI {low:{spec}}-{high:{spec}}, std {stats.std:{spec}}, "
+          f"5%/50%/95% {q05:{spec}}/{q50:{spec}}/{q95:{spec}})")
+
+
+# Removes the edges with the given ids, returning a graph of the same type as `G`.
+def _remove_edges(G, cg: CompactGraph, edge_ids):
+  if isinstance(G, CompactGraph):
+    keep = np.ones(cg.number_of_edges(), dtype=bool)
+    keep[edge_ids] = False
+    return cg.edge_subgraph(keep)
+  G_removed = G.copy()
+  G_removed.remove_edges_from((cg.labels[cg.edge_u[e]], cg.labels[cg.edge_v[e]]) for e in np.asarray(edge_ids).tolist())
+  return G_removed
+
+
+# Removes the nodes with the given ids (and their edges), returning a graph of the same type as `G`.
+def _remove_nodes(G, cg: CompactGraph, node_ids):
+  if isinstance(G, CompactGraph):
+    keep = np.ones(cg.number_of_nodes(), dtype=bool)
+    keep[node_ids] = False
+    return cg.node_subgraph(np.flatnonzero(keep))
+  G_removed = G.copy()
+  G_removed.remove_nodes_from(cg.labels_of(node_ids))
+  return G_removed
+
+
+# Describes an attack given as `attacks.attack_order` options, e.g. "nodes by adaptive degree attack".
+def _describe_attack(attack):
+  order = 'lowest' if attack.get('lowest_first') else 'highest'
+  mode = 'adaptive' if attack.get('adaptive') else 'static'
+  return f"{attack.get('target', 'edge')}s by {mode} {attack.get('score', 'degree')} attack ({order} first)"
+
+
+# Formats the average of `avg_shortest_path_lenf`, flagging disconnected graphs.
+def _format_average(stats):
+  if stats['average'] is None:
+    return "None"
+  average = f"~{stats['average']:.2f}" if stats['approximate'] else f"{stats['average']:.2f}"
+  if stats['connected']:
+    return average
+  return f"{average} (GRAPH IS DISCONNECTED, {len(stats['component_sizes'])} components)"
+
+
+# Formats the average of `betweenness.betweenness_stats`, with its confidence interval when it was sampled.
+def _format_betweenness(stats):
+  if not stats['approximate']:
+    return f"{stats['average']:.6f}"
+  if stats['average_ci'] is None:
+    return f"~{stats['average']:.6f} ({stats['samples']} pivots)"
+  low, high = stats['average_ci']
+  return f"~{stats['average']:.6f} ({stats['confidence']:.0%} CI {low:.6f}-{high:.6f}, {stats['samples']} pivots)"
 
 
 # Remove k random edges before partitioning.
-def simulate_failures(G:nx.Graph, k):
+#   `aspl_options` are passed to `avg_shortest_path_lenf` (e.g. samples=500 or target_error=0.01 for the approximation mode).
+#   `betweenness_options` are passed to `betweenness.betweenness_stats` (e.g. workers=4 for the process pool, or
+#   samples=200 / target_error=0.01 for k-pivot sampling). With `dynamic_betweenness`, the "after" betweenness is
+#   updated from the "before" pass, re-running only the sources whose shortest paths used a failed edge
+#   (see `betweenness.deletion_betweenness`).
+#   With `attack` (the options of `attacks.attack_order`, e.g. {'target': 'node', 'score': 'betweenness'}), the k
+#   elements are removed by that targeted attack instead of uniformly at random.
+def simulate_failures(G, k, betweenness_options=None, dynamic_betweenness=False, attack=None, **aspl_options):
   print(f"---SIMULATING FAILURES (k={k})---")
+  cg = as_compact(G)
+  num_edges = cg.number_of_edges()
   
   # Obtains the average shortest path before
-  avg_short_before = avg_shortest_path_lenf(G)
-  
-  # Get betweenness centrality before
-  betweenness_before = nx.betweenness_centrality(G)
-  avg_betweenness_before = sum(betweenness_before.values()) / len(betweenness_before)
+  avg_short_before = avg_shortest_path_lenf(cg, **aspl_options)
   
   # Count connected components before
-  num_components_before = nx.number_connected_components(G)
-  
-  G_failures = G.copy()
-  edges = list(G_failures.edges())
+  num_components_before, _ = component_labels(cg)
   
-  if k > len(edges):
-    print(f"Warning: k ({k}) is larger than number of edges ({len(edges)})")
-    k = min(k, len(edges))
+  target = attack.get('target', 'edge') if attack else 'edge'
+  num_elements = cg.number_of_nodes() if target == 'node' else num_edges
+  if k > num_elements:
+    print(f"Warning: k ({k}) is larger than number of {target}s ({num_elements})")
+    k = min(k, num_elements)
   
-  edges_to_remove = random.sample(edges, k)
-  G_failures.remove_edges_from(edges_to_remove)
-  print(f"Removed {k} random edges for simulating failures")
+  betweenness_options = betweenness_options or {}
+  if attack:
+    to_remove = attacks.attack_order(cg, count=k, betweenness_options=betweenness_options, **attack)
+  else:
+    to_remove = random.sample(range(num_edges), k)
+  
+  # Get betweenness centrality before (and after, when it is updated incrementally; node removals change the node set,
+  #   so they are always recomputed)
+  dynamic_betweenness = dynamic_betweenness and target == 'edge'
+  if dynamic_betweenness and betweenness_options.get('target_error') is not None:
+    # The incremental update runs on a fixed set of sources, so an error target needs the full recomputation
+    print("Warning: the dynamic betweenness update does not support an error target; recomputing it instead")
+    dynamic_betweenness = False
+  if dynamic_betweenness:
+    dynamic_options = {name: betweenness_options.get(name) for name in ('samples', 'seed', 'workers')}
+    betweenness_before, betweenness_after = betweenness.deletion_betweenness(cg, to_remove, **dynamic_options)
+  else:
+    betweenness_before = betweenness.betweenness_stats(cg, **betweenness_options)
+  avg_betweenness_before = betweenness_before['average']
+  if target == 'node':
+    G_failures = _remove_nodes(G, cg, to_remove)
+  else:
+    G_failures = _remove_edges(G, cg, to_remove)
+  cg_failures = as_compact(G_failures)
+  print(f"Removed {k} {_describe_attack(attack) if attack else 'random edges'} for simulating failures")
   
   # Count connected components after
-  num_components_after = nx.number_connected_components(G_failures)
+  num_components_after, _ = component_labels(cg_failures)
   print(f"  Number of disconnected components: {num_components_before} -> {num_components_after}")
   
   # Get betweenness centrality after
-  betweenness_after = nx.betweenness_centrality(G_failures)
-  avg_betweenness_after = sum(betweenness_after.values()) / len(betweenness_after)
+  if dynamic_betweenness:
+    print(f"  Betweenness updated for {betweenness_after['updated_sources']} of {betweenness_after['samples']} sources")
+  else:
+    betweenness_after = betweenness.betweenness_stats(cg_failures, **betweenness_options)
+  avg_betweenness_after = betweenness_after['average']
   
   # Calculate impact on betweenness centrality
   betweenness_change = avg_betweenness_after - avg_betweenness_before
   betweenness_pct_change = (betweenness_change / avg_betweenness_before * 100) if avg_betweenness_before > 0 else 0
   
-  print(f"  Average betweenness centrality: {avg_betweenness_before:.6f} -> {avg_betweenness_after:.6f}")
+  print(f"  Average betweenness centrality: {_format_betweenness(betweenness_before)} -> {_format_betweenness(betweenness_after)}")
   print(f"    Betweenness centrality change: {betweenness_change:+.6f} ({betweenness_pct_change:+.2f}%)")
   
-  # Finds the average shortest path after
-  avg_short_after = avg_shortest_path_lenf(G_failures) 
-  print(f"  Change in average shortest path: {avg_short_before} -> {avg_short_after if avg_short_after else 'None (GRAPH IS DISCONNECTED)'}")
+  # Finds the average shortest path after (over connected pairs when the graph is disconnected)
+  avg_short_after = avg_shortest_path_lenf(cg_failures, **aspl_options)
+  print(f"  Change in average shortest path: {_format_average(avg_short_before)} -> {_format_average(avg_short_after)}")
+  print(f"  Change in global efficiency: {avg_short_before['efficiency']:.4f} -> {avg_short_after['efficiency']:.4f}")
   
   return G_failures
 
@@ -644,8 +806,11 @@ def simulate_failures(G:nx.Graph, k):
 
 
 #Extra feature analyzing degree assortativity
+#   Pearson correlation of the degrees at both ends of every edge, computed from the degree and edge endpoint arrays
+#   (each edge counted in both directions), so it also runs on memory-mapped graphs.
 def analyze_degree_assortativity(graph):
-  assortativity_val = nx.degree_assortativity_coefficient(graph)
+  cg = as_compact(graph)
+  assortativity_val = degrees.degree_assortativity(cg)
 
   if assortativity_val > 0:
     print("The input graph is assortative, high degree nodes tend to connect to other high-degree nodes")
@@ -653,4 +818,46 @@ def analyze_degree_assortativity(graph):
     print("The input graph is dissassortative, high degree nodes tend to connect to lower-degree nodes")
   else:
     print("The input graph shows no degree correlation")
-  return assortativity_val
\ No newline at end of file
+  return assortativity_val
+
+
+# Degree statistics of the graph (see `degrees.degree_statistics`): summary, degree assortativity, power-law and
+#   log-normal fit of the degree distribution, k-core decomposition and rich-club coefficient. With `output`, the whole
+#   report (including the distribution, CCDF and core numbers) is saved as JSON.
+def analyze_degree_distribution(graph, output=None, max_rows=10):
+  cg = as_compact(graph)
+  stats = degrees.degree_statistics(cg)
+  print(f"Nodes: {stats['nodes']}, edges: {stats['edges']}, mean degree: {stats['mean_degree']:.4f}, "
+        f"max degree: {stats['max_degree']}")
+  print(f"Degree assortativity: {stats['assortativity']:.4f}")
+  analyze_degree_assortativity(cg)
+
+  distribution = stats['distribution']
+  print("Degree distribution (degree: nodes, P(K >= k)):")
+  rows = np.unique(np.linspace(0, len(distribution['degree']) - 1, min(max_rows, len(distribution['degree']))).astype(int))
+  for i in rows.tolist():
+    print(f"  {distribution['degree'][i]}: {distribution['count'][i]}, {distribution['ccdf'][i]:.4f}")
+
+  fit = stats['power_law']
+  if fit is not None:
+    print(f"Power-law fit: alpha = {fit['alpha']:.4f} for degrees >= {fit['kmin']} ({fit['tail_nodes']} nodes, "
+          f"KS distance {fit['ks_distance']:.4f})")
+    print(f"Log-normal fit: mu = {fit['lognormal_mu']:.4f}, sigma = {fit['lognormal_sigma']:.4f}")
+    favored = "power law" if fit['loglik_ratio'] > 0 else "log-normal"
+    significance = "significant" if fit['p_value'] < 0.1 else "not significant"
+    print(f"Log-likelihood ratio: {fit['loglik_ratio']:.4f} in favor of the {favored} (p = {fit['p_value']:.4f}, "
+          f"{significance})")
+
+  sizes = stats['core_sizes']
+  print(f"Degeneracy (largest k-core): {stats['degeneracy']}, with {sizes[-1] if len(sizes) else 0} nodes")
+  club = stats['rich_club']
+  if len(club['degree']):
+    print("Rich-club coefficient (degree > k: coefficient):")
+    rows = np.unique(np.linspace(0, len(club['degree']) - 1, min(max_rows, len(club['degree']))).astype(int))
+    for i in rows.tolist():
+      print(f"  {club['degree'][i]}: {club['coefficient'][i]:.4f}")
+
+  if output:
+    graph_io.write_report(stats, output)
+    print(f"Degree report saved to {output}")
+  return stats
@@ -0,0 +1,204 @@
+import contextlib
+import numpy as np
+from scipy.stats import norm
+from utils import parallel
+from utils.compact import CompactGraph
+
+# This module contains the homophily engines (attribute encoding, assortativity and its permutation test).
+
+# Node attributes tried (in order) by `verify_homophily`.
+HOMOPHILY_ATTRIBUTES = ('color', 'group', 'type', 'community', 'cluster')
+
+# Upper bound on the memory of one batch of permutations (permuted endpoint codes of every edge).
+DEFAULT_BATCH_BYTES = 1 << 27
+
+# Attributes with more distinct values than this are not treated as categorical by `categorical_attributes`.
+DEFAULT_MAX_CATEGORIES = 50
+
+
+def _is_missing(value) -> bool:
+  return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+# Encodes a node attribute as integer codes 0..k-1, in order of first appearance. Nodes without the attribute share
+#   one more code (the `None` category, as in `nx.attribute_mixing_matrix`). Returns (codes, categories, has value).
+def encode_attribute(cg: CompactGraph, name: str):
+  values = cg.node_attrs[name].tolist() if name in cg.node_attrs else [None] * cg.number_of_nodes()
+  categories = {}
+  codes = np.fromiter((categories.setdefault(None if _is_missing(value) else value, len(categories)) for value in values),
+                      dtype=np.int64, count=len(values))
+  present = np.fromiter((not _is_missing(value) for value in values), dtype=bool, count=len(values))
+  return codes, list(categories), present
+
+
+# Names of the categorical node attributes: every value present is a string, a bool or an integer, and there are at
+#   most `max_categories` distinct values, fewer than the nodes that have one (which leaves out identifiers).
+def categorical_attributes(cg: CompactGraph, max_categories=DEFAULT_MAX_CATEGORIES):
+  names = []
+  for name, column in cg.node_attrs.items():
+    values = [value for value in column.tolist() if not _is_missing(value)]
+    if not values or not all(isinstance(value, (str, bool, int, np.integer)) for value in values):
+      continue
+    distinct = len(set(values))
+    if distinct <= max_categories and distinct < len(values):
+      names.append(name)
+  return names
+
+
+# Assortativity coefficients (Newman, 2003) of a batch of codings (one row per coding, k categories), from the
+#   diagonal and the marginals of the mixing matrix: every non-loop edge counts in both orientations and every
+#   self-loop once (as in `nx.attribute_assortativity_coefficient`), so the marginals are the degree totals of every
+#   category. NaN where every endpoint falls in a single category.
+def assortativity_batch(codes, k, edge_u, edge_v, degree):
+  codes = np.atleast_2d(codes)
+  batch = len(codes)
+  weight = np.where(edge_u != edge_v, 2.0, 1.0)
+  total = weight.sum()
+  same = ((codes[:, edge_u] == codes[:, edge_v]) * weight).sum(axis=1) / total
+  rows = np.repeat(np.arange(batch) * k, codes.shape[1]) + codes.ravel()
+  marginals = np.bincount(rows, np.tile(degree, batch), batch * k).reshape(batch, k) / total
+  expected = (marginals ** 2).sum(axis=1)
+  with np.errstate(divide="ignore", invalid="ignore"):
+    return (same - expected) / (1 - expected)
+
+
+# Assortativity of `count` random relabelings, where the codes of the nodes that have the attribute are shuffled
+#   among themselves, in batches of permutations of at most `max_bytes`.
+def _null_assortativity(codes, k, present, edge_u, edge_v, degree, count, rng, max_bytes=DEFAULT_BATCH_BYTES):
+  labeled = np.flatnonzero(present)
+  batch_size = max(1, max_bytes // (8 * max(len(edge_u), len(codes), 1)))
+  null = []
+  for start in range(0, count, batch_size):
+    batch = min(batch_size, count - start)
+    permuted = np.tile(codes, (batch, 1))
+    permuted[:, labeled] = rng.permuted(np.tile(codes[labeled], (batch, 1)), axis=1)
+    null.append(assortativity_batch(permuted, k, edge_u, edge_v, degree))
+  return np.concatenate(null) if null else np.zeros(0)
+
+
+def _null_task(codes, k, present, count, seed_sequence):
+  cg = parallel.worker_graph()
+  rng = np.random.default_rng(seed_sequence)
+  return _null_assortativity(codes, k, present, cg.edge_u, cg.edge_v, cg.degree, count, rng)
+
+
+# Wilson score interval of a proportion.
+def _wilson_interval(successes, trials, confidence):
+  z = norm.ppf(0.5 + confidence / 2)
+  p = successes / trials
+  center = (p + z * z / (2 * trials)) / (1 + z * z / trials)
+  half_width = z * np.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+  return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+
+# Permutation test of the assortativity of a node attribute, as a dictionary. The attribute is encoded once and every
+#   permuted assortativity is computed from the endpoint codes (see `assortativity_batch`), many permutations per NumPy
+#   call; the graph itself is never modified. The p-value is the fraction of permutations at least as assortative (in
+#   absolute value) as the observed one.
+#   - Permutations run in rounds of `round_size` per worker, split over `workers` processes when given; every round
+#     (and worker) draws from its own stream of `seed`.
+#   - With `confidence`, the test stops early once the Wilson interval of the p-value (at that confidence) lies
+#     entirely below or above `alpha`; `confidence=None` always runs every permutation.
+def permutation_test(cg: CompactGraph, name: str, permutations=1000, seed=None, alpha=0.05, confidence=0.99,
+                     workers=None, round_size=100):
+  codes, categories, present = encode_attribute(cg, name)
+  k = len(categories)
+  observed = float(assortativity_batch(codes, k, cg.edge_u, cg.edge_v, cg.degree)[0])
+  workers = parallel.default_workers(workers) if workers is not None else 1
+  seed_sequence = np.random.SeedSequence(seed)
+  if np.isnan(observed):
+    # A single category (or no edges) leaves the assortativity undefined, and so the test
+    permutations = 0
+
+  with contextlib.ExitStack() as stack:
+    executor = None
+    if workers > 1 and permutations > 0:
+      executor = stack.enter_context(stack.enter_context(parallel.SharedGraph(cg)).executor(workers))
+
+    null = np.zeros(0)
+    interval = None
+    stopped_early = False
+    while len(null) < permutations:
+      count = min(round_size * workers, permutations - len(null))
+      if executor is None:
+        rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+        batch = _null_assortativity(codes, k, present, cg.edge_u, cg.edge_v, cg.degree, count, rng)
+      else:
+        sizes = [size for size in np.diff(np.linspace(0, count, workers + 1).astype(int)).tolist() if size]
+        futures = [executor.submit(_null_task, codes, k, present, size, child)
+                   for size, child in zip(sizes, seed_sequence.spawn(len(sizes)))]
+        batch = np.concatenate([future.result() for future in futures])
+      null = np.concatenate((null, batch))
+
+      exceed = int(np.count_nonzero(np.abs(null) >= abs(observed)))
+      if confidence is not None:
+        interval = _wilson_interval(exceed, len(null), confidence)
+        if (interval[1] < alpha or interval[0] > alpha) and len(null) < permutations:
+          stopped_early = True
+          break
+
+  exceed = int(np.count_nonzero(np.abs(null) >= abs(observed)))
+  return {'attribute': name, 'categories': categories, 'assortativity': observed,
+          'p_value': exceed / len(null) if len(null) else np.nan, 'p_value_ci': interval, 'permutations': len(null),
+          'stopped_early': stopped_early, 'null_mean': float(np.nanmean(null)) if len(null) else np.nan,
+          'null_std': float(np.nanstd(null)) if len(null) else np.nan}
+
+
+# Mixing report of several categorical node attributes (all of `categorical_attributes` by default), as a dictionary
+#   keyed by attribute. The codes of every attribute are stacked and the endpoint codes of every edge are gathered in
+#   one pass, from which every attribute gets:
+#   - `mixing_matrix`: edge counts between every pair of categories (both orientations of every non-loop edge, and the
+#     nodes without the attribute as a `None` category, as in `nx.attribute_mixing_matrix`), and its `assortativity`;
+#   - the same- and cross-category edge counts and ratios over the edges whose endpoints both have the attribute (as
+#     the former `cross_color_homophily`);
+#   - `groups`: for every category, its size, the share of its members' ties that stay in the group (homophily index)
+#     and the inbreeding homophily (Coleman), i.e. how far that share exceeds the group's share of the labeled nodes.
+def mixing_report(cg: CompactGraph, attributes=None):
+  attributes = categorical_attributes(cg) if attributes is None else list(attributes)
+  encoded = [encode_attribute(cg, name) for name in attributes]
+  if not encoded:
+    return {}
+  codes = np.stack([item[0] for item in encoded])
+  present = np.stack([item[2] for item in encoded])
+  ends_u, ends_v = codes[:, cg.edge_u], codes[:, cg.edge_v]
+  labeled_u, labeled_v = present[:, cg.edge_u], present[:, cg.edge_v]
+  loops = cg.edge_u == cg.edge_v
+
+  report = {}
+  for i, (name, (_, categories, _)) in enumerate(zip(attributes, encoded)):
+    k = len(categories)
+    mixing = np.bincount(ends_u[i] * k + ends_v[i], minlength=k * k) \
+      + np.bincount(ends_v[i][~loops] * k + ends_u[i][~loops], minlength=k * k)
+    mixing = mixing.reshape(k, k)
+    total = mixing.sum()
+    marginals = mixing.sum(axis=1) / total if total else np.zeros(k)
+    expected = (marginals ** 2).sum()
+    assortativity = (np.trace(mixing) / total - expected) / (1 - expected) if total and expected < 1 else None
+
+    both = labeled_u[i] & labeled_v[i]
+    same = int(np.count_nonzero(both & (ends_u[i] == ends_v[i])))
+    cross = int(np.count_nonzero(both)) - same
+    sizes = np.bincount(codes[i][present[i]], minlength=k)
+    groups = {}
+    for c, category in enumerate(categories):
+      if category is None:
+        continue
+      ties = int(mixing[c].sum())
+      index = mixing[c, c] / ties if ties else None
+      share = sizes[c] / sizes.sum()
+      inbreeding = (index - share) / (1 - share) if index is not None and share < 1 else None
+      groups[str(category)] = {'size': int(sizes[c]), 'ties': ties, 'homophily_index': index,
+                               'inbreeding_homophily': inbreeding}
+
+    report[name] = {
+      'categories': categories,
+      'mixing_matrix': mixing.tolist(),
+      'assortativity': assortativity,
+      'same_color_edges': same,
+      'cross_color_edges': cross,
+      'cross_color_ratio': cross / (same + cross) if same + cross else None,
+      'homophily_ratio': same / (same + cross) if same + cross else None,
+      'groups': groups,
+    }
+  return report
+
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy import signal
+from scipy.sparse import linalg
+from utils import graph_io
+from utils.compact import CompactGraph, as_compact
+
+# This module contains the layout engine (node positions for the plots), with a persistent cache keyed by the graph
+#   hash and the layout parameters.
+
+LAYOUTS = ("auto", "spring", "kamada_kawai", "spectral", "force")
+
+# Suffix of the layout cache written next to a graph file (e.g. data/graph.gml -> data/graph.gml.layout.npz).
+LAYOUT_SUFFIX = ".layout.npz"
+
+# Largest graph (in nodes) that 'auto' lays out with the exact NetworkX layout; larger graphs get `force_layout`.
+AUTO_EXACT_NODES = 2000
+
+
+# Layout used for `method` on a graph of `num_nodes` nodes ('auto' resolves to `exact` for small graphs).
+def resolve_method(method: str, num_nodes: int, exact="spring") -> str:
+  if method not in LAYOUTS:
+    raise ValueError(f"Unknown layout {method!r}, expected one of {LAYOUTS}.")
+  if method != "auto":
+    return method
+  return exact if num_nodes <= AUTO_EXACT_NODES else "force"
+
+
+# Rescales positions into [-1, 1] around the origin (as `nx.rescale_layout`).
+def _rescale(coords):
+  if len(coords) == 0:
+    return coords
+  coords = coords - coords.mean(axis=0)
+  extent = np.abs(coords).max()
+  return coords / extent if extent > 0 else coords
+
+
+# Spectral layout from the sparse adjacency: the second and third eigenvectors of the normalized adjacency
+#   D^-1/2 A D^-1/2 (the smoothest non-trivial modes of the normalized Laplacian), found with ARPACK. Isolated nodes
+#   are placed at random around the origin.
+def spectral_layout(cg: CompactGraph, seed=None):
+  n = cg.number_of_nodes()
+  rng = np.random.default_rng(seed)
+  if n <= 3:
+    return _rescale(rng.random((n, 2)))
+  degree = cg.degree.astype(np.float64)
+  scale = np.where(degree > 0, 1 / np.sqrt(np.maximum(degree, 1)), 0.0)
+  adjacency = cg.adjacency().astype(np.float64)
+  # Shifting by the identity keeps every eigenvalue non-negative, so the largest ones are the smoothest modes
+  operator = sp.diags(scale) @ adjacency @ sp.diags(scale) + sp.identity(n)
+  _, vectors = linalg.eigsh(operator, k=3, which="LA", v0=rng.random(n), tol=1e-4, maxiter=20 * n)
+  coords = vectors[:, 1:3][:, ::-1] * np.sqrt(n)
+  coords[degree == 0] = rng.normal(scale=0.1, size=(int(np.count_nonzero(degree == 0)), 2))
+  return _rescale(coords)
+
+
+# Spreads every node over the four grid points around it (bilinear weights) on a `grid` x `grid` mesh covering the
+#   layout. Returns (grid spacing, lower-left grid point of every node, [(weights, row offset, column offset)]).
+def _mesh_weights(coords, grid):
+  low = coords.min(axis=0)
+  spacing = max(float((coords.max(axis=0) - low).max()) / (grid - 1), 1e-12)
+  scaled = (coords - low) / spacing
+  base = np.minimum(scaled.astype(np.int64), grid - 2)
+  fx, fy = (scaled - base).T
+  return spacing, base, [((1 - fx) * (1 - fy), 0, 0), (fx * (1 - fy), 1, 0), ((1 - fx) * fy, 0, 1), (fx * fy, 1, 1)]
+
+
+# Fruchterman-Reingold force-directed layout for large graphs, started from the spectral layout. Attraction runs along
+#   the edges (one bincount per iteration). Repulsion is computed particle-mesh style: the nodes are spread over a
+#   grid, the grid is convolved (by FFT) with the repulsive kernel r/|r|^2 and the resulting force field is
+#   interpolated back to the nodes, which takes O(n + grid^2 log grid) per iteration instead of the O(n^2) of the
+#   exact layout (nodes closer than a grid cell barely repel each other). The displacement is capped by a temperature
+#   that cools linearly, as in `nx.spring_layout`.
+def force_layout(cg: CompactGraph, seed=None, iterations=50, grid=None):
+  n = cg.number_of_nodes()
+  coords = spectral_layout(cg, seed)
+  if n <= 3:
+    return coords
+  k = 1 / np.sqrt(n)
+  grid = grid or int(np.clip(np.sqrt(n), 32, 256))
+  offsets = np.arange(-(grid - 1), grid)
+  dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+  distance2 = (dx * dx + dy * dy).astype(np.float64)
+  distance2[grid - 1, grid - 1] = np.inf
+  kernel_x, kernel_y = dx / distance2, dy / distance2
+
+  edge_u, edge_v = cg.edge_u, cg.edge_v
+  temperature = 0.1
+  for step in range(iterations):
+    spacing, base, weights = _mesh_weights(coords, grid)
+    mass = np.zeros(grid * grid)
+    for weight, row, column in weights:
+      mass += np.bincount((base[:, 0] + row) * grid + base[:, 1] + column, weight, grid * grid)
+    mass = mass.reshape(grid, grid)
+    field_x = signal.fftconvolve(mass, kernel_x, mode="same")
+    field_y = signal.fftconvolve(mass, kernel_y, mode="same")
+    displacement = np.zeros_like(coords)
+    for weight, row, column in weights:
+      points = (base[:, 0] + row, base[:, 1] + column)
+      displacement[:, 0] += weight * field_x[points]
+      displacement[:, 1] += weight * field_y[points]
+    displacement *= k * k / spacing
+
+    delta = coords[edge_u] - coords[edge_v]
+    pull = delta * (np.sqrt((delta ** 2).sum(axis=1)) / k)[:, None]
+    for d in range(2):
+      displacement[:, d] -= np.bincount(edge_u, pull[:, d], n) - np.bincount(edge_v, pull[:, d], n)
+
+    length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-12)
+    coords = coords + displacement * (np.minimum(length, temperature) / length)[:, None]
+    temperature = 0.1 * (1 - (step + 1) / (iterations + 1))
+  return _rescale(coords)
+
+
+# Computes a layout of `cg` as an (n x 2) array aligned to the node ids.
+#   - 'spring' and 'kamada_kawai' run the NetworkX layouts on the edge weights (spring with k = 1/sqrt(n), as the plots
+#     always used).
+#   - 'spectral' (`spectral_layout`) and 'force' (`force_layout`) scale to large graphs.
+def compute_layout(cg: CompactGraph, method="auto", seed=42, exact="spring"):
+  method = resolve_method(method, cg.number_of_nodes(), exact)
+  if method == "spectral":
+    return spectral_layout(cg, seed)
+  if method == "force":
+    return force_layout(cg, seed)
+  graph = nx.Graph()
+  graph.add_nodes_from(range(cg.number_of_nodes()))
+  graph.add_weighted_edges_from(zip(cg.edge_u.tolist(), cg.edge_v.tolist(), cg.edge_attr("weight", 1.0).tolist()))
+  if method == "spring":
+    positions = nx.spring_layout(graph, seed=seed, k=1 / np.sqrt(max(cg.number_of_nodes(), 1)))
+  else:
+    positions = nx.kamada_kawai_layout(graph)
+  return np.asarray([positions[i] for i in range(cg.number_of_nodes())], dtype=np.float64).reshape(-1, 2)
+
+
+# Key of a layout in the cache: the graph hash with the resolved method and its parameters.
+def layout_key(cg: CompactGraph, method: str, seed) -> str:
+  digest = hashlib.blake2b(digest_size=16)
+  digest.update(graph_io.graph_hash(cg).encode())
+  digest.update(json.dumps({"method": method, "seed": seed}, sort_keys=True).encode())
+  return "layout_" + digest.hexdigest()
+
+
+# Layout of `cg` (see `compute_layout`), reused from the cache next to the graph file `path` (`path` +
+#   `LAYOUT_SUFFIX`) when the same graph was laid out with the same parameters before; new layouts are added to it.
+#   Without `path`, the layout is only computed.
+def cached_layout(graph, path=None, method="auto", seed=42, exact="spring"):
+  cg = as_compact(graph)
+  method = resolve_method(method, cg.number_of_nodes(), exact)
+  if path is None:
+    return compute_layout(cg, method, seed)
+
+  cache = path + LAYOUT_SUFFIX
+  key = layout_key(cg, method, seed)
+  layouts = {}
+  if os.path.exists(cache):
+    try:
+      with np.load(cache, allow_pickle=False) as data:
+        layouts = {name: data[name] for name in data.files}
+    except (OSError, ValueError):
+      layouts = {}
+  if key in layouts and layouts[key].shape == (cg.number_of_nodes(), 2):
+    return layouts[key]
+
+  layouts[key] = compute_layout(cg, method, seed)
+  try:
+    # Writes to a temporary file first so a crash never leaves a truncated cache behind
+    temp_path = f"{cache}.tmp"
+    with open(temp_path, "wb") as f:
+      np.savez(f, **layouts)
+    os.replace(temp_path, cache)
+  except OSError as e:
+    print(f"Warning: could not write the layout cache {cache}: {e}")
+  return layouts[key]
+
+
+# Node label -> (x, y) mapping of a layout array, as the NetworkX drawing functions expect.
+def positions(graph, coords):
+  return dict(zip(as_compact(graph).labels, coords))
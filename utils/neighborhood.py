@@ -0,0 +1,69 @@
+from collections.abc import Mapping
+import numpy as np
+from utils import triangles
+from utils.compact import CompactGraph
+
+# This module contains the edge neighborhood engines (common neighbors and neighborhood overlap) on the compact graph.
+
+# Number of common neighbors of the endpoints of every edge, aligned to the edge ids, excluding the endpoints
+#   themselves. These are the entries of A @ A on the existing edges, i.e. the triangle counts of the edges (see
+#   `triangles.count_triangles`).
+def common_neighbor_counts(cg: CompactGraph, workers=None):
+  return triangles.count_triangles(cg, workers).edge
+
+
+# Neighborhood overlap of every edge (u, v), aligned to the edge ids:
+#   |N(u) & N(v)| / |(N(u) - {v}) | (N(v) - {u})|, and 0 when both endpoints have no other neighbor.
+def neighborhood_overlap(cg: CompactGraph, common=None):
+  common = common_neighbor_counts(cg) if common is None else np.asarray(common)
+  degree = cg.degree.astype(np.int64)
+  union = degree[cg.edge_u] - 1 + degree[cg.edge_v] - 1 - common
+  has_others = degree[cg.edge_u] - 1 + degree[cg.edge_v] - 1 > 0
+  return np.where(has_others, common / np.maximum(union, 1), 0.0)
+
+
+# Neighborhood overlap that is only computed when it is first used. Maps (u, v) label pairs (in either orientation)
+#   to the overlap of that edge; `array` holds the overlaps aligned to the edge ids and `average` their mean.
+#   With `verbose`, the average is printed once it has been computed. Already counted `triangle_counts` (see
+#   `triangles.count_triangles`) are reused for the common neighbors.
+class EdgeOverlap(Mapping):
+  def __init__(self, cg: CompactGraph, verbose=False, triangle_counts=None):
+    self.cg = cg
+    self.verbose = verbose
+    self.triangle_counts = triangle_counts
+    self._array = None
+
+  @property
+  def array(self):
+    if self._array is None:
+      common = None if self.triangle_counts is None else self.triangle_counts.edge
+      self._array = neighborhood_overlap(self.cg, common)
+      self._array.setflags(write=False)
+      if self.verbose and len(self._array):
+        print(f"Average neighborhood overlap: {self.average:.4f}")
+    return self._array
+
+  @property
+  def average(self) -> float:
+    return float(self.array.mean()) if len(self.array) else 0.0
+
+  # Edge id of the (u, v) label pair, found by binary search in the sorted neighbors of u.
+  def edge_id(self, key) -> int:
+    try:
+      u, v = (self.cg.id_of(label) for label in key)
+    except (KeyError, TypeError, ValueError):
+      raise KeyError(key) from None
+    neighbors = self.cg.neighbors(u)
+    slot = int(np.searchsorted(neighbors, v))
+    if slot == len(neighbors) or neighbors[slot] != v:
+      raise KeyError(key)
+    return int(self.cg.incident_edges(u)[slot])
+
+  def __getitem__(self, key):
+    return float(self.array[self.edge_id(key)])
+
+  def __iter__(self):
+    return iter(self.cg.edge_labels())
+
+  def __len__(self):
+    return self.cg.number_of_edges()
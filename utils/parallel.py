@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from utils.compact import CompactGraph
+
+# This module contains the helpers that share a compact graph with worker processes through shared memory.
+
+# CSR arrays of a compact graph that the workers need (labels and attributes stay in the parent process).
+GRAPH_ARRAYS = ("indptr", "indices", "slot_edge", "edge_u", "edge_v")
+
+# Graph attached by the current worker process (see `worker_graph`).
+_worker_graph = None
+_worker_blocks = []
+
+
+# Number of worker processes to use when `workers` is not given (or is 0).
+def default_workers(workers=None) -> int:
+  return int(workers) if workers else (os.cpu_count() or 1)
+
+
+# Copies the CSR arrays of a compact graph into shared memory blocks once, so a process pool can attach to them
+#   without pickling the graph for every task. Use as a context manager; the blocks are freed on exit.
+class SharedGraph:
+  def __init__(self, cg: CompactGraph):
+    self.blocks = []
+    self.spec = {}
+    for name in GRAPH_ARRAYS:
+      array = np.ascontiguousarray(getattr(cg, name))
+      block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+      np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+      self.blocks.append(block)
+      self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    for block in self.blocks:
+      block.close()
+      block.unlink()
+    self.blocks = []
+
+  # Process pool whose workers attach to the shared graph on start-up (see `worker_graph`).
+  def executor(self, workers=None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=default_workers(workers), initializer=_attach, initargs=(self.spec,))
+
+
+# Worker initializer: maps the shared blocks back into a compact graph (node labels are the ids).
+def _attach(spec):
+  global _worker_graph
+  arrays = {}
+  for name, (block_name, shape, dtype) in spec.items():
+    block = shared_memory.SharedMemory(name=block_name)
+    _worker_blocks.append(block)
+    arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+  _worker_graph = CompactGraph(*(arrays[name] for name in GRAPH_ARRAYS))
+
+
+# The compact graph shared with this worker process.
+def worker_graph() -> CompactGraph:
+  return _worker_graph
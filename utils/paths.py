@@ -0,0 +1,287 @@
+import time
+import numpy as np
+from scipy.stats import norm
+from utils.compact import CompactGraph
+from utils.components import component_labels
+
+# This module contains the shortest path (BFS) engines that run on the compact graph.
+
+# Default memory budget (in bytes) for the bitset frontiers of one batch of BFS sources.
+DEFAULT_BATCH_BYTES = 1 << 28
+
+
+# Frontier-at-a-time BFS from many sources at once using bitset frontiers.
+#   Every source gets one bit of a (n x words) uint64 matrix, so one level of 64 * words BFS runs is a single
+#   gather over the CSR `indices` followed by an OR-reduction per node. Yields (level, reached) for every level,
+#   where `reached` holds the bits of the sources that reached each node for the first time at that level.
+def bitset_bfs(cg: CompactGraph, sources):
+  num_nodes = cg.number_of_nodes()
+  sources = np.asarray(sources, dtype=np.int64)
+  words = max(1, (len(sources) + 63) // 64)
+
+  frontier = np.zeros((num_nodes, words), dtype=np.uint64)
+  bits = np.arange(len(sources))
+  np.bitwise_or.at(frontier, (sources, bits // 64), np.left_shift(np.uint64(1), (bits % 64).astype(np.uint64)))
+  visited = frontier.copy()
+
+  # Only nodes with neighbors take part in the OR-reduction (reduceat cannot express empty segments)
+  rows = np.flatnonzero(cg.degree > 0)
+  starts = cg.indptr[rows]
+
+  level = 0
+  while len(rows):
+    level += 1
+    reached = np.zeros_like(frontier)
+    active = np.flatnonzero(frontier.any(axis=1))
+    slots = cg.slots_of(active)
+    if len(slots) * 4 < len(cg.indices):
+      # Small frontier: push the frontier bits along the slots of the active nodes only
+      targets = cg.indices[slots]
+      values = frontier[np.repeat(active, cg.degree[active])]
+      order = np.argsort(targets, kind="stable")
+      targets = targets[order]
+      first = np.flatnonzero(np.r_[True, targets[1:] != targets[:-1]])
+      reached[targets[first]] = np.bitwise_or.reduceat(values[order], first, axis=0)
+    else:
+      # Large frontier: every node pulls the bits of all of its neighbors
+      reached[rows] = np.bitwise_or.reduceat(frontier[cg.indices], starts, axis=0)
+    reached &= ~visited
+    if not reached.any():
+      return
+    visited |= reached
+    frontier = reached
+    yield level, reached
+
+
+# Linear-time (O(n + m)) multi-source BFS with array frontiers.
+#   Every level expands the whole frontier through the CSR slots at once and keeps the first slot that reaches each new
+#   node, which visits nodes in exactly the order of a queue-based BFS. Returns a dictionary of arrays aligned to the
+#   node ids: 'owner' (index into `sources` of the source that reached the node, -1 if unreached), 'distance'
+#   (-1 if unreached), 'parent' and 'parent_edge' (BFS tree, -1 for sources and unreached nodes), plus 'order'
+#   (node ids in visiting order). Duplicate sources are ignored.
+def multi_source_bfs(cg: CompactGraph, sources):
+  num_nodes = cg.number_of_nodes()
+  owner = np.full(num_nodes, -1, dtype=np.int64)
+  distance = np.full(num_nodes, -1, dtype=np.int64)
+  parent = np.full(num_nodes, -1, dtype=np.int64)
+  parent_edge = np.full(num_nodes, -1, dtype=np.int64)
+
+  sources = np.asarray(sources, dtype=np.int64)
+  _, first = np.unique(sources, return_index=True)
+  frontier = sources[np.sort(first)]
+  owner[frontier] = np.sort(first)
+  distance[frontier] = 0
+  order = [frontier]
+
+  level = 0
+  while len(frontier):
+    level += 1
+    slots = cg.slots_of(frontier)
+    slot_parents = np.repeat(frontier, cg.degree[frontier])
+    targets = cg.indices[slots]
+
+    # Keeps the first slot reaching each unvisited node, in queue order
+    fresh = np.flatnonzero(distance[targets] < 0)
+    _, first = np.unique(targets[fresh], return_index=True)
+    fresh = fresh[np.sort(first)]
+
+    frontier = targets[fresh].astype(np.int64)
+    parent[frontier] = slot_parents[fresh]
+    parent_edge[frontier] = cg.slot_edge[slots[fresh]]
+    owner[frontier] = owner[parent[frontier]]
+    distance[frontier] = level
+    order.append(frontier)
+
+  return {
+    "order": np.concatenate(order),
+    "owner": owner,
+    "distance": distance,
+    "parent": parent,
+    "parent_edge": parent_edge,
+  }
+
+
+# Splits `sources` into batches whose bitset frontiers fit into `max_bytes`.
+def source_batches(cg: CompactGraph, sources, max_bytes=DEFAULT_BATCH_BYTES):
+  sources = np.asarray(sources, dtype=np.int64)
+  bytes_per_word = 8 * (len(cg.indices) + 4 * cg.number_of_nodes())
+  words = int(max(1, min((len(sources) + 63) // 64, max_bytes // max(bytes_per_word, 1))))
+  batch_size = 64 * words
+  return [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+
+
+# Computes shortest path statistics from every node with batched bitset BFS.
+#   Only distance sums and pair counts are accumulated (never the per-pair distances), grouped by connected component,
+#   so disconnected graphs still get per-component averages. The harmonic-mean efficiency counts unreachable
+#   pairs as 1/inf = 0, so it is well defined for any graph.
+def shortest_path_stats(cg: CompactGraph, max_bytes=DEFAULT_BATCH_BYTES):
+  num_nodes = cg.number_of_nodes()
+  num_components, labels = component_labels(cg)
+
+  distance_sums = np.zeros(num_components, dtype=np.float64)
+  inverse_sum = 0.0
+  for batch in source_batches(cg, np.arange(num_nodes), max_bytes):
+    for level, reached in bitset_bfs(cg, batch):
+      counts = np.bitwise_count(reached).sum(axis=1, dtype=np.int64)
+      distance_sums += level * np.bincount(labels, weights=counts, minlength=num_components)
+      inverse_sum += counts.sum() / level
+
+  return _summarize(labels, num_components, distance_sums, inverse_sum, num_nodes)
+
+
+# Builds the result dictionary shared by the exact (and sampled) engines.
+def _summarize(labels, num_components, distance_sums, inverse_sum, num_nodes):
+  component_sizes = np.bincount(labels, minlength=num_components)
+  component_pairs = component_sizes * (component_sizes - 1)
+  with np.errstate(invalid="ignore", divide="ignore"):
+    component_averages = np.where(component_pairs > 0, distance_sums / component_pairs, np.nan)
+
+  total_pairs = int(component_pairs.sum())
+  all_pairs = num_nodes * (num_nodes - 1)
+  efficiency = inverse_sum / all_pairs if all_pairs else 0.0
+
+  return {
+    "approximate": False,
+    "connected": num_components == 1,
+    "average": float(distance_sums.sum() / total_pairs) if total_pairs else None,
+    "efficiency": efficiency,
+    "harmonic_mean": 1 / efficiency if efficiency else float("inf"),
+    "num_pairs": total_pairs,
+    "component_labels": labels,
+    "component_sizes": component_sizes,
+    "component_averages": component_averages,
+  }
+
+
+# Estimates the shortest path statistics by running BFS from a sample of the nodes only.
+#   Sources are drawn without replacement, either uniformly or stratified by degree (proportional allocation over
+#   degree quantile strata), one bitset batch of 64 sources at a time. Sampling stops once `samples` sources were
+#   used, once the relative half-width of the confidence interval of the average drops below `target_error`,
+#   once `time_budget` seconds have passed, or once every node has been used (the result is then exact).
+#   The average over connected pairs is a ratio estimator (distance sum / reachable pairs) whose confidence
+#   interval comes from the linearized stratified variance with finite population correction.
+def sampled_shortest_path_stats(cg: CompactGraph, samples=None, strategy="uniform", target_error=None,
+                                time_budget=None, confidence=0.95, seed=None, num_strata=8):
+  if strategy not in ("uniform", "degree"):
+    raise ValueError(f"Unknown sampling strategy '{strategy}', expected 'uniform' or 'degree'.")
+  start_time = time.perf_counter()
+  rng = np.random.default_rng(seed)
+  num_nodes = cg.number_of_nodes()
+  num_components, labels = component_labels(cg)
+  max_samples = num_nodes if samples is None else min(int(samples), num_nodes)
+  z = norm.ppf(0.5 + confidence / 2)
+
+  # Splits the nodes into strata and shuffles each one, so taking a prefix samples without replacement
+  strata = _degree_strata(cg.degree, num_strata) if strategy == "degree" else np.zeros(num_nodes, dtype=np.int64)
+  pools = [rng.permutation(np.flatnonzero(strata == h)) for h in range(strata.max() + 1 if num_nodes else 0)]
+  pool_sizes = np.array([len(pool) for pool in pools])
+  taken = np.zeros(len(pools), dtype=np.int64)
+
+  sources, distance_sums, reach_counts, inverse_sums = [], [], [], []
+  estimate = None
+  while taken.sum() < max_samples:
+    # Proportional allocation of the next batch over the strata
+    target = min(taken.sum() + 64, max_samples)
+    want = np.minimum(np.ceil(target * pool_sizes / num_nodes).astype(np.int64), pool_sizes)
+    while want.sum() > target:
+      want[np.argmax(want - target * pool_sizes / num_nodes)] -= 1
+    batch = np.concatenate([pools[h][taken[h]:want[h]] for h in range(len(pools))]).astype(np.int64)
+    taken = np.maximum(taken, want)
+
+    batch_distances = np.zeros(len(batch), dtype=np.float64)
+    batch_reach = np.zeros(len(batch), dtype=np.float64)
+    batch_inverse = np.zeros(len(batch), dtype=np.float64)
+    for level, reached in bitset_bfs(cg, batch):
+      counts = np.unpackbits(reached.view(np.uint8), axis=1, bitorder="little").sum(axis=0)[:len(batch)]
+      batch_distances += level * counts
+      batch_reach += counts
+      batch_inverse += counts / level
+    sources.append(batch)
+    distance_sums.append(batch_distances)
+    reach_counts.append(batch_reach)
+    inverse_sums.append(batch_inverse)
+
+    estimate = _sampled_estimate(np.concatenate(sources), strata, pool_sizes, np.concatenate(distance_sums),
+                                 np.concatenate(reach_counts), np.concatenate(inverse_sums), num_nodes, z)
+    if target_error is not None and estimate["average"] and estimate["average_half_width"] <= target_error * estimate["average"]:
+      break
+    if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+      break
+
+  sources = np.concatenate(sources) if sources else np.zeros(0, dtype=np.int64)
+  distances = np.concatenate(distance_sums) if distance_sums else np.zeros(0)
+  reach = np.concatenate(reach_counts) if reach_counts else np.zeros(0)
+  if estimate is None:
+    estimate = _sampled_estimate(sources, strata, pool_sizes, distances, reach, np.zeros(0), num_nodes, z)
+
+  # Per-component averages from the sources that fell into each component
+  source_components = labels[sources]
+  with np.errstate(invalid="ignore", divide="ignore"):
+    component_averages = (np.bincount(source_components, weights=distances, minlength=num_components)
+                          / np.bincount(source_components, weights=reach, minlength=num_components))
+  component_sizes = np.bincount(labels, minlength=num_components)
+  component_averages[component_sizes < 2] = np.nan
+
+  efficiency = estimate["efficiency"]
+  return {
+    "connected": num_components == 1,
+    "average": estimate["average"],
+    "efficiency": efficiency,
+    "harmonic_mean": 1 / efficiency if efficiency else float("inf"),
+    "num_pairs": int((component_sizes * (component_sizes - 1)).sum()),
+    "component_labels": labels,
+    "component_sizes": component_sizes,
+    "component_averages": component_averages,
+    "approximate": len(sources) < num_nodes,
+    "samples": len(sources),
+    "confidence": confidence,
+    "average_ci": (estimate["average"] - estimate["average_half_width"], estimate["average"] + estimate["average_half_width"])
+                  if estimate["average"] is not None else None,
+    "efficiency_ci": (efficiency - estimate["efficiency_half_width"], efficiency + estimate["efficiency_half_width"]),
+    "elapsed": time.perf_counter() - start_time,
+  }
+
+
+# Assigns every node to a degree quantile stratum (ties can merge strata, so there may be fewer than `num_strata`).
+def _degree_strata(degree, num_strata):
+  if len(degree) == 0:
+    return np.zeros(0, dtype=np.int64)
+  edges = np.unique(np.quantile(degree, np.linspace(0, 1, num_strata + 1)[1:-1]))
+  strata = np.searchsorted(edges, degree, side="right")
+  return np.unique(strata, return_inverse=True)[1]
+
+
+# Stratified estimates (with finite population correction) of the average and of the efficiency.
+def _sampled_estimate(sources, strata, pool_sizes, distances, reach, inverse, num_nodes, z):
+  source_strata = strata[sources]
+  total_distance = total_reach = total_inverse = 0.0
+  for h in np.unique(source_strata):
+    in_stratum = source_strata == h
+    total_distance += pool_sizes[h] * distances[in_stratum].mean()
+    total_reach += pool_sizes[h] * reach[in_stratum].mean()
+    if len(inverse):
+      total_inverse += pool_sizes[h] * inverse[in_stratum].mean()
+
+  average = float(total_distance / total_reach) if total_reach else None
+  residuals = distances - (average or 0.0) * reach
+  average_variance = _stratified_variance(residuals, source_strata, pool_sizes) / total_reach ** 2 if total_reach else 0.0
+  all_pairs = num_nodes * (num_nodes - 1)
+  efficiency_variance = _stratified_variance(inverse, source_strata, pool_sizes) / all_pairs ** 2 if len(inverse) and all_pairs else 0.0
+
+  return {
+    "average": average,
+    "average_half_width": float(z * np.sqrt(average_variance)),
+    "efficiency": float(total_inverse / all_pairs) if all_pairs else 0.0,
+    "efficiency_half_width": float(z * np.sqrt(efficiency_variance)),
+  }
+
+
+# Variance of a stratified estimate of the population total of `values`.
+def _stratified_variance(values, source_strata, pool_sizes):
+  variance = 0.0
+  for h in np.unique(source_strata):
+    sample = values[source_strata == h]
+    if len(sample) < 2:
+      continue
+    variance += pool_sizes[h] ** 2 * (1 - len(sample) / pool_sizes[h]) * sample.var(ddof=1) / len(sample)
+  return variance
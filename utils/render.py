@@ -0,0 +1,143 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib import colors as mcolors
+from matplotlib.collections import LineCollection
+from utils.compact import CompactGraph
+
+# This module contains the high-volume rendering path of the plots: every edge set is drawn as one LineCollection and
+#   every node set as one scatter from NumPy coordinate arrays, optionally shaded as a density image, and the figures
+#   can be written to image files headlessly.
+
+RENDER_MODES = ("auto", "networkx", "fast", "density")
+
+# Graph size (edges) above which 'auto' switches from the NetworkX drawing functions to the fast path.
+FAST_RENDER_EDGES = 5000
+
+# Largest graph (nodes) whose node labels are drawn by the fast path.
+LABEL_LIMIT = 200
+
+# Number of edges or nodes above which their artists are rasterized in vector outputs (SVG/PDF), which would
+#   otherwise hold one path per edge.
+RASTERIZE_ARTISTS = 20000
+
+# Resolution (bins per side) of the density shading.
+DENSITY_BINS = 1024
+
+# Upper bound on the points sampled along the edges per chunk of the density shading.
+DENSITY_CHUNK_POINTS = 1 << 22
+
+
+# Whether a plot of `num_edges` edges takes the fast path in render `mode` ('auto' picks it for large graphs).
+def use_fast(mode: str, num_edges: int) -> bool:
+  if mode not in RENDER_MODES:
+    raise ValueError(f"Unknown render mode {mode!r}, expected one of {RENDER_MODES}.")
+  if mode == "auto":
+    return num_edges > FAST_RENDER_EDGES
+  return mode != "networkx"
+
+
+# Switches matplotlib to the non-interactive Agg backend, so the plots can be saved on machines without a display.
+def use_headless():
+  plt.switch_backend("Agg")
+
+
+# Node positions ({label: (x, y)} dictionary) as an (n x 2) array aligned to the node ids of `cg`.
+def coordinates(cg: CompactGraph, pos):
+  return np.asarray([pos[label] for label in cg.labels], dtype=np.float64).reshape(-1, 2)
+
+
+# Scale of the node marker sizes, shrinking them (down to 1%) on graphs too large to show every node at full size.
+def node_scale(num_nodes: int) -> float:
+  return min(1.0, max(LABEL_LIMIT / max(num_nodes, 1), 0.01))
+
+
+# Draws the edges (u, v) as a single LineCollection. `colors` is a color (or a list of colors) or an array of values
+#   mapped through `cmap`; `widths` is a width or an array of widths.
+def draw_edges(ax, coords, edge_u, edge_v, colors="k", widths=1.0, cmap=None, vmin=None, vmax=None, alpha=1.0,
+               linestyle="solid", label=None):
+  segments = np.stack((coords[edge_u], coords[edge_v]), axis=1)
+  collection = LineCollection(segments, linewidths=widths, linestyles=linestyle, alpha=alpha, label=label, zorder=1,
+                              rasterized=len(segments) > RASTERIZE_ARTISTS)
+  if isinstance(colors, np.ndarray) and colors.dtype.kind in "iuf":
+    collection.set_array(colors)
+    collection.set_cmap(cmap)
+    collection.set_clim(vmin if vmin is not None else (colors.min() if len(colors) else 0),
+                        vmax if vmax is not None else (colors.max() if len(colors) else 1))
+  else:
+    collection.set_color(colors)
+  ax.add_collection(collection)
+  ax.update_datalim(coords)
+  ax.autoscale_view()
+  return collection
+
+
+# Draws the nodes as a single scatter.
+def draw_nodes(ax, coords, sizes=25, colors="lightblue", cmap=None, alpha=1.0):
+  return ax.scatter(coords[:, 0], coords[:, 1], s=sizes, c=colors, cmap=cmap, alpha=alpha, linewidths=0, zorder=2,
+                    rasterized=len(coords) > RASTERIZE_ARTISTS)
+
+
+# Draws the node labels, unless the graph has more than `limit` nodes. Returns whether they were drawn.
+def draw_labels(ax, coords, labels, font_size=8, limit=LABEL_LIMIT):
+  if len(coords) > limit:
+    return False
+  for label, (x, y) in zip(labels, coords.tolist()):
+    ax.text(x, y, str(label), fontsize=font_size, ha="center", va="center", zorder=3)
+  return True
+
+
+# Shades the edges as a density image, datashading style: points are sampled along every edge about once per bin
+#   (at least at both ends) and binned into a `bins` x `bins` grid, in chunks of at most `DENSITY_CHUNK_POINTS` points,
+#   so every bin counts the edges crossing it. The counts are drawn histogram-equalized (every bin is colored by the
+#   rank of its count, from a quarter of the colormap up, so sparse regions stay visible next to dense ones); with
+#   `weights` (one value per edge), every bin shows the mean weight of the edges crossing it instead. Empty bins stay
+#   transparent.
+def draw_density(ax, coords, edge_u, edge_v, weights=None, bins=DENSITY_BINS, cmap="inferno", alpha=1.0):
+  low = coords.min(axis=0) if len(coords) else np.zeros(2)
+  span = max(float((coords.max(axis=0) - low).max()), 1e-12) if len(coords) else 1.0
+  scaled = (coords - low) / span * (bins - 1)
+  lengths = np.sqrt(((scaled[edge_u] - scaled[edge_v]) ** 2).sum(axis=1))
+  samples = np.clip(np.ceil(lengths).astype(np.int64) + 1, 2, bins)
+
+  counts = np.zeros(bins * bins)
+  totals = np.zeros(bins * bins) if weights is not None else None
+  ends = np.cumsum(samples)
+  start = 0
+  while start < len(samples):
+    stop = max(int(np.searchsorted(ends, (ends[start - 1] if start else 0) + DENSITY_CHUNK_POINTS, side="right")),
+               start + 1)
+    chunk = samples[start:stop]
+    edges = np.repeat(np.arange(start, stop), chunk)
+    offsets = np.arange(len(edges)) - np.repeat(np.cumsum(chunk) - chunk, chunk)
+    t = (offsets / np.repeat(chunk - 1, chunk))[:, None]
+    points = scaled[edge_u[edges]] * (1 - t) + scaled[edge_v[edges]] * t
+    cells = np.rint(points).astype(np.int64)
+    cell_ids = cells[:, 0] * bins + cells[:, 1]
+    counts += np.bincount(cell_ids, minlength=bins * bins)
+    if totals is not None:
+      totals += np.bincount(cell_ids, np.asarray(weights, dtype=np.float64)[edges], bins * bins)
+    start = stop
+
+  counts = counts.reshape(bins, bins)
+  extent = (low[0], low[0] + span, low[1], low[1] + span)
+  if totals is None:
+    _, inverse, frequency = np.unique(counts[counts > 0], return_inverse=True, return_counts=True)
+    image = np.zeros_like(counts)
+    image[counts > 0] = 0.25 + 0.75 * (np.cumsum(frequency) / max(frequency.sum(), 1))[inverse]
+    image, norm = np.ma.masked_equal(image, 0), mcolors.Normalize(vmin=0, vmax=1)
+  else:
+    with np.errstate(divide="ignore", invalid="ignore"):
+      image, norm = np.ma.masked_where(counts == 0, totals.reshape(bins, bins) / counts), None
+  return ax.imshow(image.T, origin="lower", extent=extent, cmap=cmap, norm=norm, alpha=alpha, interpolation="nearest",
+                   aspect="auto", zorder=1)
+
+
+# Shows the figure, or writes it to `output` (the format follows its extension, e.g. .png or .svg) and closes it.
+def finish(fig, output=None, dpi=150):
+  fig.tight_layout()
+  if output:
+    fig.savefig(output, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    print(f"Plot saved to {output}")
+  else:
+    plt.show()
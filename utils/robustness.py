@@ -0,0 +1,274 @@
+import contextlib
+from concurrent.futures import as_completed
+import numpy as np
+from scipy.stats import norm
+from utils import betweenness, parallel
+from utils.compact import CompactGraph
+from utils.components import component_labels_from_edges
+
+# This module contains the Monte Carlo engine behind `robustness_check` (random edge failures over many rounds).
+
+# Number of per-round values kept for the quantiles of every statistic (reservoir sampling beyond that).
+DEFAULT_RESERVOIR = 1 << 14
+
+# Metrics measured in every round ('cluster_persistence' is 1 when the round kept at most `persistence_limit` components).
+ROUND_METRICS = ("num_components", "max_component_size", "min_component_size", "cluster_persistence")
+
+
+# Streaming summary of a stream of values: exact count, mean, variance (Chan/Welford updates, so batches can be merged
+#   in any order), min and max, plus quantiles from a bounded reservoir sample (exact while the stream is shorter than
+#   `capacity`).
+class RunningStats:
+  def __init__(self, capacity=DEFAULT_RESERVOIR, seed=None):
+    self.count = 0
+    self.mean = 0.0
+    self.m2 = 0.0
+    self.min = np.inf
+    self.max = -np.inf
+    self._reservoir = np.empty(capacity)
+    self._rng = np.random.default_rng(seed)
+
+  # Adds a batch of values.
+  def update(self, values):
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if not len(values):
+      return self
+    count, mean, m2 = len(values), values.mean(), ((values - values.mean()) ** 2).sum()
+    total = self.count + count
+    delta = mean - self.mean
+    self.m2 += m2 + delta * delta * self.count * count / total
+    self.mean += delta * count / total
+    self.min = min(self.min, values.min())
+    self.max = max(self.max, values.max())
+
+    # Fills the reservoir, then replaces random slots with decreasing probability (Algorithm R)
+    capacity = len(self._reservoir)
+    filled = min(self.count, capacity)
+    take = min(capacity - filled, count)
+    self._reservoir[filled:filled + take] = values[:take]
+    if take < count:
+      seen = self.count + take + np.arange(count - take)
+      slots = self._rng.integers(0, seen + 1)
+      keep = slots < capacity
+      self._reservoir[slots[keep]] = values[take:][keep]
+    self.count = total
+    return self
+
+  @property
+  def variance(self) -> float:
+    return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+  @property
+  def std(self) -> float:
+    return float(np.sqrt(self.variance))
+
+  # Normal confidence interval of the mean.
+  def confidence_interval(self, confidence=0.95):
+    half_width = norm.ppf(0.5 + confidence / 2) * self.std / np.sqrt(max(self.count, 1))
+    return self.mean - half_width, self.mean + half_width
+
+  def quantiles(self, q):
+    return np.quantile(self._reservoir[:min(self.count, len(self._reservoir))], q) if self.count else np.full(len(q), np.nan)
+
+  # Dictionary summary (JSON friendly).
+  def summary(self, confidence=0.95, q=(0.05, 0.5, 0.95)) -> dict:
+    low, high = self.confidence_interval(confidence)
+    return {
+      "count": self.count,
+      "mean": float(self.mean),
+      "variance": float(self.variance),
+      "std": self.std,
+      "min": float(self.min),
+      "max": float(self.max),
+      "ci": (float(low), float(high)),
+      "quantiles": dict(zip((float(p) for p in q), (float(v) for v in self.quantiles(q)))),
+    }
+
+
+# Failed edge ids of one round: `k` distinct edges drawn from the round's own seed stream.
+def round_failures(num_edges: int, k: int, seed_sequence):
+  return np.random.default_rng(seed_sequence).choice(num_edges, size=k, replace=False)
+
+
+# Runs the given rounds on `cg`: each one masks out its failed edges (no graph copy) and labels the components of the
+#   remaining edge list. Returns a dictionary of per-round arrays (one entry per metric).
+def run_rounds(cg: CompactGraph, k: int, seed_sequences, persistence_limit=np.inf, betweenness_options=None):
+  num_edges = cg.number_of_edges()
+  results = {name: np.zeros(len(seed_sequences)) for name in ROUND_METRICS}
+  if betweenness_options is not None:
+    results["avg_betweenness"] = np.zeros(len(seed_sequences))
+  edge_mask = np.ones(num_edges, dtype=bool)
+  for i, seed_sequence in enumerate(seed_sequences):
+    edge_mask[:] = True
+    edge_mask[round_failures(num_edges, k, seed_sequence)] = False
+    num_components, labels = component_labels_from_edges(cg.number_of_nodes(), cg.edge_u[edge_mask], cg.edge_v[edge_mask])
+    sizes = np.bincount(labels, minlength=num_components)
+    results["num_components"][i] = num_components
+    results["max_component_size"][i] = sizes.max() if num_components else 0
+    results["min_component_size"][i] = sizes.min() if num_components else 0
+    results["cluster_persistence"][i] = num_components <= persistence_limit
+    if betweenness_options is not None:
+      results["avg_betweenness"][i] = betweenness.betweenness_stats(cg, edge_mask=edge_mask, **betweenness_options)["average"]
+  return results
+
+
+def _run_rounds_task(k, seed_sequences, persistence_limit, betweenness_options):
+  return run_rounds(parallel.worker_graph(), k, seed_sequences, persistence_limit, betweenness_options)
+
+
+# Monte Carlo robustness simulation: `n_simulations` rounds of `k` uniformly random edge failures.
+#   Every round draws its failures from its own child of `SeedSequence(seed)`, so the results are reproducible and do
+#   not depend on how the rounds are split over the `workers` processes (which read the CSR arrays from shared memory).
+#   Per-round results are folded into `RunningStats` as the chunks complete. Returns (stats per metric, seed sequences).
+def monte_carlo(cg: CompactGraph, k: int, n_simulations: int, seed=None, workers=None, persistence_limit=np.inf,
+                betweenness_options=None, chunk_rounds=None):
+  seed_sequences = np.random.SeedSequence(seed).spawn(n_simulations)
+  workers = parallel.default_workers(workers) if workers is not None else 1
+  if betweenness_options is not None:
+    betweenness_options = {name: value for name, value in betweenness_options.items() if name != "workers"}
+  names = ROUND_METRICS + (("avg_betweenness",) if betweenness_options is not None else ())
+  stats = {name: RunningStats(seed=seed) for name in names}
+
+  chunk_rounds = chunk_rounds or max(1, -(-n_simulations // (4 * workers)))
+  chunks = [seed_sequences[i:i + chunk_rounds] for i in range(0, n_simulations, chunk_rounds)]
+  with contextlib.ExitStack() as stack:
+    if workers > 1 and len(chunks) > 1:
+      executor = stack.enter_context(stack.enter_context(parallel.SharedGraph(cg)).executor(workers))
+      futures = [executor.submit(_run_rounds_task, k, chunk, persistence_limit, betweenness_options) for chunk in chunks]
+      results = (future.result() for future in as_completed(futures))
+    else:
+      results = (run_rounds(cg, k, chunk, persistence_limit, betweenness_options) for chunk in chunks)
+    for result in results:
+      for name in names:
+        stats[name].update(result[name])
+  return stats, seed_sequences
+
+
+# Newman-Ziff sweep of one random removal order: the edges are added back in reverse order with union-find (union by
+#   size, path halving), so the giant component size and the number of components after removing the first k edges
+#   of `order` are known for every k = 0..m in one near-linear pass. Returns (giant sizes, component counts), both
+#   indexed by k.
+def sweep_order(num_nodes: int, edge_u, edge_v, order):
+  num_edges = len(order)
+  sources, targets = edge_u[order].tolist(), edge_v[order].tolist()
+  parent = list(range(num_nodes))
+  size = [1] * num_nodes
+  giant, count = (1 if num_nodes else 0), num_nodes
+  giant_curve, count_curve = [giant], [count]
+
+  for a, b in zip(reversed(sources), reversed(targets)):
+    while parent[a] != a:
+      parent[a] = parent[parent[a]]
+      a = parent[a]
+    while parent[b] != b:
+      parent[b] = parent[parent[b]]
+      b = parent[b]
+    if a != b:
+      if size[a] < size[b]:
+        a, b = b, a
+      parent[b] = a
+      size[a] += size[b]
+      count -= 1
+      if size[a] > giant:
+        giant = size[a]
+    giant_curve.append(giant)
+    count_curve.append(count)
+  return np.array(giant_curve[::-1], dtype=np.int64), np.array(count_curve[::-1], dtype=np.int64)
+
+
+# Runs the sweeps of the given trials, each with its own random removal order. Returns the per-k sums and sums of
+#   squares of the giant component size and the component count over the trials.
+def sweep_trials(cg: CompactGraph, seed_sequences):
+  num_edges = cg.number_of_edges()
+  sums = np.zeros((4, num_edges + 1))
+  for seed_sequence in seed_sequences:
+    order = np.random.default_rng(seed_sequence).permutation(num_edges)
+    giant, count = sweep_order(cg.number_of_nodes(), cg.edge_u, cg.edge_v, order)
+    sums += (giant, giant.astype(np.float64) ** 2, count, count.astype(np.float64) ** 2)
+  return sums
+
+
+def _sweep_trials_task(seed_sequences):
+  return sweep_trials(parallel.worker_graph(), seed_sequences)
+
+
+# Percolation-style robustness curve (Newman & Ziff, 2000): for every number k = 0..m of uniformly random edge failures,
+#   the mean and standard deviation over `trials` random removal orders of the giant component size and of the number
+#   of components, each trial costing a single union-find pass. Trials get their own seed streams of `seed` and are
+#   spread over `workers` processes. Returns a dictionary of arrays indexed by k.
+def percolation_sweep(cg: CompactGraph, trials=10, seed=None, workers=None):
+  seed_sequences = np.random.SeedSequence(seed).spawn(trials)
+  workers = parallel.default_workers(workers) if workers is not None else 1
+  with contextlib.ExitStack() as stack:
+    if workers > 1 and trials > 1:
+      executor = stack.enter_context(stack.enter_context(parallel.SharedGraph(cg)).executor(workers))
+      chunks = np.array_split(np.arange(trials), min(trials, workers))
+      futures = [executor.submit(_sweep_trials_task, [seed_sequences[i] for i in chunk]) for chunk in chunks]
+      sums = sum(future.result() for future in as_completed(futures))
+    else:
+      sums = sweep_trials(cg, seed_sequences)
+
+  means = sums[[0, 2]] / max(trials, 1)
+  variances = np.maximum(sums[[1, 3]] - trials * means ** 2, 0.0) / max(trials - 1, 1)
+  return {
+    "removed": np.arange(cg.number_of_edges() + 1),
+    "trials": trials,
+    "giant_mean": means[0],
+    "giant_std": np.sqrt(variances[0]),
+    "components_mean": means[1],
+    "components_std": np.sqrt(variances[1]),
+  }
+
+
+# Sweep of a node removal order: the nodes are added back in reverse order, each one joining the components of its
+#   already present neighbors, so the giant component size and the number of components among the remaining nodes
+#   after removing the first k nodes of `order` are known for every k = 0..n. Returns (giant sizes, component counts).
+def sweep_node_order(cg: CompactGraph, order):
+  num_nodes = cg.number_of_nodes()
+  indptr, indices = cg.indptr.tolist(), cg.indices.tolist()
+  parent = list(range(num_nodes))
+  size = [1] * num_nodes
+  present = [False] * num_nodes
+  giant = count = 0
+  giant_curve, count_curve = [0], [0]
+
+  for v in reversed(np.asarray(order).tolist()):
+    present[v] = True
+    count += 1
+    giant = max(giant, 1)
+    for w in indices[indptr[v]:indptr[v + 1]]:
+      if not present[w]:
+        continue
+      a, b = v, w
+      while parent[a] != a:
+        parent[a] = parent[parent[a]]
+        a = parent[a]
+      while parent[b] != b:
+        parent[b] = parent[parent[b]]
+        b = parent[b]
+      if a != b:
+        if size[a] < size[b]:
+          a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+        count -= 1
+        giant = max(giant, size[a])
+    giant_curve.append(giant)
+    count_curve.append(count)
+  return np.array(giant_curve[::-1], dtype=np.int64), np.array(count_curve[::-1], dtype=np.int64)
+
+
+# Robustness curve of a single (e.g. targeted) removal order of nodes or edges, in the format of `percolation_sweep`.
+def order_curve(cg: CompactGraph, order, target="edge"):
+  if target == "node":
+    giant, count = sweep_node_order(cg, order)
+  else:
+    giant, count = sweep_order(cg.number_of_nodes(), cg.edge_u, cg.edge_v, order)
+  return {
+    "removed": np.arange(len(order) + 1),
+    "trials": 1,
+    "giant_mean": giant.astype(np.float64),
+    "giant_std": np.zeros(len(giant)),
+    "components_mean": count.astype(np.float64),
+    "components_std": np.zeros(len(count)),
+  }
@@ -0,0 +1,231 @@
+import contextlib
+import numpy as np
+import scipy.sparse as sp
+from scipy.stats import norm
+from utils import parallel
+from utils.compact import CompactGraph
+
+# This module contains the triangle counting engine (degree-ordered forward algorithm) behind the clustering
+#   coefficients and the common neighbor counts of the neighborhood overlap.
+
+# Default number of sparse row entries gathered per chunk of oriented edges.
+DEFAULT_CHUNK_ENTRIES = 1 << 24
+
+# Signed triangle types of the census, indexed by their number of negative edges.
+SIGNED_TRIANGLES = ("+++", "++-", "+--", "---")
+
+
+# Degree-ordered orientation of the graph: every edge points from the endpoint with the lower (degree, id) rank to the
+#   higher one, so every node keeps at most sqrt(2m) out-neighbors and each triangle is found exactly once (from its
+#   two lowest-ranked nodes). Self-loops are dropped. Returns the oriented adjacency as a CSR matrix with sorted rows,
+#   and the source, target and edge id of every oriented slot.
+def forward_adjacency(cg: CompactGraph):
+  n = cg.number_of_nodes()
+  rank = np.empty(n, dtype=np.int64)
+  rank[np.lexsort((np.arange(n), cg.degree))] = np.arange(n)
+  edges = np.flatnonzero(cg.edge_u != cg.edge_v)
+  edge_u, edge_v = cg.edge_u[edges].astype(np.int64), cg.edge_v[edges].astype(np.int64)
+  low = np.where(rank[edge_u] < rank[edge_v], edge_u, edge_v)
+  high = edge_u + edge_v - low
+
+  order = np.argsort(low * n + high)
+  low, high, edges = low[order], high[order], edges[order]
+  indptr = np.zeros(n + 1, dtype=np.int64)
+  np.cumsum(np.bincount(low, minlength=n), out=indptr[1:])
+  forward = sp.csr_array((np.ones(len(high), dtype=np.int32), high, indptr), shape=(n, n))
+  return forward, low, high, edges
+
+
+# Enumerates the triangles found from the given oriented slots, in chunks of at most `chunk_entries` row entries.
+#   Every chunk yields the position of its first slot in `slots`, its slots, the number of triangles found from each
+#   of them, and for every triangle (u, v, w) found from slot (u, v): its apex w and the edge ids of (u, v), (u, w)
+#   and (v, w).
+def _triangle_chunks(forward, low, high, edges, slots, chunk_entries=DEFAULT_CHUNK_ENTRIES):
+  n = forward.shape[0]
+  out_degree = np.diff(forward.indptr)
+  entries = np.cumsum(out_degree[low[slots]] + out_degree[high[slots]])
+  keys = low * n + high
+  done = 0
+  while done < len(slots):
+    stop = max(int(np.searchsorted(entries, (entries[done - 1] if done else 0) + chunk_entries)), done + 1)
+    chunk = slots[done:stop]
+    # Row i of the product holds the common out-neighbors w of the i-th oriented edge (u, v): triangle (u, v, w)
+    common = forward[low[chunk]].multiply(forward[high[chunk]]).tocsr()
+    common.eliminate_zeros()
+    found = np.diff(common.indptr)
+    apex = common.indices.astype(np.int64)
+    u, v = np.repeat(low[chunk], found), np.repeat(high[chunk], found)
+    yield (done, chunk, found, apex, np.repeat(edges[chunk], found), edges[np.searchsorted(keys, u * n + apex)],
+           edges[np.searchsorted(keys, v * n + apex)])
+    done = stop
+
+
+# Triangles found from the given oriented slots: returns the triangle count of every node and of every edge (the
+#   number of triangles the edge belongs to, i.e. the common neighbors of its endpoints).
+def _count_slots(forward, low, high, edges, num_edges, slots, chunk_entries=DEFAULT_CHUNK_ENTRIES):
+  n = forward.shape[0]
+  node_counts = np.zeros(n, dtype=np.int64)
+  edge_counts = np.zeros(num_edges, dtype=np.int64)
+  for _, chunk, found, apex, *sides in _triangle_chunks(forward, low, high, edges, slots, chunk_entries):
+    for nodes in (low[chunk], high[chunk]):
+      node_counts += np.bincount(nodes, found, n).astype(np.int64)
+    node_counts += np.bincount(apex, minlength=n)
+    for side in sides:
+      edge_counts += np.bincount(side, minlength=num_edges)
+  return node_counts, edge_counts
+
+
+# Signed triangles found from the given oriented slots, by type (see `SIGNED_TRIANGLES`): returns the census of every
+#   node (n x 4) and of every slot (len(slots) x 4).
+def _census_slots(forward, low, high, edges, negative, slots, chunk_entries=DEFAULT_CHUNK_ENTRIES):
+  n = forward.shape[0]
+  types = len(SIGNED_TRIANGLES)
+  node_census = np.zeros(n * types, dtype=np.int64)
+  slot_census = np.zeros(len(slots) * types, dtype=np.int64)
+  for done, chunk, found, apex, *sides in _triangle_chunks(forward, low, high, edges, slots, chunk_entries):
+    kind = sum(negative[side].astype(np.int64) for side in sides)
+    for nodes in (np.repeat(low[chunk], found), np.repeat(high[chunk], found), apex):
+      node_census += np.bincount(nodes * types + kind, minlength=n * types)
+    positions = np.repeat(np.arange(done, done + len(chunk)), found)
+    slot_census += np.bincount(positions * types + kind, minlength=len(slots) * types)
+  return node_census.reshape(n, types), slot_census.reshape(len(slots), types)
+
+
+# Rebuilds the oriented adjacency from the shared graph of a worker (see `_oriented_graph`).
+def _worker_forward():
+  oriented = parallel.worker_graph()
+  n = oriented.number_of_nodes()
+  forward = sp.csr_array((np.ones(len(oriented.indices), dtype=np.int32), oriented.indices, oriented.indptr), shape=(n, n))
+  return forward, oriented.slot_sources().astype(np.int64), oriented.indices.astype(np.int64), oriented.slot_edge
+
+
+def _count_task(slots, num_edges):
+  return _count_slots(*_worker_forward(), num_edges, slots)
+
+
+def _census_task(slots, negative):
+  return _census_slots(*_worker_forward(), negative, slots)
+
+
+# Splits the given oriented slots into `parts` runs of similar work (row entries gathered).
+def _split_slots(forward, low, high, slots, parts):
+  out_degree = np.diff(forward.indptr)
+  work = np.cumsum(out_degree[low[slots]] + out_degree[high[slots]])
+  bounds = np.searchsorted(work, np.linspace(0, work[-1], parts + 1)[1:-1]) if len(work) else []
+  return [part for part in np.split(slots, bounds) if len(part)]
+
+
+# Runs `task` over the given oriented slots split among a process pool that reads the oriented adjacency from shared
+#   memory (see `parallel.SharedGraph`), returning the results of every part in order.
+def _run_parallel(cg: CompactGraph, oriented, slots, workers, task, *args):
+  forward, low, high, edges = oriented
+  with contextlib.ExitStack() as stack:
+    shared = stack.enter_context(parallel.SharedGraph(_oriented_graph(cg, forward, edges)))
+    executor = stack.enter_context(shared.executor(workers))
+    futures = [executor.submit(task, part, *args) for part in _split_slots(forward, low, high, slots, workers)]
+    return [future.result() for future in futures]
+
+
+# Packs the oriented adjacency into a compact graph (rows hold the out-neighbors, slots the original edge ids), so the
+#   workers read it from shared memory instead of orienting the graph again.
+def _oriented_graph(cg: CompactGraph, forward, edges):
+  return CompactGraph(forward.indptr, forward.indices, edges, cg.edge_u, cg.edge_v)
+
+
+# Triangle counts of a graph, with the clustering statistics derived from them.
+#   - `node` holds the number of triangles through every node and `edge` the number of triangles on every edge (the
+#     common neighbors of its endpoints, excluding the endpoints; for a self-loop, every other neighbor of its node).
+#   - Self-loops are ignored, as in `nx.clustering`.
+class Triangles:
+  def __init__(self, cg: CompactGraph, node, edge):
+    self.cg = cg
+    self.node = node
+    self.edge = edge
+
+  @property
+  def total(self) -> int:
+    return int(self.node.sum() // 3)
+
+  # Degree of every node without its self-loop.
+  @property
+  def degree(self):
+    loops = np.bincount(self.cg.edge_u[self.cg.edge_u == self.cg.edge_v], minlength=self.cg.number_of_nodes())
+    return self.cg.degree.astype(np.int64) - loops
+
+  # Local clustering coefficient of every node (0 for nodes with fewer than two neighbors).
+  @property
+  def clustering(self):
+    pairs = self.degree * (self.degree - 1)
+    return np.where(pairs > 0, 2 * self.node / np.maximum(pairs, 1), 0.0)
+
+  # Mean of the local clustering coefficients over all the nodes (as `nx.average_clustering`).
+  @property
+  def average_clustering(self) -> float:
+    return float(self.clustering.mean()) if self.cg.number_of_nodes() else 0.0
+
+  # Fraction of connected triples that are closed (as `nx.transitivity`).
+  @property
+  def transitivity(self) -> float:
+    triads = int((self.degree * (self.degree - 1)).sum())
+    return 6 * self.total / triads if triads else 0.0
+
+
+# Counts the triangles of `cg` in a single pass of the forward algorithm (see `forward_adjacency`), where the
+#   common out-neighbors of the endpoints of every oriented edge come from a row-wise product of the sparse oriented
+#   adjacency, in chunks of at most `chunk_entries` row entries. With `workers` > 1 the oriented edges are split
+#   over a process pool that reads the oriented adjacency from shared memory (see `parallel.SharedGraph`).
+def count_triangles(cg: CompactGraph, workers=None, chunk_entries=DEFAULT_CHUNK_ENTRIES) -> Triangles:
+  workers = parallel.default_workers(workers) if workers is not None else 1
+  forward, low, high, edges = oriented = forward_adjacency(cg)
+  num_edges = cg.number_of_edges()
+
+  slots = np.arange(len(low))
+
+  if workers > 1 and len(slots) > 1:
+    results = _run_parallel(cg, oriented, slots, workers, _count_task, num_edges)
+    node = sum(result[0] for result in results)
+    edge = sum(result[1] for result in results)
+  else:
+    node, edge = _count_slots(*oriented, num_edges, slots, chunk_entries)
+
+  # A self-loop shares every other neighbor of its node
+  loops = np.flatnonzero(cg.edge_u == cg.edge_v)
+  edge[loops] = cg.degree[cg.edge_u[loops]] - 1
+  return Triangles(cg, node, edge)
+
+
+# Signed triangle census of `cg`: the number of +++, ++-, +-- and --- triangles (see `SIGNED_TRIANGLES`), in total
+#   and through every node, as a dictionary. The +++ and +-- triangles are balanced, the others are not.
+#   - Exact by default: every triangle is enumerated once by the forward algorithm (see `count_triangles`), optionally
+#     split over `workers` processes.
+#   - Passing `samples` only enumerates the triangles found from that many oriented edges, drawn uniformly without
+#     replacement. Every triangle is found from exactly one oriented edge, so the counts scaled by (oriented edges /
+#     samples) are unbiased, and the `confidence` interval of the totals follows from the spread of the per-edge counts
+#     (with finite population correction).
+#   `negative` marks the negative edges (by default the edges with a negative 'sign'); self-loops are ignored.
+def signed_triangle_census(cg: CompactGraph, negative=None, samples=None, confidence=0.95, seed=None, workers=None,
+                           chunk_entries=DEFAULT_CHUNK_ENTRIES):
+  negative = cg.edge_attr("sign", default=1.0) < 0 if negative is None else np.asarray(negative, dtype=bool)
+  workers = parallel.default_workers(workers) if workers is not None else 1
+  forward, low, high, edges = oriented = forward_adjacency(cg)
+  num_slots = len(low)
+  approximate = samples is not None and int(samples) < num_slots
+  slots = np.sort(np.random.default_rng(seed).choice(num_slots, int(samples), replace=False)) if approximate \
+    else np.arange(num_slots)
+
+  if workers > 1 and len(slots) > 1:
+    results = _run_parallel(cg, oriented, slots, workers, _census_task, negative)
+    node_census = sum(result[0] for result in results)
+    slot_census = np.concatenate([result[1] for result in results])
+  else:
+    node_census, slot_census = _census_slots(*oriented, negative, slots, chunk_entries)
+
+  scale = num_slots / len(slots) if approximate else 1
+  census = slot_census.sum(axis=0) * scale
+  census_ci = None
+  if approximate and len(slots) > 1:
+    half_width = norm.ppf(0.5 + confidence / 2) * num_slots * np.sqrt(
+      (1 - len(slots) / num_slots) * slot_census.var(axis=0, ddof=1) / len(slots))
+    census_ci = (census - half_width, census + half_width)
+  return {'census': census, 'nodes': node_census * scale, 'types': SIGNED_TRIANGLES, 'approximate': approximate,
+          'samples': len(slots), 'confidence': confidence, 'census_ci': census_ci}